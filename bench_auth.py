@@ -0,0 +1,146 @@
+"""
+Per-request authentication overhead: what get_current_user / get_current_staff cost a request
+now (verified tokens served from token_cache, token version from token_versions) versus decoding
+and checking the JWT signature on every request as before, for a single hot token and for many
+distinct callers.
+
+--refresh-storm instead replays every caller refreshing at once against an in-memory SQLite
+accounts table: /refresh_token now (version from token_versions; cold after a restart, then
+warm) versus the account lookup per refresh it used to do, with the queries each one issues.
+
+No server needed; SECRET_KEY defaults to a throwaway value.
+
+    python bench_auth.py
+    python bench_auth.py --iterations 50000 --callers 1000
+    python bench_auth.py --refresh-storm --callers 2000
+"""
+import argparse
+import itertools
+import os
+import time
+import timeit
+from datetime import timedelta
+
+os.environ.setdefault("SECRET_KEY", "bench-secret")
+
+from fastapi import HTTPException, status
+from fastapi.security import HTTPAuthorizationCredentials
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import Session
+
+from entities import Account, Base
+from routes.oauth2.controller import refresh_access_token
+from routes.oauth2.model import Principal
+from routes.oauth2.repository import (
+    create_token, get_current_staff, get_current_user, token_cache, token_versions,
+    verify_access_token, verify_refresh_token,
+)
+
+def token(cus_id: int, kind: str) -> str:
+    return create_token(
+        data={"sub": f"0{cus_id}", "id": cus_id, "type": kind, "role": "admin", "ver": 0},
+        expires_delta=timedelta(minutes=30),
+    )
+
+def bearer(cus_id: int) -> HTTPAuthorizationCredentials:
+    return HTTPAuthorizationCredentials(scheme="Bearer", credentials=token(cus_id, "access_token"))
+
+def decode_every_request(credentials: HTTPAuthorizationCredentials) -> Principal:
+    """The dependency before token_cache: a JWT decode and signature check per request, then the staff check"""
+    credentials_exception = HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Could not validate credentials",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+    payload = verify_access_token(credentials.credentials, credentials_exception)
+    if payload["role"] != "admin":
+        raise HTTPException(status_code=403, detail="Permission denied")
+    return Principal.model_validate(payload)
+
+def cached(credentials: HTTPAuthorizationCredentials) -> Principal:
+    # Every caller's token version is in memory (as after its sign-in), so no session is used
+    return get_current_staff(get_current_user(credentials, None))
+
+def run(iterations: int, callers: int):
+    tokens = [bearer(cus_id) for cus_id in range(1, callers + 1)]
+    for cus_id in range(1, callers + 1):
+        token_versions.set(cus_id, 0)
+    cases = (
+        ("one hot token", lambda i: tokens[0]),
+        (f"{callers} callers", lambda i: tokens[i % callers]),
+    )
+
+    print(f"{'traffic':<16} {'decode each time':>17} {'token_cache':>12} {'saved':>8}")
+    for name, token_for in cases:
+        token_cache.clear()
+        for token in tokens:
+            cached(token)  # warm: every caller has been seen once
+        counter = iter(range(10**9))
+        before = timeit.timeit(lambda: decode_every_request(token_for(next(counter))), number=iterations) / iterations
+        after = timeit.timeit(lambda: cached(token_for(next(counter))), number=iterations) / iterations
+        print(f"{name:<16} {before * 1e6:>14.1f} µs {after * 1e6:>9.1f} µs {(1 - after / before) * 100:>7.1f}%")
+
+    # A token's first request still pays the decode, plus the cache insert
+    token_cache.clear()
+    fresh = iter(tokens)
+    miss = timeit.timeit(lambda: cached(next(fresh)), number=callers) / callers
+    print(f"{'first request':<16} {'':>17} {miss * 1e6:>9.1f} µs")
+
+def lookup_every_refresh(refresh_token: str, db: Session) -> dict:
+    """/refresh_token before token_versions: the account read on every refresh"""
+    credentials_exception = HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Could not validate credentials")
+    payload = verify_refresh_token(refresh_token, credentials_exception)
+    user = db.query(Account).filter(Account.phone_number == payload.get("sub")).first()
+    if not user:
+        raise credentials_exception
+    access_token = create_token(
+        data={"sub": user.phone_number, "id": user.cus_id, "type": "access_token", "role": user.role},
+        expires_delta=timedelta(minutes=30),
+    )
+    return {"access_token": access_token, "token_type": "bearer"}
+
+def refresh_storm(callers: int):
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    queries = itertools.count()
+    event.listen(engine, "before_cursor_execute", lambda *args: next(queries))
+
+    with Session(engine) as db:
+        db.add_all(Account(cus_id=cus_id, cus_name="bench", phone_number=f"0{cus_id}", role="admin") for cus_id in range(1, callers + 1))
+        db.commit()
+        refresh_tokens = [token(cus_id, "refresh_token") for cus_id in range(1, callers + 1)]
+
+        def storm(refresh) -> tuple:
+            before = next(queries)
+            started = time.perf_counter()
+            for refresh_token in refresh_tokens:
+                refresh(refresh_token, db)
+            elapsed = time.perf_counter() - started
+            return elapsed / callers, (next(queries) - before - 1) / callers
+
+        token_versions.clear()
+        results = (
+            ("account lookup", storm(lookup_every_refresh)),
+            ("versions, cold", storm(refresh_access_token)),  # first refresh per account reads its version
+            ("versions, warm", storm(refresh_access_token)),
+        )
+
+    print(f"{callers} clients refreshing at once")
+    print(f"{'refresh path':<16} {'per refresh':>12} {'queries':>8}")
+    for name, (seconds, per_refresh) in results:
+        print(f"{name:<16} {seconds * 1e6:>9.1f} µs {per_refresh:>8.2f}")
+    engine.dispose()
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare per-request auth overhead with and without token_cache")
+    parser.add_argument("--iterations", type=int, default=20000)
+    parser.add_argument("--callers", type=int, default=500, help="Distinct tokens (clients) in the many-callers case and the storm")
+    parser.add_argument("--refresh-storm", action="store_true", help="Time /refresh_token for every client at once instead")
+    args = parser.parse_args()
+    if args.refresh_storm:
+        refresh_storm(args.callers)
+    else:
+        run(args.iterations, args.callers)
+
+if __name__ == "__main__":
+    main()
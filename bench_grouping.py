@@ -0,0 +1,87 @@
+"""
+Cost of turning the flat customer → pawn → product join into nested records, per listing size:
+group_pawn_rows (what load_pawn_records runs for LISTING_QUERY_ENGINE=python, now behind the
+routes/user pawn endpoints too) versus the per-customer defaultdict loop over positional line
+rows that routes/user used to run.
+
+No database: the rows are synthetic, so the timings are the Python grouping alone.
+
+    python bench_grouping.py
+    python bench_grouping.py --pawns 100 1000 10000 --items 3 --repeat 20
+"""
+import argparse
+import timeit
+from collections import defaultdict, namedtuple
+from datetime import datetime
+
+import queries
+from routes.pawn.repository import group_pawn_rows
+
+Row = namedtuple("Row", [column.key for column in queries.PAWN_DETAIL_COLUMNS])
+
+def synthetic_rows(pawns: int, items: int):
+    """`items` lines for each of `pawns` pawns, spread over pawns // 3 customers, newest pawn first"""
+    return [
+        Row(
+            cus_id=pawn_id % max(pawns // 3, 1), cus_name="customer", phone_number="012", address=None,
+            pawn_id=pawn_id, pawn_deposit=100.0, pawn_date=datetime(2024, 1, 1), pawn_expire_date=datetime(2024, 6, 1),
+            total_amount=items, total_weight=3.75 * items,
+            prod_id=item, prod_name=f"product {item}", pawn_weight="1 chi", pawn_weight_grams=3.75,
+            pawn_weight_unit="chi", pawn_amount=1, pawn_unit_price=50.0,
+        )
+        for pawn_id in range(pawns, 0, -1)
+        for item in range(items)
+    ]
+
+def legacy_grouping(rows):
+    """routes/user get_all_pawns before it used load_pawn_records: positional indexes, per customer"""
+    grouped_pawns = defaultdict(lambda: {
+        "cus_id": 0,
+        "customer_name": "",
+        "phone_number": "",
+        "address": "",
+        "pawn_deposit": 0,
+        "pawn_date": "",
+        "pawn_expire_date": "",
+        "products": [],
+    })
+    for pawn in rows:
+        cus_id = pawn[0]
+        if not grouped_pawns[cus_id]["customer_name"]:
+            grouped_pawns[cus_id].update({
+                "pawn_id": pawn[4],
+                "cus_id": pawn[0],
+                "customer_name": pawn[1],
+                "phone_number": pawn[2],
+                "address": pawn[3],
+                "pawn_deposit": pawn[5],
+                "pawn_date": pawn[6],
+                "pawn_expire_date": pawn[7],
+            })
+        grouped_pawns[cus_id]["products"].append({
+            "prod_id": pawn[10],
+            "prod_name": pawn[11],
+            "pawn_weight": pawn[12],
+            "pawn_amount": pawn[15],
+            "pawn_unit_price": pawn[16],
+        })
+    return list(grouped_pawns.values())
+
+def run(sizes, items: int, repeat: int):
+    print(f"{'pawns':>7} {'rows':>8} {'legacy loop':>13} {'group_pawn_rows':>16} {'per row':>10}")
+    for pawns in sizes:
+        rows = synthetic_rows(pawns, items)
+        legacy = min(timeit.repeat(lambda: legacy_grouping(rows), number=1, repeat=repeat))
+        shared = min(timeit.repeat(lambda: group_pawn_rows(rows), number=1, repeat=repeat))
+        print(f"{pawns:>7} {len(rows):>8} {legacy * 1e3:>10.2f} ms {shared * 1e3:>13.2f} ms {shared / len(rows) * 1e6:>7.2f} µs")
+
+def main():
+    parser = argparse.ArgumentParser(description="Time grouping flat pawn rows into nested records")
+    parser.add_argument("--pawns", type=int, nargs="+", default=[100, 1000, 10000], help="Pawns per listing")
+    parser.add_argument("--items", type=int, default=3, help="Items per pawn")
+    parser.add_argument("--repeat", type=int, default=10, help="Best of this many runs")
+    args = parser.parse_args()
+    run(args.pawns, args.items, args.repeat)
+
+if __name__ == "__main__":
+    main()
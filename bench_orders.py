@@ -0,0 +1,114 @@
+"""
+Database round-trips and latency of writing one order's lines, per order size: the old
+per-line loop (a product lookup per line, a committed insert per new product, one detail insert
+per line) versus create_order's batched path (resolve_product_ids + one executemany insert).
+
+Half the lines of every order name a product that already exists, half a new one.
+
+    python bench_orders.py                        # in-memory SQLite
+    python bench_orders.py --url "$DATABASE_URL"  # a real database (its tables must exist; rows are kept)
+    python bench_orders.py --sizes 1 10 50 --orders 100
+"""
+import argparse
+import itertools
+import time
+import uuid
+
+from sqlalchemy import create_engine, event, func, insert
+from sqlalchemy.orm import Session
+
+from entities import Base, Order, OrderDetail, Product
+from routes.product.repository import resolve_product_ids
+
+def order_lines(run: str, order_no: int, size: int):
+    """(prod_name, weight) pairs: even lines a new product, odd lines a shared, already known one"""
+    return [
+        (f"new-{run}-{order_no}-{line}" if line % 2 == 0 else f"known-{run}-{line}", "1 chi")
+        for line in range(size)
+    ]
+
+def detail(order_id: int, prod_id: int, weight: str) -> dict:
+    return {
+        "order_id": order_id,
+        "prod_id": prod_id,
+        "order_weight": weight,
+        "order_amount": 1,
+        "product_sell_price": 100.0,
+        "product_labor_cost": 10.0,
+        "product_buy_price": 80.0,
+    }
+
+def per_line(db: Session, order_id: int, lines):
+    """create_order before batching"""
+    for prod_name, weight in lines:
+        existing_product = db.query(Product).filter(Product.prod_name == func.lower(prod_name)).first()
+        if not existing_product:
+            product = Product(prod_name=prod_name.lower())
+            db.add(product)
+            db.commit()
+            db.refresh(product)
+            prod_id = product.prod_id
+        else:
+            prod_id = existing_product.prod_id
+        db.add(OrderDetail(**detail(order_id, prod_id, weight)))
+    db.commit()
+
+def batched(db: Session, order_id: int, lines):
+    """create_order now"""
+    product_ids = resolve_product_ids(db, [prod_name for prod_name, _ in lines])
+    db.execute(insert(OrderDetail), [detail(order_id, product_ids[prod_name.lower()], weight) for prod_name, weight in lines])
+    db.commit()
+
+def measure(engine, write, size: int, orders: int):
+    """(round-trips per order, ms per order) of `write` over `orders` orders of `size` lines"""
+    run = uuid.uuid4().hex[:8]
+    round_trips = itertools.count()
+
+    def count(*args):
+        next(round_trips)
+
+    with Session(engine) as db:
+        # Seed the shared products and the orders outside the measurement
+        db.add_all(Product(prod_name=prod_name) for prod_name, _ in order_lines(run, 0, size)[1::2])
+        order_ids = []
+        for _ in range(orders):
+            order = Order(order_deposit=0)
+            db.add(order)
+            db.flush()
+            order_ids.append(order.order_id)
+        db.commit()
+
+        event.listen(engine, "before_cursor_execute", count)
+        event.listen(engine, "commit", count)
+        started = time.perf_counter()
+        for order_no, order_id in enumerate(order_ids, start=1):
+            write(db, order_id, order_lines(run, order_no, size))
+        elapsed = time.perf_counter() - started
+        event.remove(engine, "before_cursor_execute", count)
+        event.remove(engine, "commit", count)
+
+    return next(round_trips) / orders, elapsed / orders * 1e3
+
+def run(url: str, sizes, orders: int):
+    engine = create_engine(url)
+    if url.startswith("sqlite"):
+        Base.metadata.create_all(engine)
+
+    print(f"{'lines':>6} {'per-line trips':>15} {'batched trips':>14} {'per-line':>11} {'batched':>11}")
+    for size in sizes:
+        before_trips, before_ms = measure(engine, per_line, size, orders)
+        after_trips, after_ms = measure(engine, batched, size, orders)
+        print(f"{size:>6} {before_trips:>15.1f} {after_trips:>14.1f} {before_ms:>8.2f} ms {after_ms:>8.2f} ms")
+
+    engine.dispose()
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare round-trips and latency of per-line vs batched order writes")
+    parser.add_argument("--url", default="sqlite://", help="Database URL (default: in-memory SQLite)")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1, 5, 20, 100], help="Lines per order")
+    parser.add_argument("--orders", type=int, default=50, help="Orders written per size and path")
+    args = parser.parse_args()
+    run(args.url, args.sizes, args.orders)
+
+if __name__ == "__main__":
+    main()
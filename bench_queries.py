@@ -0,0 +1,111 @@
+"""
+Per-request SQLAlchemy overhead of the hot reads: building the join with db.query(...) on every
+call (how the repositories used to do it) versus executing a pre-built statement from queries.py.
+
+Tables are empty by default (in-memory SQLite), so the timings are the Python side of a request:
+statement construction, cache-key generation, the compiled-cache lookup and result setup.
+
+    python bench_queries.py                        # in-memory SQLite
+    python bench_queries.py --url "$DATABASE_URL"  # a real database (its tables must exist)
+    python bench_queries.py --iterations 5000
+"""
+import argparse
+import timeit
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+import queries
+from entities import Account, Base, Order, OrderDetail, Pawn, PawnDetail, Product
+
+def adhoc_pawn_by_id(db: Session, pawn_id: int):
+    """The 13-column pawn join as get_pawn_by_id / get_all_pawns built it per request"""
+    return (
+        db.query(
+            Account.cus_id,
+            Account.cus_name,
+            Account.phone_number,
+            Account.address,
+            Pawn.pawn_id,
+            Pawn.pawn_deposit,
+            Pawn.pawn_date,
+            Pawn.pawn_expire_date,
+            Product.prod_id,
+            Product.prod_name,
+            PawnDetail.pawn_weight,
+            PawnDetail.pawn_amount,
+            PawnDetail.pawn_unit_price,
+        )
+        .join(Pawn, Account.cus_id == Pawn.cus_id)
+        .join(PawnDetail, Pawn.pawn_id == PawnDetail.pawn_id)
+        .join(Product, PawnDetail.prod_id == Product.prod_id)
+        .filter(Account.role == "user")
+        .filter(Pawn.pawn_id == pawn_id)
+        .all()
+    )
+
+def prebuilt_pawn_by_id(db: Session, pawn_id: int):
+    return db.execute(queries.PAWN_LINES_BY_ID, {"pawn_id": pawn_id}).all()
+
+def adhoc_pawn_records(db: Session, pawn_ids):
+    """The flat record join of load_pawn_records, filtered by a page of ids"""
+    return (
+        db.query(*queries.PAWN_SUMMARY_COLUMNS, *queries.PAWN_PRODUCT_COLUMNS)
+        .select_from(Account)
+        .join(Pawn, Account.cus_id == Pawn.cus_id)
+        .join(PawnDetail, Pawn.pawn_id == PawnDetail.pawn_id)
+        .join(Product, PawnDetail.prod_id == Product.prod_id)
+        .filter(Pawn.pawn_id.in_(pawn_ids))
+        .order_by(Pawn.pawn_id.desc())
+        .all()
+    )
+
+def prebuilt_pawn_records(db: Session, pawn_ids):
+    return db.execute(queries.PAWN_RECORDS_BY_IDS[False], {"pawn_ids": pawn_ids}).all()
+
+def adhoc_orders_by_customers(db: Session, cus_ids):
+    return (
+        db.query(*queries.ORDER_LINE_COLUMNS)
+        .join(Order, Account.cus_id == Order.cus_id)
+        .join(OrderDetail, Order.order_id == OrderDetail.order_id)
+        .join(Product, OrderDetail.prod_id == Product.prod_id)
+        .filter(Order.cus_id.in_(cus_ids))
+        .all()
+    )
+
+def prebuilt_orders_by_customers(db: Session, cus_ids):
+    return db.execute(queries.ORDER_LINES_BY_CUSTOMERS, {"cus_ids": cus_ids}).all()
+
+CASES = (
+    ("pawn lines by id", adhoc_pawn_by_id, prebuilt_pawn_by_id, lambda i: i),
+    ("pawn records page", adhoc_pawn_records, prebuilt_pawn_records, lambda i: list(range(i, i + 50))),
+    ("order lines by customers", adhoc_orders_by_customers, prebuilt_orders_by_customers, lambda i: [i, i + 1, i + 2]),
+)
+
+def run(url: str, iterations: int):
+    engine = create_engine(url)
+    if url.startswith("sqlite"):
+        Base.metadata.create_all(engine)
+
+    with Session(engine) as db:
+        print(f"{'query':<26} {'db.query per call':>18} {'pre-built':>12} {'saved':>8}")
+        for name, adhoc, prebuilt, argument in CASES:
+            # Warm both paths so the compiled cache holds each statement before timing
+            adhoc(db, argument(1))
+            prebuilt(db, argument(1))
+            counter = iter(range(10**9))
+            before = timeit.timeit(lambda: adhoc(db, argument(next(counter))), number=iterations) / iterations
+            after = timeit.timeit(lambda: prebuilt(db, argument(next(counter))), number=iterations) / iterations
+            print(f"{name:<26} {before * 1e6:>15.1f} µs {after * 1e6:>9.1f} µs {(1 - after / before) * 100:>7.1f}%")
+
+    engine.dispose()
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare per-request ORM query overhead before/after queries.py")
+    parser.add_argument("--url", default="sqlite://", help="Database URL (default: in-memory SQLite)")
+    parser.add_argument("--iterations", type=int, default=2000)
+    args = parser.parse_args()
+    run(args.url, args.iterations)
+
+if __name__ == "__main__":
+    main()
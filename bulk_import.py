@@ -0,0 +1,409 @@
+import codecs
+import csv
+import json
+import time
+from typing import AsyncIterator, Awaitable, Callable, Dict, List, Optional, Sequence, Tuple
+
+from fastapi import HTTPException, Request
+from pydantic import BaseModel, ValidationError
+from sqlalchemy import insert, text
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+
+from entities import Account
+from id_allocator import IdAllocator
+from routes.product.repository import resolve_product_ids
+
+CSV_TYPES = ("text/csv", "application/csv")
+NDJSON_TYPES = ("application/x-ndjson", "application/ndjson", "application/jsonl", "application/json-lines")
+
+def detect_format(request: Request, file_format: Optional[str] = None) -> str:
+    """Pick csv/ndjson from the explicit ?format= parameter, falling back to the Content-Type"""
+    if file_format:
+        file_format = file_format.lower()
+        if file_format not in ("csv", "ndjson"):
+            raise HTTPException(status_code=400, detail="format must be 'csv' or 'ndjson'")
+        return file_format
+
+    content_type = request.headers.get("content-type", "").split(";")[0].strip().lower()
+    if content_type in CSV_TYPES:
+        return "csv"
+    if content_type in NDJSON_TYPES:
+        return "ndjson"
+    raise HTTPException(
+        status_code=415,
+        detail="Upload must be text/csv or application/x-ndjson (or pass ?format=csv|ndjson)",
+    )
+
+async def iter_lines(request: Request) -> AsyncIterator[Tuple[int, str]]:
+    """Yield (line_number, line) from the request body as it arrives, without buffering the upload"""
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    pending = ""
+    line_number = 0
+
+    async for chunk in request.stream():
+        pending += decoder.decode(chunk)
+        *lines, pending = pending.split("\n")
+        for line in lines:
+            line_number += 1
+            yield line_number, line.rstrip("\r")
+
+    pending += decoder.decode(b"", final=True)
+    if pending:
+        yield line_number + 1, pending.rstrip("\r")
+
+async def iter_records(request: Request, file_format: str) -> AsyncIterator[Tuple[int, object]]:
+    """
+    Yield (line_number, record) for each CSV row or NDJSON line.
+    CSV rows become dicts keyed by the header; blank cells are dropped so model defaults apply.
+    Unparseable lines are yielded as a ValueError instead of a record.
+    """
+    if file_format == "ndjson":
+        async for line_number, line in iter_lines(request):
+            if not line.strip():
+                continue
+            try:
+                yield line_number, json.loads(line)
+            except ValueError as e:
+                yield line_number, ValueError(f"Invalid JSON: {e}")
+        return
+
+    header = None
+    buffered = ""
+    start_line = 0
+    async for line_number, line in iter_lines(request):
+        # A quoted field may contain newlines: keep joining until the quotes balance
+        if buffered:
+            buffered += "\n" + line
+        else:
+            buffered, start_line = line, line_number
+        if buffered.count('"') % 2:
+            continue
+
+        raw, buffered = buffered, ""
+        if not raw.strip():
+            continue
+        values = next(csv.reader([raw]))
+        if header is None:
+            header = [column.strip() for column in values]
+            continue
+        if len(values) > len(header):
+            yield start_line, ValueError(f"Expected {len(header)} columns, got {len(values)}")
+            continue
+        yield start_line, {
+            column: value.strip()
+            for column, value in zip(header, values)
+            if value.strip() != ""
+        }
+
+    if buffered:
+        yield start_line, ValueError("Unterminated quoted field")
+
+async def iter_grouped_records(
+    request: Request,
+    file_format: str,
+    key: str,
+    detail_field: str,
+    detail_columns: Sequence[str],
+) -> AsyncIterator[Tuple[List[int], object]]:
+    """
+    Yield (line_numbers, payload) per business record (one pawn ticket, one order).
+    NDJSON lines already carry the nested detail list. Consecutive CSV rows sharing the same
+    non-empty `key` are folded into one payload, their `detail_columns` collected under `detail_field`.
+    """
+    if file_format == "ndjson":
+        async for line_number, record in iter_records(request, file_format):
+            yield [line_number], record
+        return
+
+    lines: List[int] = []
+    payload: Optional[Dict] = None
+    current_key = None
+
+    async for line_number, record in iter_records(request, file_format):
+        if isinstance(record, ValueError):
+            yield [line_number], record
+            continue
+
+        row_key = record.get(key)
+        if payload is not None and (row_key is None or row_key != current_key):
+            yield lines, payload
+            payload = None
+
+        detail = {column: record[column] for column in detail_columns if column in record}
+        if payload is None:
+            lines, current_key = [], row_key
+            payload = {column: value for column, value in record.items() if column not in detail_columns}
+            payload[detail_field] = []
+        lines.append(line_number)
+        if detail:
+            payload[detail_field].append(detail)
+
+    if payload is not None:
+        yield lines, payload
+
+class ImportReport:
+    """Running totals and per-row failures for one bulk import request"""
+    def __init__(self, max_errors: int = 1000):
+        self.started = time.perf_counter()
+        self.max_errors = max_errors
+        self.rows = 0
+        self.imported_records = 0
+        self.imported_rows = 0
+        self.failed_rows = 0
+        self.failed_records = 0
+        self.errors: List[Dict] = []
+
+    def success(self, lines: List[int]):
+        self.rows += len(lines)
+        self.imported_records += 1
+        self.imported_rows += len(lines)
+
+    def fail(self, lines: List[int], error: str):
+        self.rows += len(lines)
+        self.failed_rows += len(lines)
+        self.failed_records += 1
+        if len(self.errors) < self.max_errors:
+            self.errors.append({"rows": lines, "error": error})
+
+    def as_dict(self) -> Dict:
+        elapsed = time.perf_counter() - self.started
+        return {
+            "rows": self.rows,
+            "imported_records": self.imported_records,
+            "imported_rows": self.imported_rows,
+            "failed_rows": self.failed_rows,
+            "elapsed_seconds": round(elapsed, 3),
+            "rows_per_second": round(self.rows / elapsed, 1) if elapsed else 0.0,
+            "errors": self.errors,
+            "errors_truncated": len(self.errors) < self.failed_records,
+        }
+
+def describe_error(error: Exception) -> str:
+    """One-line, row-report friendly description of a parse or validation error"""
+    if isinstance(error, ValidationError):
+        return "; ".join(
+            f"{'.'.join(str(part) for part in err['loc']) or 'row'}: {err['msg']}"
+            for err in error.errors()
+        )
+    return str(error)
+
+async def run_import(
+    records: AsyncIterator[Tuple[List[int], object]],
+    parse: Callable[[object], object],
+    write_chunk: Callable[[List[Tuple[List[int], object]]], Awaitable[None]],
+    report: ImportReport,
+    chunk_size: int,
+) -> ImportReport:
+    """
+    Validate records as they stream in and hand them to `write_chunk` in batches of `chunk_size`.
+    Invalid records are reported and skipped; the writer reports what it stored or rejected.
+    """
+    batch = []
+    async for lines, payload in records:
+        if isinstance(payload, Exception):
+            report.fail(lines, describe_error(payload))
+            continue
+        try:
+            item = parse(payload)
+        except ValueError as e:
+            report.fail(lines, describe_error(e))
+            continue
+
+        batch.append((lines, item))
+        if len(batch) >= chunk_size:
+            await write_chunk(batch)
+            batch = []
+
+    if batch:
+        await write_chunk(batch)
+    return report
+
+class TicketImport:
+    """
+    What differs between importing pawn tickets and orders: the ticket and detail tables,
+    the request model's field names and the row builders. Everything else (validation of the
+    item list, customer resolution by phone, explicit vs generated ids, chunk retries) is shared.
+    """
+    def __init__(
+        self,
+        label: str,
+        ticket_model,
+        detail_model,
+        ids: IdAllocator,
+        id_field: str,
+        detail_field: str,
+        required_item_fields: Sequence[str],
+        ticket_row: Callable[[BaseModel], Dict],
+        detail_row: Callable[[BaseModel, BaseModel], Dict],
+        record_rollups: Callable[[Session, List[Tuple[BaseModel, List[Dict]]]], None],
+    ):
+        self.label = label  # "pawn" / "order", for row-report messages
+        self.ticket_model = ticket_model
+        self.detail_model = detail_model
+        self.ids = ids  # the ticket table's allocator, moved past explicit ids before they're inserted
+        self.id_field = id_field
+        self.detail_field = detail_field
+        self.required_item_fields = tuple(required_item_fields)
+        self.ticket_row = ticket_row  # ticket columns other than cus_id and the id
+        self.detail_row = detail_row  # detail columns other than the ticket id and prod_id
+        self.record_rollups = record_rollups  # (ticket, its detail rows) per written ticket
+
+    def check_items(self, info: BaseModel) -> BaseModel:
+        """Every item names a product once and has its required fields; raises ValueError"""
+        items = getattr(info, self.detail_field)
+        if not items:
+            raise ValueError(f"At least one {self.label} item is required")
+
+        for item in items:
+            if not item.prod_name:
+                raise ValueError(f"Product name is required for every {self.label} item.")
+            if any(getattr(item, field) is None for field in self.required_item_fields):
+                fields = ", ".join(self.required_item_fields[:-1]) + f" and {self.required_item_fields[-1]}"
+                raise ValueError(f"{fields} are required ({item.prod_name})")
+        duplicate = self.duplicate_product(items)
+        if duplicate:
+            raise ValueError(duplicate)
+        return info
+
+    def duplicate_product(self, items: Sequence[BaseModel]) -> Optional[str]:
+        """The error for the first product named more than once (in any case) in one ticket, if any"""
+        seen_products = set()
+        for item in items:
+            if item.prod_name.lower() in seen_products:
+                return f"Product '{item.prod_name}' appears more than once in the {self.label}"
+            seen_products.add(item.prod_name.lower())
+        return None
+
+    def import_chunk(self, chunk: List[Tuple[List[int], BaseModel]], db: Session, user_id: Optional[int], report: ImportReport):
+        """
+        Write one chunk of validated tickets in a single transaction.
+        If the chunk fails, it is retried ticket by ticket so only the offending rows are reported.
+        """
+        try:
+            written, rejected = self.insert_chunk(chunk, db, user_id)
+            db.commit()
+        except SQLAlchemyError as e:
+            db.rollback()
+            if len(chunk) == 1:
+                report.fail(chunk[0][0], f"Database error: {getattr(e, 'orig', None) or e}")
+                return
+            for ticket in chunk:
+                self.import_chunk([ticket], db, user_id, report)
+            return
+
+        for lines in written:
+            report.success(lines)
+        for lines, error in rejected:
+            report.fail(lines, error)
+
+    def insert_chunk(self, chunk: List[Tuple[List[int], BaseModel]], db: Session, user_id: Optional[int]):
+        """Set-based inserts for a chunk: one query per table instead of several per ticket"""
+        id_column = getattr(self.ticket_model, self.id_field)
+        rejected = []
+
+        # Imported ticket numbers must not exist yet (in the DB or earlier in this chunk)
+        explicit_ids = [getattr(info, self.id_field) for _, info in chunk if getattr(info, self.id_field)]
+        taken_ids = set()
+        if explicit_ids:
+            taken_ids = {ticket_id for (ticket_id,) in db.query(id_column).filter(id_column.in_(explicit_ids))}
+
+        accepted = []
+        for lines, info in chunk:
+            ticket_id = getattr(info, self.id_field)
+            if ticket_id:
+                if ticket_id in taken_ids:
+                    rejected.append((lines, f"{self.label.capitalize()} record with ID {ticket_id} already exists."))
+                    continue
+                taken_ids.add(ticket_id)
+            accepted.append((lines, info))
+
+        # Customers: one lookup by phone number, one batched insert for the new ones
+        customer_ids = {}
+        phones = {info.phone_number for _, info in accepted}
+        if phones:
+            for cus_id, phone_number, role in db.query(Account.cus_id, Account.phone_number, Account.role).filter(Account.phone_number.in_(phones)):
+                customer_ids[phone_number] = cus_id if role == 'user' else None
+
+        new_customers = {}
+        for _, info in accepted:
+            if info.phone_number not in customer_ids and info.phone_number not in new_customers:
+                new_customers[info.phone_number] = {
+                    "cus_name": info.cus_name,
+                    "address": info.address,
+                    "phone_number": info.phone_number,
+                    "role": 'user',
+                }
+        if new_customers:
+            created = db.execute(
+                insert(Account).returning(Account.cus_id, Account.phone_number),
+                list(new_customers.values()),
+            )
+            customer_ids.update({phone_number: cus_id for cus_id, phone_number in created})
+
+        ready = []
+        for lines, info in accepted:
+            if customer_ids[info.phone_number] is None:
+                rejected.append((lines, "Phone Number already registered"))
+                continue
+            ready.append((lines, info))
+
+        if not ready:
+            return [], rejected
+
+        # Products: one lookup and one batched insert for the whole chunk
+        product_ids = resolve_product_ids(
+            db,
+            [item.prod_name for _, info in ready for item in getattr(info, self.detail_field)],
+            user_id,
+        )
+
+        def row(info: BaseModel) -> Dict:
+            return dict(self.ticket_row(info), cus_id=customer_ids[info.phone_number])
+
+        # Ledger ticket numbers are kept as-is, the rest take ids from the sequence in order
+        numbered = [info for _, info in ready if getattr(info, self.id_field)]
+        if numbered:
+            # Before the insert, or /next-id could still reserve one of them until the import's final sync
+            self.ids.skip_past(db, max(getattr(info, self.id_field) for info in numbered))
+            db.execute(insert(self.ticket_model), [dict(row(info), **{self.id_field: getattr(info, self.id_field)}) for info in numbered])
+
+        unnumbered = [info for _, info in ready if not getattr(info, self.id_field)]
+        generated_ids = []
+        if unnumbered:
+            generated_ids = list(db.scalars(
+                insert(self.ticket_model).returning(id_column, sort_by_parameter_order=True),
+                [row(info) for info in unnumbered],
+            ))
+
+        generated = iter(generated_ids)
+        details = []
+        written = []
+        for _, info in ready:
+            ticket_id = getattr(info, self.id_field) or next(generated)
+            ticket_details = [
+                dict(self.detail_row(info, item), **{self.id_field: ticket_id, "prod_id": product_ids[item.prod_name.lower()]})
+                for item in getattr(info, self.detail_field)
+            ]
+            details.extend(ticket_details)
+            written.append((info, ticket_details))
+
+        # All detail rows of the chunk in one executemany
+        db.execute(insert(self.detail_model), details)
+        self.record_rollups(db, written)
+
+        return [lines for lines, _ in ready], rejected
+
+def sync_serial_sequence(db: Session, table: str, column: str):
+    """Move a serial column's sequence past explicitly imported ids so later inserts don't collide"""
+    sequence = db.execute(
+        text("SELECT pg_get_serial_sequence(:table, :column)"),
+        {"table": table, "column": column},
+    ).scalar()
+    if not sequence:
+        return
+    db.execute(
+        text(f"SELECT setval(:sequence, GREATEST((SELECT COALESCE(MAX({column}), 1) FROM {table}), (SELECT last_value FROM {sequence})))"),
+        {"sequence": sequence},
+    )
+    db.commit()
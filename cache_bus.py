@@ -0,0 +1,148 @@
+"""
+Cross-worker cache invalidation over Postgres LISTEN/NOTIFY.
+
+Writers call publish(db, topic, ...) inside their transaction; Postgres only delivers the
+notification once that transaction commits. Every worker runs one listener thread that
+dispatches notifications to the handlers registered with subscribe(). After a lost listener
+connection (notifications may have been missed) every on_reset handler runs instead.
+"""
+import json
+import logging
+import os
+import select
+import threading
+import uuid
+from collections import defaultdict
+from typing import Callable, Dict, List, Optional
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import NullPool
+
+from database import DATABASE_URL
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = "cache_invalidation"
+CACHE_BUS_ENABLED = os.getenv("CACHE_BUS_ENABLED", "true").lower() in ("1", "true", "yes")
+
+# Identifies this worker in the payload, for logs and debugging
+WORKER_ID = uuid.uuid4().hex[:12]
+
+_handlers: Dict[str, List[Callable[[dict], None]]] = defaultdict(list)
+_reset_handlers: List[Callable[[], None]] = []
+
+def subscribe(topic: str, handler: Callable[[dict], None]):
+    """Call `handler(payload)` for every committed publish() on `topic`, from any worker"""
+    _handlers[topic].append(handler)
+
+def on_reset(handler: Callable[[], None]):
+    """Call `handler()` when notifications may have been missed (listener reconnected)"""
+    _reset_handlers.append(handler)
+
+def publish(db: Session, topic: str, **payload):
+    """Queue an invalidation notice in `db`'s transaction; it is sent only if the transaction commits"""
+    if not CACHE_BUS_ENABLED or db.get_bind().dialect.name != "postgresql":
+        return
+    message = json.dumps({"topic": topic, "origin": WORKER_ID, **payload}, default=str)
+    db.execute(text("SELECT pg_notify(:channel, :message)"), {"channel": CHANNEL, "message": message})
+
+def dispatch(message: str):
+    try:
+        payload = json.loads(message)
+    except ValueError:
+        logger.warning(f"Ignoring malformed cache notification: {message!r}")
+        return
+    for handler in _handlers.get(payload.get("topic"), []):
+        try:
+            handler(payload)
+        except Exception as e:
+            logger.error(f"Cache invalidation handler failed for {payload.get('topic')}: {e}")
+
+def reset_all():
+    for handler in _reset_handlers:
+        try:
+            handler()
+        except Exception as e:
+            logger.error(f"Cache reset handler failed: {e}")
+
+class CacheListener(threading.Thread):
+    """Daemon thread holding one LISTEN connection per worker, reconnecting with backoff"""
+    def __init__(self, url: str = DATABASE_URL, poll_timeout: float = 5.0):
+        super().__init__(name="cache-bus-listener", daemon=True)
+        self.engine = create_engine(url, poolclass=NullPool)
+        self.poll_timeout = poll_timeout
+        self._stop_event = threading.Event()
+        self.connected = threading.Event()
+        self.received = 0
+
+    def stop(self):
+        self._stop_event.set()
+
+    def run(self):
+        backoff = 1.0
+        first_connect = True
+        while not self._stop_event.is_set():
+            try:
+                connection = self.engine.raw_connection()
+                try:
+                    dbapi = connection.driver_connection
+                    dbapi.autocommit = True
+                    with dbapi.cursor() as cursor:
+                        cursor.execute(f"LISTEN {CHANNEL}")
+                    self.connected.set()
+                    if not first_connect:
+                        reset_all()  # anything published while disconnected was lost
+                    first_connect = False
+                    backoff = 1.0
+                    self._listen(dbapi)
+                finally:
+                    self.connected.clear()
+                    connection.close()
+            except Exception as e:
+                logger.error(f"Cache bus listener disconnected: {e}; retrying in {backoff:.0f}s")
+                self._stop_event.wait(backoff)
+                backoff = min(backoff * 2, 60.0)
+
+    def _listen(self, dbapi):
+        while not self._stop_event.is_set():
+            readable, _, _ = select.select([dbapi], [], [], self.poll_timeout)
+            if not readable:
+                continue
+            dbapi.poll()
+            while dbapi.notifies:
+                notify = dbapi.notifies.pop(0)
+                self.received += 1
+                dispatch(notify.payload)
+
+_listener: Optional[CacheListener] = None
+
+def start(connect_timeout: float = 5.0):
+    """Start this worker's listener thread (Postgres only) and wait briefly for it to connect"""
+    global _listener
+    if not CACHE_BUS_ENABLED or not DATABASE_URL.startswith(("postgres", "postgresql")) or _listener is not None:
+        return
+    _listener = CacheListener()
+    _listener.start()
+    # Caches warmed after this point can't miss a notification sent while the listener connects
+    if not _listener.connected.wait(connect_timeout):
+        logger.warning("Cache bus listener is not connected yet; it keeps retrying in the background")
+    logger.info(f"🔔 Cache bus listening on '{CHANNEL}' (worker {WORKER_ID})")
+
+def stop(timeout: float = 5.0):
+    global _listener
+    if _listener is None:
+        return
+    _listener.stop()
+    _listener.join(timeout)
+    _listener.engine.dispose()
+    _listener = None
+
+def status() -> dict:
+    return {
+        "enabled": CACHE_BUS_ENABLED,
+        "worker": WORKER_ID,
+        "connected": bool(_listener and _listener.connected.is_set()),
+        "received": _listener.received if _listener else 0,
+        "topics": sorted(_handlers),
+    }
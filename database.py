@@ -1,7 +1,10 @@
 import os
-from sqlalchemy import create_engine
+import threading
+import time
+from sqlalchemy import create_engine, exc
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -16,10 +19,107 @@ if not DATABASE_URL:
 # Add this print statement always, even if DATABASE_URL is set
 print(f"DEBUG: Attempting to connect with DATABASE_URL: '{DATABASE_URL}'") 
 
+# Set ASYNC_DATABASE=true to serve the routers from an asyncio engine (asyncpg)
+# instead of the blocking psycopg2 engine.
+ASYNC_DATABASE = os.getenv("ASYNC_DATABASE", "false").lower() in ("1", "true", "yes")
+
+# Where the pawn/order listings nest products under their ticket: "python" groups the flat
+# join rows in the app, "json" has Postgres build each ticket's products with json_agg.
+LISTING_QUERY_ENGINE = os.getenv("LISTING_QUERY_ENGINE", "python").lower()
+
+def to_async_url(url: str) -> str:
+    """Rewrite a postgresql:// URL to use the asyncpg driver"""
+    scheme, separator, rest = url.partition("://")
+    if scheme in ("postgres", "postgresql", "postgresql+psycopg2"):
+        scheme = "postgresql+asyncpg"
+    return f"{scheme}{separator}{rest}"
+
+# ========== Connection Pool Sizing ==========
+# "auto" splits the server's max_connections (minus a reserve for admin/migration
+# sessions) across every uvicorn worker and engine, so the whole deployment can never
+# ask Postgres for more connections than it accepts. "fixed" uses DB_POOL_SIZE/DB_MAX_OVERFLOW as-is.
+DB_POOL_MODE = os.getenv("DB_POOL_MODE", "auto").lower()
+DB_WORKERS = int(os.getenv("WEB_CONCURRENCY", "1"))
+DB_MAX_CONNECTIONS = int(os.getenv("DB_MAX_CONNECTIONS", "100"))
+DB_RESERVED_CONNECTIONS = int(os.getenv("DB_RESERVED_CONNECTIONS", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+
+def pool_limits(engines_per_worker: int = 1):
+    """Return (pool_size, max_overflow) for one engine in one worker process"""
+    if DB_POOL_MODE == "fixed":
+        return int(os.getenv("DB_POOL_SIZE", "10")), int(os.getenv("DB_MAX_OVERFLOW", "10"))
+
+    available = max(DB_MAX_CONNECTIONS - DB_RESERVED_CONNECTIONS, 1)
+    budget = max(available // (max(DB_WORKERS, 1) * engines_per_worker), 1)
+    # Keep half of the budget as persistent connections, the rest as burst overflow
+    pool_size = max(budget // 2, 1)
+    return pool_size, budget - pool_size
+
+# The async engine shares the worker's budget with the sync engine (startup tasks still use it)
+ENGINES_PER_WORKER = 2 if ASYNC_DATABASE else 1
+POOL_SIZE, MAX_OVERFLOW = pool_limits(ENGINES_PER_WORKER)
+
+# ========== Pool Metrics ==========
+class PoolStats:
+    """Thread-safe counters for pool checkouts, wait time and checkout timeouts"""
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    def record(self, waited: float, timed_out: bool = False):
+        with self._lock:
+            if timed_out:
+                self.timeouts += 1
+            else:
+                self.checkouts += 1
+            self.wait_total += waited
+            self.wait_max = max(self.wait_max, waited)
+
+    def snapshot(self, pool, max_overflow: int) -> dict:
+        """`max_overflow` as the engine was configured with (the pool doesn't expose it publicly)"""
+        with self._lock:
+            attempts = self.checkouts + self.timeouts
+            return {
+                "pool_size": pool.size(),
+                "max_overflow": max_overflow,
+                "checked_out": pool.checkedout(),
+                "checked_in": pool.checkedin(),
+                "overflow": max(pool.overflow(), 0),
+                "checkouts": self.checkouts,
+                "checkout_timeouts": self.timeouts,
+                "wait_seconds_total": round(self.wait_total, 6),
+                "wait_seconds_avg": round(self.wait_total / attempts, 6) if attempts else 0.0,
+                "wait_seconds_max": round(self.wait_max, 6),
+            }
+
+class _TimedCheckout:
+    """Pool mixin timing how long each checkout waits for a free connection"""
+    stats: PoolStats
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except exc.TimeoutError:
+            self.stats.record(time.perf_counter() - started, timed_out=True)
+            raise
+        self.stats.record(time.perf_counter() - started)
+        return connection
+
+class InstrumentedQueuePool(_TimedCheckout, QueuePool):
+    stats = PoolStats()
+
+class InstrumentedAsyncQueuePool(_TimedCheckout, AsyncAdaptedQueuePool):
+    stats = PoolStats()
+
 engine = create_engine( DATABASE_URL, 
-                        pool_size=50,  
-                        max_overflow=60, 
-                        pool_timeout=70,  
+                        poolclass=InstrumentedQueuePool,
+                        pool_size=POOL_SIZE,  
+                        max_overflow=MAX_OVERFLOW, 
+                        pool_timeout=DB_POOL_TIMEOUT,  
                         pool_recycle=1800,
                         pool_pre_ping=True
                     )
@@ -27,9 +127,45 @@ Base = declarative_base()
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 def get_db():
+    """Request-scoped session: opened per request and closed once the route has finished with it"""
     db = SessionLocal()
     try:
-        return db
+        yield db
     finally:
         db.close()
-        
\ No newline at end of file
+
+# Async engine is only built when enabled so sync deployments don't need asyncpg
+async_engine = None
+AsyncSessionLocal = None
+
+if ASYNC_DATABASE:
+    from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+    async_engine = create_async_engine( to_async_url(DATABASE_URL),
+                                        poolclass=InstrumentedAsyncQueuePool,
+                                        pool_size=POOL_SIZE,
+                                        max_overflow=MAX_OVERFLOW,
+                                        pool_timeout=DB_POOL_TIMEOUT,
+                                        pool_recycle=1800,
+                                        pool_pre_ping=True
+                                    )
+    AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+async def get_async_db():
+    if AsyncSessionLocal is None:
+        raise RuntimeError("Async database mode is disabled. Set ASYNC_DATABASE=true to enable it.")
+    async with AsyncSessionLocal() as db:
+        yield db
+
+def pool_status() -> dict:
+    """Current pool pressure for every engine in this worker process"""
+    status = {
+        "mode": DB_POOL_MODE,
+        "workers": DB_WORKERS,
+        "max_connections": DB_MAX_CONNECTIONS,
+        "pid": os.getpid(),
+        "sync": InstrumentedQueuePool.stats.snapshot(engine.pool, MAX_OVERFLOW),
+    }
+    if async_engine is not None:
+        status["async"] = InstrumentedAsyncQueuePool.stats.snapshot(async_engine.sync_engine.pool, MAX_OVERFLOW)
+    return status
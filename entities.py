@@ -1,4 +1,4 @@
-from sqlalchemy import Column, DateTime, Enum, ForeignKey, Integer, String, Float
+from sqlalchemy import Column, Date, DateTime, Enum, ForeignKey, Index, Integer, String, Float, func
 from sqlalchemy.orm import relationship
 from datetime import datetime
 
@@ -8,8 +8,10 @@ class OrderDetail(Base):
     __tablename__ = "order_details"
 
     order_id = Column(Integer, ForeignKey("orders.order_id"), primary_key = True)
-    prod_id = Column(Integer, ForeignKey("products.prod_id"), primary_key = True)
-    order_weight = Column(String, nullable=False)
+    prod_id = Column(Integer, ForeignKey("products.prod_id"), primary_key = True, index = True)
+    order_weight = Column(String, nullable=False)  # as typed, for display
+    order_weight_grams = Column(Float, nullable=True)  # parsed from order_weight at write time (weights.py)
+    order_weight_unit = Column(String(16), nullable=True)
     order_amount = Column(Integer, nullable=True)
     product_sell_price = Column(Float, nullable=False)
     product_labor_cost = Column(Float, nullable=False)
@@ -24,8 +26,10 @@ class PawnDetail(Base):
     __tablename__ = "pawn_details"
 
     pawn_id = Column(Integer, ForeignKey("pawns.pawn_id"), primary_key = True)
-    prod_id = Column(Integer, ForeignKey("products.prod_id"), primary_key = True)
-    pawn_weight = Column(String, nullable=False)
+    prod_id = Column(Integer, ForeignKey("products.prod_id"), primary_key = True, index = True)
+    pawn_weight = Column(String, nullable=False)  # as typed, for display
+    pawn_weight_grams = Column(Float, nullable=True)  # parsed from pawn_weight at write time (weights.py)
+    pawn_weight_unit = Column(String(16), nullable=True)
     pawn_amount = Column(Integer, nullable=False)
     pawn_unit_price = Column(Float, nullable=False)
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
@@ -41,7 +45,9 @@ class Account(Base):
     address = Column(String, nullable = True)
     phone_number = Column(String, unique = True, nullable = False)
     password = Column(String, nullable = True, default=None)
-    role = Column(Enum("admin", "user", name = "role"), default = 'user')
+    role = Column(Enum("admin", "user", name = "role"), default = 'user', index = True)
+    # Refresh tokens carry the version they were issued at; bumping it revokes them all
+    token_version = Column(Integer, nullable = False, default = 0, server_default = "0")
     created_at = Column(DateTime, default = datetime.utcnow, nullable = False)
     updated_at = Column(DateTime, default = datetime.utcnow, onupdate = datetime.utcnow, nullable = False)
     
@@ -66,25 +72,132 @@ class Product(Base):
     
 class Order(Base):
     __tablename__ = "orders"
+    __table_args__ = (
+        Index("ix_orders_cus_id_order_id", "cus_id", "order_id"),
+    )
 
     order_id = Column(Integer, primary_key=True, index=True)
     cus_id = Column(Integer, ForeignKey("accounts.cus_id"))
     order_deposit = Column(Float, default=0, nullable=False)
     order_date = Column(DateTime, default = datetime.utcnow, nullable = False)
+    # Totals of the order's lines, written with them (see totals.py); NULL until backfilled
+    item_count = Column(Integer, nullable = True)
+    total_amount = Column(Float, nullable = True)
+    total_value = Column(Float, nullable = True)
+    total_cost = Column(Float, nullable = True)
     
     order_account = relationship("Account", foreign_keys=[cus_id], back_populates="account_order")
     order_product_detail = relationship("Product", secondary=OrderDetail.__table__, back_populates="product_order_detail")
     
 class Pawn(Base):
     __tablename__ = "pawns"
+    __table_args__ = (
+        Index("ix_pawns_cus_id_pawn_id", "cus_id", "pawn_id"),
+    )
 
     pawn_id = Column(Integer, primary_key=True, index=True)
     cus_id = Column(Integer, ForeignKey("accounts.cus_id"))
     pawn_deposit = Column(Float, default=0, nullable=False)
     pawn_date = Column(DateTime, default=datetime.utcnow, nullable=False)
-    pawn_expire_date = Column(DateTime, nullable=False)
+    pawn_expire_date = Column(DateTime, nullable=False, index=True)
+    # Totals of the pawn's lines, written with them (see totals.py); NULL until backfilled
+    item_count = Column(Integer, nullable=True)
+    total_amount = Column(Integer, nullable=True)
+    total_weight = Column(Float, nullable=True)
+    total_value = Column(Float, nullable=True)
+    # Ledger state (routes/ledger): pawn_deposit is the principal lent
+    interest_rate = Column(Float, nullable=True)  # monthly %, NULL uses PAWN_INTEREST_RATE
+    interest_paid_through = Column(DateTime, nullable=True)  # interest accrues from here (or pawn_date)
+    principal_paid = Column(Float, nullable=False, default=0, server_default="0")
+    redeemed_at = Column(DateTime, nullable=True)
 
     pawn_account = relationship("Account", foreign_keys=[cus_id], back_populates="account_pawn")
     pawn_product_detail = relationship("Product", secondary=PawnDetail.__table__, back_populates="product_pawn_detail")
-    
-    
\ No newline at end of file
+
+class PawnDueStatus(Base):
+    """Due/overdue state of pawns near their expiry date, refreshed by the scheduler (scheduler.py)"""
+    __tablename__ = "pawn_due_status"
+
+    pawn_id = Column(Integer, ForeignKey("pawns.pawn_id", ondelete="CASCADE"), primary_key=True)
+    cus_id = Column(Integer, ForeignKey("accounts.cus_id", ondelete="CASCADE"), nullable=False)
+    pawn_expire_date = Column(DateTime, nullable=False, index=True)
+    status = Column(Enum("due", "overdue", name="pawn_due_state"), nullable=False)
+    refreshed_at = Column(DateTime, nullable=False)
+
+class PawnPayment(Base):
+    """Money received against a pawn: accrued interest first, the rest reduces the principal"""
+    __tablename__ = "pawn_payments"
+
+    payment_id = Column(Integer, primary_key=True)
+    pawn_id = Column(Integer, ForeignKey("pawns.pawn_id", ondelete="CASCADE"), nullable=False, index=True)
+    amount = Column(Float, nullable=False)
+    interest_paid = Column(Float, nullable=False)
+    principal_paid = Column(Float, nullable=False)
+    paid_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    created_by = Column(Integer, ForeignKey("accounts.cus_id"), nullable=True)
+
+class PawnRenewal(Base):
+    """Extension of a pawn's expiry date, settling the interest accrued so far"""
+    __tablename__ = "pawn_renewals"
+
+    renewal_id = Column(Integer, primary_key=True)
+    pawn_id = Column(Integer, ForeignKey("pawns.pawn_id", ondelete="CASCADE"), nullable=False, index=True)
+    previous_expire_date = Column(DateTime, nullable=False)
+    new_expire_date = Column(DateTime, nullable=False)
+    interest_paid = Column(Float, nullable=False)
+    renewed_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    created_by = Column(Integer, ForeignKey("accounts.cus_id"), nullable=True)
+
+class PawnRedemption(Base):
+    """The customer paid the pawn off and took the items back (at most one per pawn)"""
+    __tablename__ = "pawn_redemptions"
+
+    pawn_id = Column(Integer, ForeignKey("pawns.pawn_id", ondelete="CASCADE"), primary_key=True)
+    principal_paid = Column(Float, nullable=False)
+    interest_paid = Column(Float, nullable=False)
+    total_paid = Column(Float, nullable=False)
+    redeemed_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    created_by = Column(Integer, ForeignKey("accounts.cus_id"), nullable=True)
+
+class PawnAccrual(Base):
+    """Interest accrued on each active pawn as of a closing date (month-end accrual run)"""
+    __tablename__ = "pawn_accruals"
+
+    as_of = Column(Date, primary_key=True)
+    pawn_id = Column(Integer, ForeignKey("pawns.pawn_id", ondelete="CASCADE"), primary_key=True)
+    principal = Column(Float, nullable=False)
+    interest = Column(Float, nullable=False)
+
+class DailyRollup(Base):
+    """Pawn and order figures per calendar day, incremented on every create (routes/report/rollups.py)"""
+    __tablename__ = "daily_rollups"
+
+    day = Column(Date, primary_key=True)
+    pawn_count = Column(Integer, nullable=False, default=0)
+    pawn_principal = Column(Float, nullable=False, default=0)
+    pawn_value = Column(Float, nullable=False, default=0)
+    order_count = Column(Integer, nullable=False, default=0)
+    order_revenue = Column(Float, nullable=False, default=0)
+    order_labor_cost = Column(Float, nullable=False, default=0)
+    order_buy_cost = Column(Float, nullable=False, default=0)
+
+class DailyProductRollup(Base):
+    """Pawn and order figures per calendar day and product"""
+    __tablename__ = "daily_product_rollups"
+    __table_args__ = (
+        Index("ix_daily_product_rollups_prod_id_day", "prod_id", "day"),
+    )
+
+    day = Column(Date, primary_key=True)
+    prod_id = Column(Integer, ForeignKey("products.prod_id", ondelete="CASCADE"), primary_key=True)
+    pawn_lines = Column(Integer, nullable=False, default=0)
+    pawn_amount = Column(Integer, nullable=False, default=0)
+    pawn_value = Column(Float, nullable=False, default=0)
+    order_lines = Column(Integer, nullable=False, default=0)
+    order_revenue = Column(Float, nullable=False, default=0)
+    order_labor_cost = Column(Float, nullable=False, default=0)
+    order_buy_cost = Column(Float, nullable=False, default=0)
+
+# Functional indexes (schema changes ship as Alembic migrations under migrations/versions)
+Index("ix_accounts_lower_cus_name", func.lower(Account.cus_name))
+Index("uq_products_lower_prod_name", func.lower(Product.prod_name), unique=True)
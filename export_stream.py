@@ -0,0 +1,53 @@
+import json
+from typing import Callable, Iterator
+
+from fastapi.responses import StreamingResponse
+from sqlalchemy.orm import Session
+
+from database import SessionLocal
+
+# Records are written in groups so the response isn't split into thousands of tiny chunks
+RECORDS_PER_CHUNK = 200
+
+def _dump(record: dict) -> str:
+    return json.dumps(record, default=str, ensure_ascii=False)
+
+def stream_records(iter_records: Callable[[Session], Iterator[dict]], file_format: str) -> Iterator[str]:
+    """
+    Serialize records one at a time as NDJSON lines or as one chunked JSON array.
+    Opens its own session so it stays valid for as long as the response is being sent.
+    """
+    db = SessionLocal()
+    try:
+        buffer = []
+        first = True
+        if file_format == "json":
+            yield "["
+
+        for record in iter_records(db):
+            if file_format == "json":
+                buffer.append(("" if first else ",") + _dump(record))
+                first = False
+            else:
+                buffer.append(_dump(record) + "\n")
+
+            if len(buffer) >= RECORDS_PER_CHUNK:
+                yield "".join(buffer)
+                buffer = []
+
+        if buffer:
+            yield "".join(buffer)
+        if file_format == "json":
+            yield "]"
+    finally:
+        db.close()
+
+def export_response(iter_records: Callable[[Session], Iterator[dict]], file_format: str, filename: str) -> StreamingResponse:
+    """StreamingResponse for a full export in constant memory"""
+    media_type = "application/json" if file_format == "json" else "application/x-ndjson"
+    extension = "json" if file_format == "json" else "ndjson"
+    return StreamingResponse(
+        stream_records(iter_records, file_format),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}.{extension}"'},
+    )
@@ -0,0 +1,135 @@
+"""
+Reserved ids for tickets and records, handed out before the row exists.
+
+Each allocator draws blocks of ID_BLOCK_SIZE values from the table's serial sequence and serves
+them from memory, so reserving an id costs one nextval round-trip per block and two callers
+can never be given the same number. The row can later be inserted with the reserved id: the
+sequence never returns it again. Ids that are reserved but never used leave gaps.
+Imports move a sequence past their explicit ids with skip_past(), and discard_everywhere() has
+every worker drop its block.
+"""
+import os
+import threading
+from collections import deque
+from typing import Dict, Optional
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+import cache_bus
+
+ID_BLOCK_SIZE = int(os.getenv("ID_BLOCK_SIZE", "20"))
+
+class IdAllocator:
+    """Per-worker block of values prefetched from `table.column`'s serial sequence"""
+    def __init__(self, table: str, column: str, block_size: int = ID_BLOCK_SIZE):
+        self.table = table
+        self.column = column
+        self.block_size = max(block_size, 1)
+        self._lock = threading.Lock()
+        self._block: deque = deque()
+        self._sequence: Optional[str] = None
+        self.reserved = 0
+        self.refills = 0
+
+    def _sequence_name(self, db: Session) -> Optional[str]:
+        if self._sequence is None:
+            self._sequence = db.execute(
+                text("SELECT pg_get_serial_sequence(:table, :column)"),
+                {"table": self.table, "column": self.column},
+            ).scalar()
+        return self._sequence
+
+    def _is_postgres(self, db: Session) -> bool:
+        return db.get_bind().dialect.name == "postgresql"
+
+    def reserve(self, db: Session) -> int:
+        """A fresh id nobody else has been or will be given"""
+        if not self._is_postgres(db):
+            # No sequences to draw from (SQLite); best effort as before
+            return (db.execute(text(f"SELECT MAX({self.column}) FROM {self.table}")).scalar() or 0) + 1
+
+        with self._lock:
+            if not self._block:
+                sequence = self._sequence_name(db)
+                self._block.extend(db.execute(
+                    text("SELECT nextval(CAST(:sequence AS regclass)) FROM generate_series(1, :count)"),
+                    {"sequence": sequence, "count": self.block_size},
+                ).scalars())
+                self.refills += 1
+            self.reserved += 1
+            return self._block.popleft()
+
+    def was_issued(self, db: Session, value: int) -> bool:
+        """
+        True if the sequence has already handed `value` out, so inserting it explicitly can't
+        collide with an id generated later. Elsewhere than Postgres every positive id is allowed.
+        """
+        if value < 1:
+            return False
+        if not self._is_postgres(db):
+            return True
+        sequence = self._sequence_name(db)
+        last_value, is_called = db.execute(text(f"SELECT last_value, is_called FROM {sequence}")).one()
+        return value < last_value or (value == last_value and is_called)
+
+    def skip_past(self, db: Session, value: int):
+        """
+        Move the sequence to at least `value` before it is inserted explicitly (an import), so
+        neither a reservation nor a generated id can be given it later. The move itself is not
+        undone by a rollback; every worker drops its block once `db` commits.
+        """
+        if not self._is_postgres(db):
+            return
+        sequence = self._sequence_name(db)
+        db.execute(
+            text(f"SELECT setval(CAST(:sequence AS regclass), GREATEST(:value, (SELECT last_value FROM {sequence})))"),
+            {"sequence": sequence, "value": value},
+        )
+        self.discard_everywhere(db)
+
+    def discard(self):
+        """Drop the prefetched block (e.g. after the sequence was moved by an import)"""
+        with self._lock:
+            self._block.clear()
+
+    def discard_everywhere(self, db: Session):
+        """Drop the block here now, and in every worker once `db` commits"""
+        self.discard()
+        cache_bus.publish(db, "id_allocators", table=self.table)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "block_size": self.block_size,
+                "remaining": len(self._block),
+                "reserved": self.reserved,
+                "refills": self.refills,
+            }
+
+pawn_ids = IdAllocator("pawns", "pawn_id")
+order_ids = IdAllocator("orders", "order_id")
+product_ids = IdAllocator("products", "prod_id")
+customer_ids = IdAllocator("accounts", "cus_id")
+
+ALLOCATORS: Dict[str, IdAllocator] = {
+    "pawns": pawn_ids,
+    "orders": order_ids,
+    "products": product_ids,
+    "accounts": customer_ids,
+}
+
+def _discard_block(payload: dict):
+    allocator = ALLOCATORS.get(payload.get("table"))
+    if allocator:
+        allocator.discard()
+
+def _discard_all():
+    for allocator in ALLOCATORS.values():
+        allocator.discard()
+
+cache_bus.subscribe("id_allocators", _discard_block)
+cache_bus.on_reset(_discard_all)
+
+def allocator_stats() -> dict:
+    return {name: allocator.stats() for name, allocator in ALLOCATORS.items()}
@@ -3,17 +3,38 @@ import os
 from contextlib import asynccontextmanager
 
 from fastapi import FastAPI, HTTPException
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.middleware.trustedhost import TrustedHostMiddleware
 from fastapi.responses import JSONResponse
 
-import entities
-from database import engine, SessionLocal
+from database import async_engine, SessionLocal, ASYNC_DATABASE, pool_status
+from migrate import RUN_MIGRATIONS_ON_STARTUP, upgrade_database
+from cache import cache_stats
+from id_allocator import allocator_stats
+import cache_bus
+import scheduler
+from routes.oauth2 import hashing
+from routes.product.repository import product_catalog
 import routes.oauth2.controller as authController
-import routes.product.controller as productController
-import routes.client.controller as orderClientController
-import routes.order.controller as orderController
-import routes.pawn.controller as pawncontroller
+
+# Serve the staff routers from the asyncio engine when ASYNC_DATABASE is enabled
+if ASYNC_DATABASE:
+    import routes.product.async_controller as productController
+    import routes.client.async_controller as orderClientController
+    import routes.order.async_controller as orderController
+    import routes.pawn.async_controller as pawncontroller
+    import routes.search.async_controller as searchController
+    import routes.ledger.async_controller as ledgerController
+    import routes.report.async_controller as reportController
+else:
+    import routes.product.controller as productController
+    import routes.client.controller as orderClientController
+    import routes.order.controller as orderController
+    import routes.pawn.controller as pawncontroller
+    import routes.search.controller as searchController
+    import routes.ledger.controller as ledgerController
+    import routes.report.controller as reportController
 
 # Configure logging
 logging.basicConfig(
@@ -80,26 +101,51 @@ def create_default_admin_user():
     finally:
         db.close()
 
+def load_product_catalog():
+    db = SessionLocal()
+    try:
+        product_catalog.load(db)
+        logger.info(f"📦 Product catalog loaded ({len(product_catalog.products)} products)")
+    except Exception as e:
+        logger.error(f"❌ Failed to load product catalog: {e}")
+    finally:
+        db.close()
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Startup
     logger.info("Starting up Lab API...")
     
-    # Create database tables (consider using Alembic migrations in production)
-    try:
-        entities.Base.metadata.create_all(engine)
-        logger.info("Database tables created successfully")
-    except Exception as e:
-        logger.error(f"Failed to create database tables: {e}")
-        raise
+    # Bring the schema up to date (Alembic migrations under migrations/versions)
+    if RUN_MIGRATIONS_ON_STARTUP:
+        try:
+            await run_in_threadpool(upgrade_database)
+            logger.info("Database migrations applied successfully")
+        except Exception as e:
+            logger.error(f"Failed to apply database migrations: {e}")
+            raise
     
     # Create default admin user
     create_default_admin_user()
+
+    # Listen for cache invalidations from the other workers before warming any cache
+    await run_in_threadpool(cache_bus.start)
+
+    # Warm the product catalog so the first line items and GET /product don't pay for it
+    await run_in_threadpool(load_product_catalog)
+
+    # Background jobs (only the worker holding the scheduler lock runs each tick)
+    scheduler.start()
     
     yield
     
     # Shutdown
     logger.info("Shutting down Lab API...")
+    scheduler.stop()
+    cache_bus.stop()
+    hashing.shutdown()
+    if async_engine is not None:
+        await async_engine.dispose()
 
 app = FastAPI(
     title="Pawn Shop Backend API",
@@ -152,6 +198,35 @@ async def health_check():
         logger.error(f"Health check failed: {e}")
         raise HTTPException(status_code=503, detail="Service unavailable")
 
+# Connection pool pressure for this worker (each uvicorn worker has its own pools)
+@app.get("/health/db-pool", tags=["Health"])
+async def db_pool_health():
+    """Checked-out connections, overflow, checkout wait time and timeouts"""
+    return pool_status()
+
+# In-process cache effectiveness for this worker
+@app.get("/health/cache", tags=["Health"])
+async def cache_health():
+    """Size, hit/miss counters and evictions of each in-process cache, and the prefetched id blocks"""
+    return {
+        **cache_stats(),
+        "product_catalog": product_catalog.stats(),
+        "cache_bus": cache_bus.status(),
+        "id_allocators": allocator_stats(),
+    }
+
+# Login hashing pressure for this worker
+@app.get("/health/auth-hashing", tags=["Health"])
+async def auth_hashing_health():
+    """bcrypt cost, pool size, queued/running checks, queue wait and hashing time"""
+    return hashing.hash_stats.snapshot()
+
+# Background job state for this worker
+@app.get("/health/scheduler", tags=["Health"])
+async def scheduler_health():
+    """Whether this worker's scheduler runs, how many ticks it led, and each job's last run"""
+    return scheduler.status()
+
 # Root endpoint
 @app.get("/", tags=["Root"])
 async def root():
@@ -171,6 +246,9 @@ app.include_router(productController.router, prefix="/api/v1/products", tags=["P
 app.include_router(orderClientController.router, prefix="/api/v1/clients", tags=["Clients"])
 app.include_router(orderController.router, prefix="/api/v1/orders", tags=["Orders"])
 app.include_router(pawncontroller.router, prefix="/api/v1/pawn", tags=["Pawn"])
+app.include_router(searchController.router, prefix="/api/v1/search", tags=["Search"])
+app.include_router(ledgerController.router, prefix="/api/v1/ledger", tags=["Ledger"])
+app.include_router(reportController.router, prefix="/api/v1/report", tags=["Report"])
 
 # Global exception handler
 @app.exception_handler(Exception)
@@ -0,0 +1,88 @@
+"""
+Maintenance commands.
+
+    python manage.py backfill-totals          # fill pawn/order totals that are still NULL
+    python manage.py backfill-totals --all    # recompute every pawn/order total
+    python manage.py normalize-weights        # parse typed weights still missing grams/unit
+    python manage.py normalize-weights --all  # re-parse every pawn/order weight
+    python manage.py accrue [--as-of DATE]    # month-end interest accrual of every active pawn
+    python manage.py rebuild-rollups          # recompute the daily reporting rollups from the tickets
+"""
+import argparse
+import logging
+from datetime import date, datetime
+
+from database import SessionLocal
+from totals import TOTALS_BATCH_SIZE, normalize_stored_weights, refresh_order_totals, refresh_pawn_totals
+from routes.ledger.interest import record_accruals
+from routes.report.rollups import rebuild_rollups
+
+logger = logging.getLogger(__name__)
+
+def backfill_totals(recompute_all: bool = False, batch_size: int = TOTALS_BATCH_SIZE):
+    db = SessionLocal()
+    try:
+        pawns = refresh_pawn_totals(db, only_missing=not recompute_all, batch_size=batch_size)
+        logger.info(f"✅ Totals written for {pawns} pawn(s)")
+        orders = refresh_order_totals(db, only_missing=not recompute_all, batch_size=batch_size)
+        logger.info(f"✅ Totals written for {orders} order(s)")
+    finally:
+        db.close()
+
+def normalize_weights(recompute_all: bool = False, batch_size: int = TOTALS_BATCH_SIZE):
+    db = SessionLocal()
+    try:
+        counts = normalize_stored_weights(db, only_missing=not recompute_all, batch_size=batch_size)
+    finally:
+        db.close()
+    logger.info(f"✅ Weights normalized on {counts['pawns']} pawn(s) and {counts['orders']} order(s)")
+
+def accrue(as_of: date):
+    db = SessionLocal()
+    try:
+        summary = record_accruals(db, as_of)
+    finally:
+        db.close()
+    logger.info(
+        f"✅ Accrued {summary['interest_accrued']} interest on {summary['active_loans']} active pawn(s) "
+        f"({summary['principal_outstanding']} principal) as of {summary['as_of']}"
+    )
+
+def rebuild():
+    db = SessionLocal()
+    try:
+        counts = rebuild_rollups(db)
+    finally:
+        db.close()
+    logger.info(f"✅ Rollups rebuilt: {counts['days']} day(s), {counts['product_days']} product-day(s)")
+
+def main():
+    parser = argparse.ArgumentParser(description="Pawn shop maintenance commands")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    backfill = commands.add_parser("backfill-totals", help="Compute the denormalized pawn/order totals")
+    backfill.add_argument("--all", action="store_true", help="Recompute every ticket, not only the missing ones")
+    backfill.add_argument("--batch-size", type=int, default=TOTALS_BATCH_SIZE)
+
+    weights = commands.add_parser("normalize-weights", help="Fill the grams/unit weight columns from the typed weights")
+    weights.add_argument("--all", action="store_true", help="Re-parse every line, not only the missing ones")
+    weights.add_argument("--batch-size", type=int, default=TOTALS_BATCH_SIZE)
+
+    accrual = commands.add_parser("accrue", help="Record every active pawn's accrued interest in pawn_accruals")
+    accrual.add_argument("--as-of", type=date.fromisoformat, default=None, help="Closing date, YYYY-MM-DD (default: today)")
+
+    commands.add_parser("rebuild-rollups", help="Recompute daily_rollups and daily_product_rollups from scratch")
+
+    args = parser.parse_args()
+    if args.command == "backfill-totals":
+        backfill_totals(args.all, args.batch_size)
+    elif args.command == "normalize-weights":
+        normalize_weights(args.all, args.batch_size)
+    elif args.command == "accrue":
+        accrue(args.as_of or datetime.utcnow().date())
+    elif args.command == "rebuild-rollups":
+        rebuild()
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s %(message)s")
+    main()
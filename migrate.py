@@ -0,0 +1,110 @@
+"""
+Schema migrations.
+
+    python migrate.py                 # upgrade to the latest revision
+    python migrate.py check-indexes   # EXPLAIN the hot lookups and fail if one can't use an index
+
+Plain `alembic upgrade head` / `alembic revision -m "..."` work too (see alembic.ini).
+"""
+import json
+import logging
+import os
+import sys
+from pathlib import Path
+
+from alembic import command
+from alembic.config import Config
+from sqlalchemy import select, text, func
+
+from database import engine, SessionLocal
+from entities import Account, Order, OrderDetail, Pawn, PawnDetail, PawnDueStatus, Product
+
+logger = logging.getLogger(__name__)
+
+RUN_MIGRATIONS_ON_STARTUP = os.getenv("RUN_MIGRATIONS_ON_STARTUP", "true").lower() in ("1", "true", "yes")
+
+# Arbitrary constant shared by every worker so only one of them migrates at a time
+MIGRATION_LOCK_ID = 724_031_001
+
+ALEMBIC_INI = Path(__file__).resolve().parent / "alembic.ini"
+
+def alembic_config(connection=None) -> Config:
+    config = Config(str(ALEMBIC_INI))
+    config.attributes["configure_logger"] = False
+    if connection is not None:
+        config.attributes["connection"] = connection
+    return config
+
+def upgrade_database():
+    """Upgrade to head while holding an advisory lock, so workers starting together don't race"""
+    with engine.connect() as connection:
+        connection.execute(text("SELECT pg_advisory_lock(:id)"), {"id": MIGRATION_LOCK_ID})
+        try:
+            command.upgrade(alembic_config(connection), "head")
+            connection.commit()
+        except Exception:
+            connection.rollback()
+            raise
+        finally:
+            connection.execute(text("SELECT pg_advisory_unlock(:id)"), {"id": MIGRATION_LOCK_ID})
+            connection.commit()
+
+# (description, table expected to be read through an index, statement)
+INDEXED_LOOKUPS = [
+    ("pawns by customer", "pawns", select(Pawn.pawn_id).where(Pawn.cus_id == 1)),
+    ("orders by customer", "orders", select(Order.order_id).where(Order.cus_id == 1)),
+    ("pawn lines by product", "pawn_details", select(PawnDetail.pawn_id).where(PawnDetail.prod_id == 1)),
+    ("order lines by product", "order_details", select(OrderDetail.order_id).where(OrderDetail.prod_id == 1)),
+    ("accounts by role", "accounts", select(Account.cus_id).where(Account.role == "admin")),
+    ("pawns by expiry", "pawns", select(Pawn.pawn_id).where(Pawn.pawn_expire_date < func.now())),
+    ("expiring pawns", "pawn_due_status", select(PawnDueStatus.pawn_id).where(PawnDueStatus.pawn_expire_date <= func.now())),
+    ("customers by name", "accounts", select(Account.cus_id).where(func.lower(Account.cus_name) == "name")),
+    ("products by name", "products", select(Product.prod_id).where(func.lower(Product.prod_name).in_(["ring", "chain"]))),
+    ("customers by partial name", "accounts", select(Account.cus_id).where(func.lower(Account.cus_name).like("%dara%"))),
+    ("customers by partial phone", "accounts", select(Account.cus_id).where(Account.phone_number.like("%1234%"))),
+    ("products by partial name", "products", select(Product.prod_id).where(func.lower(Product.prod_name).like("%ring%"))),
+]
+
+def _nodes(plan: dict):
+    yield plan
+    for child in plan.get("Plans", []):
+        yield from _nodes(child)
+
+def sequential_scans(plan) -> set:
+    """Tables an EXPLAIN (FORMAT JSON) plan reads with a sequential scan"""
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return {node["Relation Name"] for node in _nodes(plan[0]["Plan"]) if node["Node Type"] == "Seq Scan"}
+
+def check_indexes() -> list:
+    """
+    EXPLAIN every INDEXED_LOOKUPS statement with sequential scans disabled and return the
+    ones that still scan their table sequentially, i.e. have no usable index.
+    (tests/test_index_usage.py does the same for the statements the repositories execute.)
+    """
+    failures = []
+    db = SessionLocal()
+    try:
+        db.execute(text("SET LOCAL enable_seqscan = off"))
+        for description, table, statement in INDEXED_LOOKUPS:
+            compiled = statement.compile(dialect=engine.dialect, compile_kwargs={"literal_binds": True})
+            plan = db.execute(text(f"EXPLAIN (FORMAT JSON) {compiled}")).scalar()
+            if table in sequential_scans(plan):
+                failures.append(description)
+    finally:
+        db.rollback()
+        db.close()
+    return failures
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s %(message)s")
+    if sys.argv[1:] == ["check-indexes"]:
+        missing = check_indexes()
+        for description in missing:
+            logger.error(f"❌ {description}: sequential scan")
+        if missing:
+            sys.exit(1)
+        logger.info(f"✅ All {len(INDEXED_LOOKUPS)} lookups use an index")
+    else:
+        upgrade_database()
+        logger.info("✅ Database is at the latest revision")
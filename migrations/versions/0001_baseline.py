@@ -0,0 +1,99 @@
+"""Baseline schema (the tables metadata.create_all used to build at startup)
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-18
+"""
+from datetime import datetime
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Databases created before migrations existed already have these tables: adopt them as-is
+    existing = set(sa.inspect(op.get_bind()).get_table_names())
+
+    if "accounts" not in existing:
+        op.create_table(
+            "accounts",
+            sa.Column("cus_id", sa.Integer, primary_key=True),
+            sa.Column("cus_name", sa.String, nullable=False),
+            sa.Column("address", sa.String, nullable=True),
+            sa.Column("phone_number", sa.String, nullable=False, unique=True),
+            sa.Column("password", sa.String, nullable=True),
+            sa.Column("role", sa.Enum("admin", "user", name="role"), default="user"),
+            sa.Column("created_at", sa.DateTime, nullable=False, default=datetime.utcnow),
+            sa.Column("updated_at", sa.DateTime, nullable=False, default=datetime.utcnow),
+        )
+        op.create_index("ix_accounts_cus_id", "accounts", ["cus_id"])
+
+    if "products" not in existing:
+        op.create_table(
+            "products",
+            sa.Column("prod_id", sa.Integer, primary_key=True),
+            sa.Column("prod_name", sa.String, nullable=False),
+            sa.Column("unit_price", sa.Float, nullable=True),
+            sa.Column("amount", sa.Integer, nullable=True),
+            sa.Column("user_id", sa.Integer, sa.ForeignKey("accounts.cus_id")),
+            sa.Column("created_at", sa.DateTime, nullable=False),
+            sa.Column("updated_at", sa.DateTime, nullable=True),
+        )
+        op.create_index("ix_products_prod_id", "products", ["prod_id"])
+
+    if "orders" not in existing:
+        op.create_table(
+            "orders",
+            sa.Column("order_id", sa.Integer, primary_key=True),
+            sa.Column("cus_id", sa.Integer, sa.ForeignKey("accounts.cus_id")),
+            sa.Column("order_deposit", sa.Float, nullable=False),
+            sa.Column("order_date", sa.DateTime, nullable=False),
+        )
+        op.create_index("ix_orders_order_id", "orders", ["order_id"])
+
+    if "pawns" not in existing:
+        op.create_table(
+            "pawns",
+            sa.Column("pawn_id", sa.Integer, primary_key=True),
+            sa.Column("cus_id", sa.Integer, sa.ForeignKey("accounts.cus_id")),
+            sa.Column("pawn_deposit", sa.Float, nullable=False),
+            sa.Column("pawn_date", sa.DateTime, nullable=False),
+            sa.Column("pawn_expire_date", sa.DateTime, nullable=False),
+        )
+        op.create_index("ix_pawns_pawn_id", "pawns", ["pawn_id"])
+
+    if "order_details" not in existing:
+        op.create_table(
+            "order_details",
+            sa.Column("order_id", sa.Integer, sa.ForeignKey("orders.order_id"), primary_key=True),
+            sa.Column("prod_id", sa.Integer, sa.ForeignKey("products.prod_id"), primary_key=True),
+            sa.Column("order_weight", sa.String, nullable=False),
+            sa.Column("order_amount", sa.Integer, nullable=True),
+            sa.Column("product_sell_price", sa.Float, nullable=False),
+            sa.Column("product_labor_cost", sa.Float, nullable=False),
+            sa.Column("product_buy_price", sa.Float, nullable=False),
+            sa.Column("order_date", sa.DateTime, nullable=False),
+            sa.Column("created_at", sa.DateTime, nullable=False),
+        )
+
+    if "pawn_details" not in existing:
+        op.create_table(
+            "pawn_details",
+            sa.Column("pawn_id", sa.Integer, sa.ForeignKey("pawns.pawn_id"), primary_key=True),
+            sa.Column("prod_id", sa.Integer, sa.ForeignKey("products.prod_id"), primary_key=True),
+            sa.Column("pawn_weight", sa.String, nullable=False),
+            sa.Column("pawn_amount", sa.Integer, nullable=False),
+            sa.Column("pawn_unit_price", sa.Float, nullable=False),
+            sa.Column("created_at", sa.DateTime, nullable=False),
+        )
+
+
+def downgrade():
+    for table in ("pawn_details", "order_details", "pawns", "orders", "products", "accounts"):
+        op.drop_table(table)
+    sa.Enum(name="role").drop(op.get_bind(), checkfirst=True)
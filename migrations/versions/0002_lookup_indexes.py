@@ -0,0 +1,104 @@
+"""Indexes for the columns every search, listing and join filters on
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+# Detail lines of one ticket that point at duplicates of the same product are folded into one
+# line: amounts and costs add up, the typed weights are joined with " + " and the unit price is
+# the amount-weighted average, so the ticket's value and profit stay the same.
+MERGE_LINES = {
+    "pawn_details": ("pawn_id", "pawn_weight, pawn_amount, pawn_unit_price, created_at", """
+        string_agg(d.pawn_weight, ' + ' ORDER BY d.prod_id) AS pawn_weight,
+        SUM(d.pawn_amount) AS pawn_amount,
+        CASE WHEN SUM(d.pawn_amount) > 0
+             THEN SUM(d.pawn_amount * d.pawn_unit_price) / SUM(d.pawn_amount)
+             ELSE MAX(d.pawn_unit_price) END AS pawn_unit_price,
+        MIN(d.created_at) AS created_at
+    """),
+    "order_details": ("order_id", "order_weight, order_amount, product_sell_price, product_labor_cost, product_buy_price, order_date, created_at", """
+        string_agg(d.order_weight, ' + ' ORDER BY d.prod_id) AS order_weight,
+        SUM(d.order_amount) AS order_amount,
+        CASE WHEN SUM(COALESCE(d.order_amount, 0)) > 0
+             THEN SUM(COALESCE(d.order_amount, 0) * d.product_sell_price) / SUM(COALESCE(d.order_amount, 0))
+             ELSE MAX(d.product_sell_price) END AS product_sell_price,
+        SUM(d.product_labor_cost) AS product_labor_cost,
+        SUM(d.product_buy_price) AS product_buy_price,
+        MIN(d.order_date) AS order_date,
+        MIN(d.created_at) AS created_at
+    """),
+}
+
+
+def merge_duplicate_products(bind):
+    """
+    Keep the lowest prod_id of each case-insensitive name: fold a ticket's lines that point at
+    duplicates of one product into a single line, re-point the remaining lines and drop the
+    duplicates, so lower(prod_name) can be unique.
+    """
+    bind.execute(sa.text("""
+        CREATE TEMPORARY TABLE product_map ON COMMIT DROP AS
+        SELECT prod_id, MIN(prod_id) OVER (PARTITION BY lower(prod_name)) AS keep_id
+        FROM products
+    """))
+
+    for table, (ticket, columns, aggregates) in MERGE_LINES.items():
+        merged = f"merged_{table}"
+        bind.execute(sa.text(f"""
+            CREATE TEMPORARY TABLE {merged} ON COMMIT DROP AS
+            SELECT d.{ticket}, m.keep_id AS prod_id, {aggregates}
+            FROM {table} AS d JOIN product_map AS m ON m.prod_id = d.prod_id
+            GROUP BY d.{ticket}, m.keep_id
+            HAVING COUNT(*) > 1
+        """))
+        bind.execute(sa.text(f"""
+            DELETE FROM {table} AS d
+            USING product_map AS m, {merged} AS x
+            WHERE m.prod_id = d.prod_id AND x.{ticket} = d.{ticket} AND x.prod_id = m.keep_id
+        """))
+        bind.execute(sa.text(f"""
+            INSERT INTO {table} ({ticket}, prod_id, {columns})
+            SELECT {ticket}, prod_id, {columns} FROM {merged}
+        """))
+        # No ticket holds two lines of one product any more, so re-pointing can't collide
+        bind.execute(sa.text(f"""
+            UPDATE {table} AS d SET prod_id = m.keep_id
+            FROM product_map AS m
+            WHERE d.prod_id = m.prod_id AND m.prod_id <> m.keep_id
+        """))
+
+    bind.execute(sa.text("DELETE FROM products WHERE prod_id IN (SELECT prod_id FROM product_map WHERE prod_id <> keep_id)"))
+
+
+def upgrade():
+    bind = op.get_bind()
+
+    op.create_index("ix_pawns_cus_id_pawn_id", "pawns", ["cus_id", "pawn_id"])
+    op.create_index("ix_pawns_pawn_expire_date", "pawns", ["pawn_expire_date"])
+    op.create_index("ix_orders_cus_id_order_id", "orders", ["cus_id", "order_id"])
+    op.create_index("ix_pawn_details_prod_id", "pawn_details", ["prod_id"])
+    op.create_index("ix_order_details_prod_id", "order_details", ["prod_id"])
+    op.create_index("ix_accounts_role", "accounts", ["role"])
+    op.create_index("ix_accounts_lower_cus_name", "accounts", [sa.text("lower(cus_name)")])
+
+    merge_duplicate_products(bind)
+    op.create_index("uq_products_lower_prod_name", "products", [sa.text("lower(prod_name)")], unique=True)
+
+
+def downgrade():
+    op.drop_index("uq_products_lower_prod_name", table_name="products")
+    op.drop_index("ix_accounts_lower_cus_name", table_name="accounts")
+    op.drop_index("ix_accounts_role", table_name="accounts")
+    op.drop_index("ix_order_details_prod_id", table_name="order_details")
+    op.drop_index("ix_pawn_details_prod_id", table_name="pawn_details")
+    op.drop_index("ix_orders_cus_id_order_id", table_name="orders")
+    op.drop_index("ix_pawns_pawn_expire_date", table_name="pawns")
+    op.drop_index("ix_pawns_cus_id_pawn_id", table_name="pawns")
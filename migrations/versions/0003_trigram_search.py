@@ -0,0 +1,30 @@
+"""pg_trgm GIN indexes for partial customer name, phone and product name search
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18
+"""
+from alembic import op
+
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+# (index, table, indexed expression) — kept out of entities.py, see migrations/env.py
+TRIGRAM_INDEXES = (
+    ("ix_accounts_cus_name_trgm", "accounts", "lower(cus_name)"),
+    ("ix_accounts_phone_number_trgm", "accounts", "phone_number"),
+    ("ix_products_prod_name_trgm", "products", "lower(prod_name)"),
+)
+
+
+def upgrade():
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    for name, table, expression in TRIGRAM_INDEXES:
+        op.execute(f"CREATE INDEX IF NOT EXISTS {name} ON {table} USING gin ({expression} gin_trgm_ops)")
+
+
+def downgrade():
+    for name, _, _ in TRIGRAM_INDEXES:
+        op.execute(f"DROP INDEX IF EXISTS {name}")
@@ -0,0 +1,42 @@
+"""Denormalized totals on pawns and orders (filled by `python manage.py backfill-totals`)
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0005"
+down_revision = "0004"
+branch_labels = None
+depends_on = None
+
+PAWN_TOTALS = (
+    ("item_count", sa.Integer()),
+    ("total_amount", sa.Integer()),
+    ("total_weight", sa.Float()),
+    ("total_value", sa.Float()),
+)
+
+ORDER_TOTALS = (
+    ("item_count", sa.Integer()),
+    ("total_amount", sa.Float()),
+    ("total_value", sa.Float()),
+    ("total_cost", sa.Float()),
+)
+
+
+def upgrade():
+    # Nullable: NULL marks tickets whose totals haven't been computed yet
+    for name, type_ in PAWN_TOTALS:
+        op.add_column("pawns", sa.Column(name, type_, nullable=True))
+    for name, type_ in ORDER_TOTALS:
+        op.add_column("orders", sa.Column(name, type_, nullable=True))
+
+
+def downgrade():
+    for name, _ in ORDER_TOTALS:
+        op.drop_column("orders", name)
+    for name, _ in PAWN_TOTALS:
+        op.drop_column("pawns", name)
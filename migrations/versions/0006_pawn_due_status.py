@@ -0,0 +1,31 @@
+"""Due/overdue state of pawns near expiry, maintained by the scheduler
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0006"
+down_revision = "0005"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "pawn_due_status",
+        sa.Column("pawn_id", sa.Integer(), sa.ForeignKey("pawns.pawn_id", ondelete="CASCADE"), primary_key=True),
+        sa.Column("cus_id", sa.Integer(), sa.ForeignKey("accounts.cus_id", ondelete="CASCADE"), nullable=False),
+        sa.Column("pawn_expire_date", sa.DateTime(), nullable=False),
+        sa.Column("status", sa.Enum("due", "overdue", name="pawn_due_state"), nullable=False),
+        sa.Column("refreshed_at", sa.DateTime(), nullable=False),
+    )
+    op.create_index("ix_pawn_due_status_pawn_expire_date", "pawn_due_status", ["pawn_expire_date"])
+
+
+def downgrade():
+    op.drop_index("ix_pawn_due_status_pawn_expire_date", table_name="pawn_due_status")
+    op.drop_table("pawn_due_status")
+    sa.Enum(name="pawn_due_state").drop(op.get_bind(), checkfirst=True)
@@ -0,0 +1,73 @@
+"""Pawn ledger: interest terms on pawns, payments, renewals, redemptions and accrual runs
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0007"
+down_revision = "0006"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column("pawns", sa.Column("interest_rate", sa.Float(), nullable=True))
+    op.add_column("pawns", sa.Column("interest_paid_through", sa.DateTime(), nullable=True))
+    op.add_column("pawns", sa.Column("principal_paid", sa.Float(), nullable=False, server_default="0"))
+    op.add_column("pawns", sa.Column("redeemed_at", sa.DateTime(), nullable=True))
+
+    op.create_table(
+        "pawn_payments",
+        sa.Column("payment_id", sa.Integer(), primary_key=True),
+        sa.Column("pawn_id", sa.Integer(), sa.ForeignKey("pawns.pawn_id", ondelete="CASCADE"), nullable=False),
+        sa.Column("amount", sa.Float(), nullable=False),
+        sa.Column("interest_paid", sa.Float(), nullable=False),
+        sa.Column("principal_paid", sa.Float(), nullable=False),
+        sa.Column("paid_at", sa.DateTime(), nullable=False),
+        sa.Column("created_by", sa.Integer(), sa.ForeignKey("accounts.cus_id"), nullable=True),
+    )
+    op.create_index("ix_pawn_payments_pawn_id", "pawn_payments", ["pawn_id"])
+
+    op.create_table(
+        "pawn_renewals",
+        sa.Column("renewal_id", sa.Integer(), primary_key=True),
+        sa.Column("pawn_id", sa.Integer(), sa.ForeignKey("pawns.pawn_id", ondelete="CASCADE"), nullable=False),
+        sa.Column("previous_expire_date", sa.DateTime(), nullable=False),
+        sa.Column("new_expire_date", sa.DateTime(), nullable=False),
+        sa.Column("interest_paid", sa.Float(), nullable=False),
+        sa.Column("renewed_at", sa.DateTime(), nullable=False),
+        sa.Column("created_by", sa.Integer(), sa.ForeignKey("accounts.cus_id"), nullable=True),
+    )
+    op.create_index("ix_pawn_renewals_pawn_id", "pawn_renewals", ["pawn_id"])
+
+    op.create_table(
+        "pawn_redemptions",
+        sa.Column("pawn_id", sa.Integer(), sa.ForeignKey("pawns.pawn_id", ondelete="CASCADE"), primary_key=True),
+        sa.Column("principal_paid", sa.Float(), nullable=False),
+        sa.Column("interest_paid", sa.Float(), nullable=False),
+        sa.Column("total_paid", sa.Float(), nullable=False),
+        sa.Column("redeemed_at", sa.DateTime(), nullable=False),
+        sa.Column("created_by", sa.Integer(), sa.ForeignKey("accounts.cus_id"), nullable=True),
+    )
+
+    op.create_table(
+        "pawn_accruals",
+        sa.Column("as_of", sa.Date(), primary_key=True),
+        sa.Column("pawn_id", sa.Integer(), sa.ForeignKey("pawns.pawn_id", ondelete="CASCADE"), primary_key=True),
+        sa.Column("principal", sa.Float(), nullable=False),
+        sa.Column("interest", sa.Float(), nullable=False),
+    )
+
+
+def downgrade():
+    op.drop_table("pawn_accruals")
+    op.drop_table("pawn_redemptions")
+    op.drop_index("ix_pawn_renewals_pawn_id", table_name="pawn_renewals")
+    op.drop_table("pawn_renewals")
+    op.drop_index("ix_pawn_payments_pawn_id", table_name="pawn_payments")
+    op.drop_table("pawn_payments")
+    for column in ("redeemed_at", "principal_paid", "interest_paid_through", "interest_rate"):
+        op.drop_column("pawns", column)
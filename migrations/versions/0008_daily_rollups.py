@@ -0,0 +1,51 @@
+"""Daily reporting rollups (fill existing history with `python manage.py rebuild-rollups`)
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0008"
+down_revision = "0007"
+branch_labels = None
+depends_on = None
+
+
+def _counter(name, type_=sa.Float):
+    return sa.Column(name, type_(), nullable=False, server_default="0")
+
+
+def upgrade():
+    op.create_table(
+        "daily_rollups",
+        sa.Column("day", sa.Date(), primary_key=True),
+        _counter("pawn_count", sa.Integer),
+        _counter("pawn_principal"),
+        _counter("pawn_value"),
+        _counter("order_count", sa.Integer),
+        _counter("order_revenue"),
+        _counter("order_labor_cost"),
+        _counter("order_buy_cost"),
+    )
+
+    op.create_table(
+        "daily_product_rollups",
+        sa.Column("day", sa.Date(), primary_key=True),
+        sa.Column("prod_id", sa.Integer(), sa.ForeignKey("products.prod_id", ondelete="CASCADE"), primary_key=True),
+        _counter("pawn_lines", sa.Integer),
+        _counter("pawn_amount", sa.Integer),
+        _counter("pawn_value"),
+        _counter("order_lines", sa.Integer),
+        _counter("order_revenue"),
+        _counter("order_labor_cost"),
+        _counter("order_buy_cost"),
+    )
+    op.create_index("ix_daily_product_rollups_prod_id_day", "daily_product_rollups", ["prod_id", "day"])
+
+
+def downgrade():
+    op.drop_index("ix_daily_product_rollups_prod_id_day", table_name="daily_product_rollups")
+    op.drop_table("daily_product_rollups")
+    op.drop_table("daily_rollups")
@@ -0,0 +1,27 @@
+"""Numeric weights: grams and unit next to the typed pawn/order weight (fill with `python manage.py normalize-weights`)
+
+Revision ID: 0009
+Revises: 0008
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0009"
+down_revision = "0008"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column("pawn_details", sa.Column("pawn_weight_grams", sa.Float(), nullable=True))
+    op.add_column("pawn_details", sa.Column("pawn_weight_unit", sa.String(16), nullable=True))
+    op.add_column("order_details", sa.Column("order_weight_grams", sa.Float(), nullable=True))
+    op.add_column("order_details", sa.Column("order_weight_unit", sa.String(16), nullable=True))
+
+
+def downgrade():
+    op.drop_column("order_details", "order_weight_unit")
+    op.drop_column("order_details", "order_weight_grams")
+    op.drop_column("pawn_details", "pawn_weight_unit")
+    op.drop_column("pawn_details", "pawn_weight_grams")
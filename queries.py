@@ -0,0 +1,188 @@
+"""
+Shared, pre-built SELECT statements for the repositories' hot reads.
+
+The customer → ticket → detail → product joins used to be rebuilt with db.query(...).join(...)
+on every request, in several repositories. They are built once here, at import, with bound
+parameters (bindparam; expanding ones for IN lists) instead of literal filter values. A request
+then only binds its values: the statement object, and therefore its cache key, is the same for
+every call, so SQLAlchemy reuses the compiled SQL from the engine's compiled cache.
+
+Statements that come in two shapes are dicts keyed by `nested`: False is the flat join,
+True has Postgres nest the products with json_agg (LISTING_QUERY_ENGINE=json).
+`python bench_queries.py` measures the per-request overhead of both styles.
+"""
+from typing import Dict
+
+from sqlalchemy import JSON, bindparam, exists, func, select
+from sqlalchemy.sql import Select
+
+from entities import Account, Order, OrderDetail, Pawn, PawnDetail, Product
+
+USER = Account.role == "user"
+
+# ========== Pawns ==========
+
+# Per-pawn columns of the customer → pawn → product join (one record per pawn)
+PAWN_SUMMARY_COLUMNS = (
+    Account.cus_id,
+    Account.cus_name,
+    Account.phone_number,
+    Account.address,
+    Pawn.pawn_id,
+    Pawn.pawn_deposit,
+    Pawn.pawn_date,
+    Pawn.pawn_expire_date,
+    Pawn.total_amount,
+    Pawn.total_weight,
+)
+
+# Per-item columns, nested under a record's "products"
+PAWN_PRODUCT_COLUMNS = (
+    Product.prod_id,
+    Product.prod_name,
+    PawnDetail.pawn_weight,
+    PawnDetail.pawn_weight_grams,
+    PawnDetail.pawn_weight_unit,
+    PawnDetail.pawn_amount,
+    PawnDetail.pawn_unit_price,
+)
+
+PAWN_DETAIL_COLUMNS = PAWN_SUMMARY_COLUMNS + PAWN_PRODUCT_COLUMNS
+
+# One row per pawn line, in the positional order the user/ routes and the export read
+PAWN_LINE_COLUMNS = (
+    Account.cus_id,
+    Account.cus_name,
+    Account.phone_number,
+    Account.address,
+    Pawn.pawn_id,
+    Pawn.pawn_deposit,
+    Pawn.pawn_date,
+    Pawn.pawn_expire_date,
+    Product.prod_id,
+    Product.prod_name,
+    PawnDetail.pawn_weight,
+    PawnDetail.pawn_amount,
+    PawnDetail.pawn_unit_price,
+)
+
+def products_json(columns):
+    """json_agg of a ticket's items, so Postgres returns one pre-nested row per ticket"""
+    return func.json_agg(
+        func.json_build_object(*[
+            part
+            for column in columns
+            for part in (column.key, column)
+        ]),
+        type_=JSON,
+    ).label("products")
+
+def _pawn_join(*columns) -> Select:
+    return (
+        select(*columns)
+        .select_from(Account)
+        .join(Pawn, Account.cus_id == Pawn.cus_id)
+        .join(PawnDetail, Pawn.pawn_id == PawnDetail.pawn_id)
+        .join(Product, PawnDetail.prod_id == Product.prod_id)
+    )
+
+def _variants(statements: Dict[bool, Select], *criteria, order_by=()) -> Dict[bool, Select]:
+    return {nested: statement.where(*criteria).order_by(*order_by) for nested, statement in statements.items()}
+
+PAWN_RECORDS: Dict[bool, Select] = {
+    False: _pawn_join(*PAWN_DETAIL_COLUMNS),
+    True: _pawn_join(*PAWN_SUMMARY_COLUMNS, products_json(PAWN_PRODUCT_COLUMNS)).group_by(Pawn.pawn_id, Account.cus_id),
+}
+USER_PAWN_RECORDS = _variants(PAWN_RECORDS, USER)
+USER_PAWN_RECORDS_NEWEST_FIRST = _variants(PAWN_RECORDS, USER, order_by=(Pawn.pawn_id.desc(),))
+PAWN_RECORDS_BY_ID = _variants(PAWN_RECORDS, USER, Pawn.pawn_id == bindparam("pawn_id"))
+PAWN_RECORDS_BY_CUSTOMER = _variants(PAWN_RECORDS, Pawn.cus_id == bindparam("cus_id"))
+PAWN_RECORDS_BY_IDS = _variants(
+    PAWN_RECORDS, Pawn.pawn_id.in_(bindparam("pawn_ids", expanding=True)), order_by=(Pawn.pawn_id.desc(),)
+)
+
+# Keyset pages of customers' pawns that have lines, newest first: params limit (and cursor)
+PAWN_PAGE_IDS = (
+    select(Pawn.pawn_id)
+    .join(Account, Account.cus_id == Pawn.cus_id)
+    .where(USER, exists().where(PawnDetail.pawn_id == Pawn.pawn_id))
+    .order_by(Pawn.pawn_id.desc())
+    .limit(bindparam("limit"))
+)
+PAWN_PAGE_IDS_BEFORE = PAWN_PAGE_IDS.where(Pawn.pawn_id < bindparam("cursor"))
+
+PAWN_LINES = _pawn_join(*PAWN_LINE_COLUMNS)
+PAWN_LINES_BY_ID = PAWN_LINES.where(USER, Pawn.pawn_id == bindparam("pawn_id"))
+PAWN_EXPORT = (
+    _pawn_join(*PAWN_LINE_COLUMNS, PawnDetail.pawn_weight_grams)
+    .where(USER)
+    .order_by(Account.cus_id, Pawn.pawn_id)
+)
+
+# ========== Orders ==========
+
+# Per-order columns of the customer → order → product join (one record per order)
+ORDER_SUMMARY_COLUMNS = (
+    Account.cus_id,
+    Account.cus_name,
+    Account.phone_number,
+    Account.address,
+    Order.order_id,
+    Order.order_deposit,
+    Order.order_date,
+    Order.total_amount,
+    Order.total_cost,
+)
+
+# Per-item columns, nested under a record's "products"
+ORDER_PRODUCT_COLUMNS = (
+    Product.prod_id,
+    Product.prod_name,
+    OrderDetail.order_weight,
+    OrderDetail.order_amount,
+    OrderDetail.product_sell_price,
+    OrderDetail.product_labor_cost,
+    OrderDetail.product_buy_price,
+)
+
+# One row per order line, in the positional order the user/ routes and the export read
+ORDER_LINE_COLUMNS = (
+    Account.cus_id,
+    Account.cus_name,
+    Account.phone_number,
+    Account.address,
+    Order.order_id,
+    Order.order_deposit,
+    Order.order_date,
+    Product.prod_id,
+    Product.prod_name,
+    OrderDetail.order_weight,
+    OrderDetail.order_amount,
+    OrderDetail.product_sell_price,
+    OrderDetail.product_labor_cost,
+    OrderDetail.product_buy_price,
+)
+
+def _order_join(*columns) -> Select:
+    return (
+        select(*columns)
+        .select_from(Account)
+        .join(Order, Account.cus_id == Order.cus_id)
+        .join(OrderDetail, Order.order_id == OrderDetail.order_id)
+        .join(Product, OrderDetail.prod_id == Product.prod_id)
+    )
+
+ORDER_RECORDS: Dict[bool, Select] = {
+    False: _order_join(*ORDER_SUMMARY_COLUMNS, *ORDER_PRODUCT_COLUMNS),
+    True: _order_join(*ORDER_SUMMARY_COLUMNS, products_json(ORDER_PRODUCT_COLUMNS)).group_by(Order.order_id, Account.cus_id),
+}
+USER_ORDER_RECORDS = _variants(ORDER_RECORDS, USER)
+ORDER_RECORDS_BY_ID = _variants(ORDER_RECORDS, USER, Order.order_id == bindparam("order_id"))
+ORDER_RECORDS_BY_CUSTOMER = _variants(ORDER_RECORDS, Order.cus_id == bindparam("cus_id"))
+ORDER_RECORDS_BY_CUSTOMERS = _variants(ORDER_RECORDS, Order.cus_id.in_(bindparam("cus_ids", expanding=True)))
+
+ORDER_LINES = _order_join(*ORDER_LINE_COLUMNS)
+USER_ORDER_LINES = ORDER_LINES.where(USER)
+ORDER_LINES_BY_ID = ORDER_LINES.where(USER, Order.order_id == bindparam("order_id"))
+ORDER_LINES_BY_CUSTOMERS = ORDER_LINES.where(Order.cus_id.in_(bindparam("cus_ids", expanding=True)))
+ORDER_EXPORT = USER_ORDER_LINES.order_by(Account.cus_id, Order.order_id)
@@ -7,4 +7,5 @@ class ResponseModel(BaseModel, Generic[T]):
     code: int
     status: str
     message: Optional[str] = None
-    result: Optional[T] = None
\ No newline at end of file
+    result: Optional[T] = None
+    next_cursor: Optional[int] = None
\ No newline at end of file
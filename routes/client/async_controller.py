@@ -0,0 +1,33 @@
+from typing import List
+from fastapi import APIRouter, Depends
+from sqlalchemy.ext.asyncio import AsyncSession
+from database import get_async_db
+from response_model import ResponseModel
+from routes.oauth2.repository import get_current_staff
+from routes.oauth2.model import Principal
+from routes.client.repository import AsyncStaff
+from routes.client.model import *
+
+router = APIRouter(
+    tags=["Client"],
+    prefix="/api"
+)
+
+staff = AsyncStaff()
+
+""" Manage Client (async engine) """
+@router.post("/client", response_model=ResponseModel)
+async def create_client(client_info: CreateClient, db: AsyncSession = Depends(get_async_db), current_user: Principal = Depends(get_current_staff)):
+    return await staff.create_client(client_info, db)
+
+@router.get("/client", response_model=ResponseModel[List[GetClient]])
+async def get_all_client(db: AsyncSession = Depends(get_async_db), current_user: Principal = Depends(get_current_staff)):
+    return await staff.get_client(db)
+
+@router.get("/client/{phone_number}", response_model=ResponseModel[List[GetClient]])
+async def get_client_phone(
+    phone_number: str,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Principal = Depends(get_current_staff)
+):
+    return await staff.get_client_phone(phone_number, db)
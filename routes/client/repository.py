@@ -1,26 +1,79 @@
+import os
 from fastapi import HTTPException
 from routes.user.model import *
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from entities import *
 from response_model import ResponseModel
+from routes.oauth2.model import Principal
 from typing import List, Dict
 # from app.models import Client, Pawn
 from sqlalchemy.sql import func, or_, and_
 from sqlalchemy.exc import SQLAlchemyError
 from collections import defaultdict
-from typing import Dict, Any
+from typing import Dict, Any, Optional
+from cache import TTLCache
+import cache_bus
+
+# ========== Customer Lookup Cache ==========
+# Customer records by ("id", cus_id) and ("phone", phone_number). Only customers that exist are
+# cached; writers call remember_customer/forget_customer after committing.
+CUSTOMER_CACHE_SIZE = int(os.getenv("CUSTOMER_CACHE_SIZE", "10000"))
+CUSTOMER_CACHE_TTL = float(os.getenv("CUSTOMER_CACHE_TTL", "300"))
+customer_cache = TTLCache("customers", CUSTOMER_CACHE_SIZE, CUSTOMER_CACHE_TTL)
+
+CUSTOMER_COLUMNS = (Account.cus_id, Account.cus_name, Account.phone_number, Account.address, Account.role)
+
+def remember_customer(record: dict):
+    customer_cache.set(("id", record["cus_id"]), record)
+    customer_cache.set(("phone", record["phone_number"]), record)
+
+def forget_customer(cus_id: Optional[int] = None, phone_number: Optional[str] = None):
+    if cus_id is not None:
+        customer_cache.pop(("id", cus_id))
+    if phone_number is not None:
+        customer_cache.pop(("phone", phone_number))
+
+def publish_customer_change(db: Session, cus_id: int, phone_number: Optional[str] = None):
+    """Tell every worker (on commit) to drop its cached copy of this customer"""
+    cache_bus.publish(db, "customers", cus_id=cus_id, phone_number=phone_number)
+
+cache_bus.subscribe("customers", lambda payload: forget_customer(payload.get("cus_id"), payload.get("phone_number")))
+cache_bus.on_reset(customer_cache.clear)
+
+def find_customer(db: Session, cus_id: Optional[int] = None, phone_number: Optional[str] = None) -> Optional[dict]:
+    """
+    Account (any role) by cus_id or phone number as a plain dict
+    (cus_id, cus_name, phone_number, address, role), served from the cache when possible.
+    """
+    if cus_id:
+        key, criterion = ("id", cus_id), Account.cus_id == cus_id
+    elif phone_number:
+        key, criterion = ("phone", phone_number), Account.phone_number == phone_number
+    else:
+        return None
+
+    record = customer_cache.get(key)
+    if record is not None:
+        return record
+
+    row = db.query(*CUSTOMER_COLUMNS).filter(criterion).first()
+    if row is None:
+        return None
+    record = dict(row._mapping)
+    remember_customer(record)
+    return record
 
 class Staff:
-    def is_staff(self, current_user: dict):
-        if current_user['role'] != 'admin':
+    def is_staff(self, current_user: Principal):
+        if current_user.role != 'admin':
             raise HTTPException(
                 status_code=403,
                 detail="Permission denied",
             )
             
     def create_client(self, client_info: CreateClient, db: Session, not_exist: bool = False):
-        existing_client = db.query(Account).filter(Account.phone_number == client_info.phone_number).first()
-        if existing_client:
+        if find_customer(db, phone_number=client_info.phone_number):
             raise HTTPException(
                 status_code=400,
                 detail="Phone Number already registered",
@@ -81,4 +134,25 @@ class Staff:
             code=200,
             status="Success",
             result=client
-        )
\ No newline at end of file
+        )
+
+class AsyncStaff:
+    """
+    Asyncio variant of Staff used when ASYNC_DATABASE is enabled.
+    Runs the same repository code on the AsyncSession's underlying Session via run_sync,
+    so every query is awaited on the event loop instead of holding a threadpool worker.
+    """
+    def __init__(self):
+        self.staff = Staff()
+
+    def is_staff(self, current_user: Principal):
+        self.staff.is_staff(current_user)
+
+    async def create_client(self, client_info: CreateClient, db: AsyncSession):
+        return await db.run_sync(lambda session: self.staff.create_client(client_info, session))
+
+    async def get_client(self, db: AsyncSession):
+        return await db.run_sync(lambda session: self.staff.get_client(session))
+
+    async def get_client_phone(self, phone_number: str, db: AsyncSession):
+        return await db.run_sync(lambda session: self.staff.get_client_phone(phone_number, session))
@@ -0,0 +1,63 @@
+from datetime import date
+from typing import Optional
+from fastapi import APIRouter, Depends
+from sqlalchemy.orm import Session
+from database import get_db
+from response_model import ResponseModel
+from routes.oauth2.repository import get_current_staff
+from routes.oauth2.model import Principal
+from routes.ledger.repository import Staff
+from routes.ledger.model import PaymentInfo, RenewalInfo
+
+router = APIRouter(
+    tags=["Ledger"],
+    prefix="/api"
+)
+
+staff = Staff()
+
+""" Pawn Interest, Payments, Renewals and Redemptions """
+@router.get("/ledger/book", response_model=ResponseModel)
+def get_book(
+    as_of: Optional[date] = None,
+    db: Session = Depends(get_db),
+    current_user: Principal = Depends(get_current_staff)
+):
+    """Active loans, outstanding principal and interest accrued across the whole book"""
+    return staff.get_book(db, as_of)
+
+@router.get("/ledger/pawn/{pawn_id}", response_model=ResponseModel)
+def get_statement(
+    pawn_id: int,
+    as_of: Optional[date] = None,
+    db: Session = Depends(get_db),
+    current_user: Principal = Depends(get_current_staff)
+):
+    """Accrued interest, redemption amount and ledger entries of one pawn"""
+    return staff.get_statement(db, pawn_id, as_of)
+
+@router.post("/ledger/pawn/{pawn_id}/payment", response_model=ResponseModel)
+def record_payment(
+    pawn_id: int,
+    payment_info: PaymentInfo,
+    db: Session = Depends(get_db),
+    current_user: Principal = Depends(get_current_staff)
+):
+    return staff.record_payment(db, pawn_id, payment_info, current_user)
+
+@router.post("/ledger/pawn/{pawn_id}/renew", response_model=ResponseModel)
+def renew_pawn(
+    pawn_id: int,
+    renewal_info: RenewalInfo,
+    db: Session = Depends(get_db),
+    current_user: Principal = Depends(get_current_staff)
+):
+    return staff.renew_pawn(db, pawn_id, renewal_info, current_user)
+
+@router.post("/ledger/pawn/{pawn_id}/redeem", response_model=ResponseModel)
+def redeem_pawn(
+    pawn_id: int,
+    db: Session = Depends(get_db),
+    current_user: Principal = Depends(get_current_staff)
+):
+    return staff.redeem_pawn(db, pawn_id, current_user)
@@ -0,0 +1,117 @@
+"""
+Pawn interest engine.
+
+Simple interest on the outstanding principal (pawn_deposit - principal_paid) at a monthly
+rate, pro-rated by day over DAYS_PER_MONTH, counted from the last settlement
+(interest_paid_through) or the pawn date. One array function does the arithmetic both for a
+single ticket and for the whole book, so the counter and the month-end run always agree.
+"""
+import os
+from datetime import date, datetime
+from typing import Iterator, Optional, Tuple, Union
+
+import numpy as np
+from sqlalchemy import func, select, text
+from sqlalchemy.orm import Session
+
+from entities import Pawn
+
+# Monthly interest in percent for pawns without their own interest_rate
+PAWN_INTEREST_RATE = float(os.getenv("PAWN_INTEREST_RATE", "3.0"))
+DAYS_PER_MONTH = 30
+# Active pawns loaded and computed per array pass
+ACCRUAL_CHUNK_SIZE = int(os.getenv("ACCRUAL_CHUNK_SIZE", "100000"))
+
+DateLike = Union[date, datetime, np.datetime64]
+
+def accrued_interest(principal, monthly_rate, start, as_of: DateLike) -> np.ndarray:
+    """
+    principal × monthly_rate% × days / DAYS_PER_MONTH, element-wise over arrays, rounded to cents.
+    Days are whole calendar days from `start` to `as_of`, never negative.
+    """
+    principal = np.asarray(principal, dtype=np.float64)
+    rate = np.asarray(monthly_rate, dtype=np.float64)
+    days = (np.datetime64(as_of, "D") - np.asarray(start, dtype="datetime64[D]")).astype(np.int64)
+    return np.round(principal * rate / 100.0 * np.maximum(days, 0) / DAYS_PER_MONTH, 2)
+
+def outstanding_principal(pawn: Pawn) -> float:
+    return max((pawn.pawn_deposit or 0) - (pawn.principal_paid or 0), 0.0)
+
+def interest_start(pawn: Pawn) -> datetime:
+    return pawn.interest_paid_through or pawn.pawn_date
+
+def interest_rate(pawn: Pawn) -> float:
+    return pawn.interest_rate if pawn.interest_rate is not None else PAWN_INTEREST_RATE
+
+def ticket_interest(pawn: Pawn, as_of: Optional[DateLike] = None) -> float:
+    """Interest accrued on one pawn up to `as_of` (today by default)"""
+    if pawn.redeemed_at is not None:
+        return 0.0
+    return float(accrued_interest(
+        [outstanding_principal(pawn)], [interest_rate(pawn)], [interest_start(pawn)], as_of or datetime.utcnow(),
+    )[0])
+
+def _book_query():
+    """Active pawns as (pawn_id, principal, rate, start) — rate and start defaults applied in SQL"""
+    return (
+        select(
+            Pawn.pawn_id,
+            func.greatest(Pawn.pawn_deposit - Pawn.principal_paid, 0).label("principal"),
+            func.coalesce(Pawn.interest_rate, PAWN_INTEREST_RATE).label("rate"),
+            func.coalesce(Pawn.interest_paid_through, Pawn.pawn_date).label("start"),
+        )
+        .where(Pawn.redeemed_at.is_(None))
+        .order_by(Pawn.pawn_id)
+    )
+
+def iter_book_interest(db: Session, as_of: DateLike, chunk_size: int = ACCRUAL_CHUNK_SIZE) -> Iterator[Tuple[np.ndarray, np.ndarray, np.ndarray]]:
+    """Stream the active book in chunks as (pawn_ids, principal, interest) arrays"""
+    result = db.execute(_book_query().execution_options(yield_per=chunk_size))
+    for rows in result.partitions():
+        pawn_ids, principal, rate, start = zip(*rows)
+        principal = np.fromiter(principal, dtype=np.float64, count=len(rows))
+        interest = accrued_interest(principal, np.fromiter(rate, dtype=np.float64, count=len(rows)), start, as_of)
+        yield np.fromiter(pawn_ids, dtype=np.int64, count=len(rows)), principal, interest
+
+def _summarize(as_of: date, chunks) -> dict:
+    loans, principal_total, interest_total = 0, 0.0, 0.0
+    for pawn_ids, principal, interest in chunks:
+        loans += len(pawn_ids)
+        principal_total += float(principal.sum())
+        interest_total += float(interest.sum())
+    return {
+        "as_of": as_of.isoformat(),
+        "active_loans": loans,
+        "principal_outstanding": round(principal_total, 2),
+        "interest_accrued": round(interest_total, 2),
+    }
+
+def book_summary(db: Session, as_of: Optional[date] = None) -> dict:
+    """Active loans, outstanding principal and accrued interest across the book"""
+    as_of = as_of or datetime.utcnow().date()
+    return _summarize(as_of, iter_book_interest(db, as_of))
+
+def record_accruals(db: Session, as_of: date, chunk_size: int = ACCRUAL_CHUNK_SIZE) -> dict:
+    """
+    Month-end accrual: store every active pawn's interest as of `as_of` in pawn_accruals,
+    one array-bound INSERT ... SELECT unnest(...) per chunk (re-running a date overwrites it).
+    """
+    statement = text("""
+        INSERT INTO pawn_accruals (as_of, pawn_id, principal, interest)
+        SELECT :as_of, * FROM unnest(CAST(:pawn_ids AS integer[]), CAST(:principal AS float8[]), CAST(:interest AS float8[]))
+        ON CONFLICT (as_of, pawn_id) DO UPDATE SET principal = EXCLUDED.principal, interest = EXCLUDED.interest
+    """)
+
+    def written():
+        for pawn_ids, principal, interest in iter_book_interest(db, as_of, chunk_size):
+            db.execute(statement, {
+                "as_of": as_of,
+                "pawn_ids": pawn_ids.tolist(),
+                "principal": principal.tolist(),
+                "interest": interest.tolist(),
+            })
+            yield pawn_ids, principal, interest
+
+    summary = _summarize(as_of, written())
+    db.commit()
+    return summary
@@ -0,0 +1,8 @@
+from pydantic import BaseModel, Field
+from datetime import date
+
+class PaymentInfo(BaseModel):
+    amount: float = Field(..., gt=0, description="Covers the accrued interest first, the rest reduces the principal")
+
+class RenewalInfo(BaseModel):
+    new_expire_date: date
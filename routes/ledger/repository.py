@@ -0,0 +1,210 @@
+from datetime import date, datetime
+from typing import Optional
+
+from fastapi import HTTPException
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from entities import Pawn, PawnDueStatus, PawnPayment, PawnRedemption, PawnRenewal
+from response_model import ResponseModel
+from routes.oauth2.model import Principal
+from routes.ledger.interest import book_summary, interest_rate, interest_start, outstanding_principal, ticket_interest
+from routes.ledger.model import PaymentInfo, RenewalInfo
+
+class Staff:
+    def is_staff(self, current_user: Principal):
+        if current_user.role != 'admin':
+            raise HTTPException(
+                status_code=403,
+                detail="Permission denied",
+            )
+
+    def _locked_pawn(self, db: Session, pawn_id: int) -> Pawn:
+        """The pawn row, locked until commit so concurrent payments can't both settle the same interest"""
+        pawn = db.query(Pawn).filter(Pawn.pawn_id == pawn_id).with_for_update().first()
+        if not pawn:
+            raise HTTPException(status_code=404, detail=f"Pawn {pawn_id} not found")
+        if pawn.redeemed_at is not None:
+            raise HTTPException(status_code=400, detail=f"Pawn {pawn_id} was already redeemed")
+        return pawn
+
+    def get_statement(self, db: Session, pawn_id: int, as_of: Optional[date] = None):
+        """Principal, interest accrued so far, the amount to redeem today, and the ticket's ledger"""
+        pawn = db.query(Pawn).filter(Pawn.pawn_id == pawn_id).first()
+        if not pawn:
+            raise HTTPException(status_code=404, detail=f"Pawn {pawn_id} not found")
+
+        interest = ticket_interest(pawn, as_of)
+        outstanding = outstanding_principal(pawn) if pawn.redeemed_at is None else 0.0
+        payments = db.query(PawnPayment).filter(PawnPayment.pawn_id == pawn_id).order_by(PawnPayment.paid_at).all()
+        renewals = db.query(PawnRenewal).filter(PawnRenewal.pawn_id == pawn_id).order_by(PawnRenewal.renewed_at).all()
+        redemption = db.query(PawnRedemption).filter(PawnRedemption.pawn_id == pawn_id).first()
+
+        return ResponseModel(
+            code=200,
+            status="Success",
+            result={
+                "pawn_id": pawn.pawn_id,
+                "cus_id": pawn.cus_id,
+                "principal": pawn.pawn_deposit,
+                "principal_paid": pawn.principal_paid,
+                "principal_outstanding": outstanding,
+                "interest_rate": interest_rate(pawn),
+                "interest_from": interest_start(pawn).strftime("%Y-%m-%d"),
+                "interest_accrued": interest,
+                "redemption_amount": round(outstanding + interest, 2),
+                "pawn_expire_date": pawn.pawn_expire_date.strftime("%Y-%m-%d"),
+                "redeemed_at": pawn.redeemed_at.strftime("%Y-%m-%d %H:%M:%S") if pawn.redeemed_at else None,
+                "payments": [
+                    {
+                        "payment_id": payment.payment_id,
+                        "amount": payment.amount,
+                        "interest_paid": payment.interest_paid,
+                        "principal_paid": payment.principal_paid,
+                        "paid_at": payment.paid_at.strftime("%Y-%m-%d %H:%M:%S"),
+                    }
+                    for payment in payments
+                ],
+                "renewals": [
+                    {
+                        "renewal_id": renewal.renewal_id,
+                        "previous_expire_date": renewal.previous_expire_date.strftime("%Y-%m-%d"),
+                        "new_expire_date": renewal.new_expire_date.strftime("%Y-%m-%d"),
+                        "interest_paid": renewal.interest_paid,
+                        "renewed_at": renewal.renewed_at.strftime("%Y-%m-%d %H:%M:%S"),
+                    }
+                    for renewal in renewals
+                ],
+                "redemption": {
+                    "principal_paid": redemption.principal_paid,
+                    "interest_paid": redemption.interest_paid,
+                    "total_paid": redemption.total_paid,
+                    "redeemed_at": redemption.redeemed_at.strftime("%Y-%m-%d %H:%M:%S"),
+                } if redemption else None,
+            }
+        )
+
+    def record_payment(self, db: Session, pawn_id: int, payment_info: PaymentInfo, current_user: Principal):
+        pawn = self._locked_pawn(db, pawn_id)
+        now = datetime.utcnow()
+        interest = ticket_interest(pawn, now)
+        outstanding = outstanding_principal(pawn)
+
+        if payment_info.amount < interest:
+            raise HTTPException(status_code=400, detail=f"Payment must cover the accrued interest of {interest}")
+        if payment_info.amount > round(outstanding + interest, 2):
+            raise HTTPException(status_code=400, detail="Payment exceeds the redemption amount; redeem the pawn instead")
+
+        principal_paid = round(payment_info.amount - interest, 2)
+        db.add(PawnPayment(
+            pawn_id=pawn_id,
+            amount=payment_info.amount,
+            interest_paid=interest,
+            principal_paid=principal_paid,
+            paid_at=now,
+            created_by=current_user.id,
+        ))
+        pawn.principal_paid = (pawn.principal_paid or 0) + principal_paid
+        pawn.interest_paid_through = now
+        db.commit()
+
+        return ResponseModel(
+            code=200,
+            status="Success",
+            message="Payment recorded",
+            result={
+                "interest_paid": interest,
+                "principal_paid": principal_paid,
+                "principal_outstanding": round(outstanding - principal_paid, 2),
+            }
+        )
+
+    def renew_pawn(self, db: Session, pawn_id: int, renewal_info: RenewalInfo, current_user: Principal):
+        """Move the expiry date out, settling the interest accrued so far"""
+        pawn = self._locked_pawn(db, pawn_id)
+        new_expire_date = datetime.combine(renewal_info.new_expire_date, datetime.min.time())
+        if new_expire_date <= pawn.pawn_expire_date:
+            raise HTTPException(status_code=400, detail="The new expire date must be after the current one")
+
+        now = datetime.utcnow()
+        interest = ticket_interest(pawn, now)
+        db.add(PawnRenewal(
+            pawn_id=pawn_id,
+            previous_expire_date=pawn.pawn_expire_date,
+            new_expire_date=new_expire_date,
+            interest_paid=interest,
+            renewed_at=now,
+            created_by=current_user.id,
+        ))
+        pawn.pawn_expire_date = new_expire_date
+        pawn.interest_paid_through = now
+        # The scheduler re-adds it on its next tick if the new date is still inside its window
+        db.query(PawnDueStatus).filter(PawnDueStatus.pawn_id == pawn_id).delete(synchronize_session=False)
+        db.commit()
+
+        return ResponseModel(
+            code=200,
+            status="Success",
+            message=f"Pawn {pawn_id} renewed until {renewal_info.new_expire_date}",
+            result={"interest_paid": interest, "pawn_expire_date": renewal_info.new_expire_date.isoformat()}
+        )
+
+    def redeem_pawn(self, db: Session, pawn_id: int, current_user: Principal):
+        """Settle the outstanding principal and interest and close the pawn"""
+        pawn = self._locked_pawn(db, pawn_id)
+        now = datetime.utcnow()
+        interest = ticket_interest(pawn, now)
+        outstanding = outstanding_principal(pawn)
+        total = round(outstanding + interest, 2)
+
+        db.add(PawnRedemption(
+            pawn_id=pawn_id,
+            principal_paid=outstanding,
+            interest_paid=interest,
+            total_paid=total,
+            redeemed_at=now,
+            created_by=current_user.id,
+        ))
+        pawn.principal_paid = (pawn.principal_paid or 0) + outstanding
+        pawn.interest_paid_through = now
+        pawn.redeemed_at = now
+        db.query(PawnDueStatus).filter(PawnDueStatus.pawn_id == pawn_id).delete(synchronize_session=False)
+        db.commit()
+
+        return ResponseModel(
+            code=200,
+            status="Success",
+            message=f"Pawn {pawn_id} redeemed",
+            result={"principal_paid": outstanding, "interest_paid": interest, "total_paid": total}
+        )
+
+    def get_book(self, db: Session, as_of: Optional[date] = None):
+        """Outstanding principal and accrued interest over every active pawn (vectorized pass)"""
+        return ResponseModel(
+            code=200,
+            status="Success",
+            result=book_summary(db, as_of)
+        )
+
+class AsyncStaff:
+    """Asyncio variant of Staff used when ASYNC_DATABASE is enabled (see routes/pawn/repository.py)"""
+    def __init__(self):
+        self.staff = Staff()
+
+    def is_staff(self, current_user: Principal):
+        self.staff.is_staff(current_user)
+
+    async def get_statement(self, db: AsyncSession, pawn_id: int, as_of: Optional[date] = None):
+        return await db.run_sync(lambda session: self.staff.get_statement(session, pawn_id, as_of))
+
+    async def record_payment(self, db: AsyncSession, pawn_id: int, payment_info: PaymentInfo, current_user: Principal):
+        return await db.run_sync(lambda session: self.staff.record_payment(session, pawn_id, payment_info, current_user))
+
+    async def renew_pawn(self, db: AsyncSession, pawn_id: int, renewal_info: RenewalInfo, current_user: Principal):
+        return await db.run_sync(lambda session: self.staff.renew_pawn(session, pawn_id, renewal_info, current_user))
+
+    async def redeem_pawn(self, db: AsyncSession, pawn_id: int, current_user: Principal):
+        return await db.run_sync(lambda session: self.staff.redeem_pawn(session, pawn_id, current_user))
+
+    async def get_book(self, db: AsyncSession, as_of: Optional[date] = None):
+        return await db.run_sync(lambda session: self.staff.get_book(session, as_of))
@@ -1,4 +1,5 @@
 from fastapi import Depends, HTTPException, status, APIRouter, Query
+from fastapi.concurrency import run_in_threadpool
 from typing import Optional
 from datetime import timedelta
 from sqlalchemy.orm import Session
@@ -8,8 +9,9 @@ import os
 load_dotenv()
 
 from database import get_db
-from routes.oauth2.model import UserToken
+from routes.oauth2.model import UserToken, Principal
 from routes.oauth2.repository import *
+from routes.oauth2.hashing import verify_password
 
 router = APIRouter(
     tags=["Authentication"],
@@ -38,24 +40,49 @@ def create_new_user(
                 'message' : "User created successfully"
     }
 
+async def authenticate(db: Session, phone_number: str, password: str) -> Optional[Account]:
+    """
+    Look the account up in the threadpool and check the password on the hashing pool,
+    so neither blocks the event loop. Upgrades the stored hash if BCRYPT_ROUNDS changed.
+    """
+    user = await run_in_threadpool(lambda: db.query(Account).filter(Account.phone_number == phone_number).first())
+    if not user:
+        return None
+    valid, new_hash = await verify_password(password, user.password)
+    if not valid:
+        return None
+    if new_hash:
+        await run_in_threadpool(store_rehashed_password_and_reload, db, user, new_hash)
+    return user
+
+def store_rehashed_password_and_reload(db: Session, user: Account, new_hash: str):
+    """The commit expires `user`; reload it here so issue_tokens doesn't lazy-load on the event loop"""
+    store_rehashed_password(db, user.cus_id, new_hash)
+    db.refresh(user)
+
+def issue_tokens(user: Account):
+    version = user.token_version or 0
+    token_versions.set(user.cus_id, version)
+    access_token_expires = timedelta(minutes=int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "30")))
+    refresh_token_expires = timedelta(days=int(os.getenv("REFRESH_TOKEN_EXPIRE_DAYS", "7")))
+    access_token = create_token(data={"sub": user.phone_number, "id": user.cus_id, "type": "access_token", "role": user.role, "ver": version}, expires_delta=access_token_expires)
+    refresh_token = create_token(data={"sub": user.phone_number, "id": user.cus_id, "type": "refresh_token", "role": user.role, "ver": version}, expires_delta=refresh_token_expires)
+    return {
+        'code' : status.HTTP_200_OK,
+        'status' : "Success",
+        'result' : {"access_token": access_token, "refresh_token": refresh_token, "token_type": "bearer"}
+    }
+
 @router.get("/sign_in_get")
-def sign_in_get(
+async def sign_in_get(
     phone_number: str = Query(..., description="Phone number or email"),
     password: str = Query(..., description="Password"),
     db: Session = Depends(get_db)
 ):
     """Login endpoint that accepts query parameters for easier testing"""
-    user = db.query(Account).filter(Account.phone_number == phone_number).first()
-    if user and pwd_context.verify(password, user.password):
-        access_token_expires = timedelta(minutes=int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "30")))
-        refresh_token_expires = timedelta(days=int(os.getenv("REFRESH_TOKEN_EXPIRE_DAYS", "7")))
-        access_token = create_token(data={"sub": user.phone_number, "id": user.cus_id, "type": "access_token", "role": user.role}, expires_delta=access_token_expires)
-        refresh_token = create_token(data={"sub": user.phone_number, "id": user.cus_id, "type": "refresh_token", "role": user.role}, expires_delta=refresh_token_expires)
-        return {
-            'code' : status.HTTP_200_OK,
-            'status' : "Success",
-            'result' : {"access_token": access_token, "refresh_token": refresh_token, "token_type": "bearer"}
-        }
+    user = await authenticate(db, phone_number, password)
+    if user:
+        return issue_tokens(user)
 
     raise HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
@@ -64,18 +91,10 @@ def sign_in_get(
     )
     
 @router.post("/sign_in")
-def sign_in_for_access_token(form_data: UserToken, db: Session = Depends(get_db)):
-    user = db.query(Account).filter(Account.phone_number == form_data.phone_number).first()
-    if user and pwd_context.verify(form_data.password, user.password):
-        access_token_expires = timedelta(minutes=int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "30")))
-        refresh_token_expires = timedelta(days=int(os.getenv("REFRESH_TOKEN_EXPIRE_DAYS", "7")))
-        access_token = create_token(data={"sub": user.phone_number, "id": user.cus_id, "type": "access_token", "role": user.role}, expires_delta=access_token_expires)
-        refresh_token = create_token(data={"sub": user.phone_number, "id": user.cus_id, "type": "refresh_token", "role": user.role}, expires_delta=refresh_token_expires)
-        return {
-            'code' : status.HTTP_200_OK,
-            'status' : "Success",
-            'result' : {"access_token": access_token, "refresh_token": refresh_token, "token_type": "bearer"}
-        }
+async def sign_in_for_access_token(form_data: UserToken, db: Session = Depends(get_db)):
+    user = await authenticate(db, form_data.phone_number, form_data.password)
+    if user:
+        return issue_tokens(user)
 
     raise HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
@@ -85,20 +104,44 @@ def sign_in_for_access_token(form_data: UserToken, db: Session = Depends(get_db)
 
 @router.post("/refresh_token")
 def refresh_access_token(refresh_token: str, db: Session = Depends(get_db)):
+    """Everything needed is in the refresh token; only its version is checked, usually from memory"""
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
     payload = verify_refresh_token(refresh_token, credentials_exception)
-    user = db.query(Account).filter(Account.phone_number == payload.get("sub")).first()
-    if user:
-        access_token_expires = timedelta(minutes=int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "30")))
-        access_token = create_token(data={"sub": user.phone_number, "id": user.cus_id, "type": "access_token", "role": user.role}, expires_delta=access_token_expires)
-        return {
-            'code' : status.HTTP_200_OK,
-            'status' : "Success",
-            'result' : {"access_token": access_token, "token_type": "bearer"}
-        }
-    
-    raise credentials_exception
\ No newline at end of file
+    cus_id = payload.get("id")
+    if cus_id is None or payload.get("sub") is None:
+        raise credentials_exception
+
+    # Tokens issued before versioning carry no "ver" and count as version 0
+    version = get_token_version(db, cus_id)
+    if version is None or payload.get("ver", 0) != version:
+        raise credentials_exception
+
+    access_token_expires = timedelta(minutes=int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "30")))
+    access_token = create_token(data={"sub": payload["sub"], "id": cus_id, "type": "access_token", "role": payload.get("role"), "ver": version}, expires_delta=access_token_expires)
+    return {
+        'code' : status.HTTP_200_OK,
+        'status' : "Success",
+        'result' : {"access_token": access_token, "token_type": "bearer"}
+    }
+
+@router.post("/revoke_tokens")
+def revoke_refresh_tokens(
+    cus_id: Optional[int] = None,
+    db: Session = Depends(get_db),
+    current_user: Principal = Depends(get_current_staff)):
+    """Sign an account (yourself by default) out everywhere: its refresh tokens stop working"""
+    version = revoke_tokens(db, cus_id if cus_id is not None else current_user.id)
+    if version is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Account not found",
+        )
+    return {
+        'code' : status.HTTP_200_OK,
+        'status' : "Success",
+        'message' : "Tokens revoked"
+    }
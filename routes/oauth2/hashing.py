@@ -0,0 +1,143 @@
+"""
+bcrypt off the event loop and the request threadpool.
+
+Password checks run on a small dedicated process pool (bcrypt is CPU-bound and would otherwise
+hold the GIL), behind a semaphore so a burst of logins queues here instead of piling up work.
+Hashes made with a different cost than BCRYPT_ROUNDS are re-hashed on the next successful login.
+The pool starts its processes with forkserver (spawn where that is unavailable), never a plain
+fork of the worker: by then the worker runs threads, and a fork could copy a lock they hold.
+"""
+import asyncio
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional, Tuple
+
+from fastapi.concurrency import run_in_threadpool
+from passlib.context import CryptContext
+
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+# Processes doing bcrypt; 0 runs it in the threadpool instead (e.g. where processes can't be started)
+HASH_WORKERS = int(os.getenv("HASH_WORKERS", str(min(2, os.cpu_count() or 1))))
+# Checks admitted at once (running + queued in the pool); the rest wait on the semaphore
+HASH_MAX_CONCURRENCY = int(os.getenv("HASH_MAX_CONCURRENCY", str(max(HASH_WORKERS, 1) * 2)))
+
+# Any bcrypt hash whose cost differs from BCRYPT_ROUNDS is reported as needing an update
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__default_rounds=BCRYPT_ROUNDS,
+    bcrypt__min_rounds=BCRYPT_ROUNDS,
+    bcrypt__max_rounds=BCRYPT_ROUNDS,
+)
+
+def _verify_and_update(password: str, hashed: str) -> Tuple[bool, Optional[str], float, float]:
+    """Runs in a pool process: (valid, new hash if the cost changed, started_at, seconds spent)"""
+    started = time.time()
+    try:
+        valid, new_hash = pwd_context.verify_and_update(password, hashed)
+    except ValueError:  # not a recognizable hash
+        valid, new_hash = False, None
+    return valid, new_hash, started, time.time() - started
+
+class HashStats:
+    """Thread-safe counters for password checks: queue wait, hashing time, rejections"""
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checks = 0
+        self.failures = 0
+        self.rehashed = 0
+        self.waiting = 0
+        self.running = 0
+        self.queue_wait_total = 0.0
+        self.queue_wait_max = 0.0
+        self.hash_time_total = 0.0
+
+    def record(self, valid: bool, rehashed: bool, queue_wait: float, hash_time: float):
+        with self._lock:
+            self.checks += 1
+            self.failures += 0 if valid else 1
+            self.rehashed += 1 if rehashed else 0
+            self.queue_wait_total += queue_wait
+            self.queue_wait_max = max(self.queue_wait_max, queue_wait)
+            self.hash_time_total += hash_time
+
+    def adjust(self, waiting: int = 0, running: int = 0):
+        with self._lock:
+            self.waiting += waiting
+            self.running += running
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "bcrypt_rounds": BCRYPT_ROUNDS,
+                "workers": HASH_WORKERS,
+                "max_concurrency": HASH_MAX_CONCURRENCY,
+                "waiting": self.waiting,
+                "running": self.running,
+                "checks": self.checks,
+                "failures": self.failures,
+                "rehashed": self.rehashed,
+                "queue_wait_avg_ms": round(self.queue_wait_total / self.checks * 1000, 2) if self.checks else 0.0,
+                "queue_wait_max_ms": round(self.queue_wait_max * 1000, 2),
+                "hash_time_avg_ms": round(self.hash_time_total / self.checks * 1000, 2) if self.checks else 0.0,
+            }
+
+hash_stats = HashStats()
+
+_executor: Optional[ProcessPoolExecutor] = None
+_executor_lock = threading.Lock()
+_semaphore: Optional[asyncio.Semaphore] = None
+
+def _mp_context():
+    """forkserver children start from a clean, single-threaded server process; spawn ones from scratch"""
+    method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+    return multiprocessing.get_context(method)
+
+def _get_executor() -> ProcessPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ProcessPoolExecutor(max_workers=HASH_WORKERS, mp_context=_mp_context())
+        return _executor
+
+async def verify_password(password: str, hashed: Optional[str]) -> Tuple[bool, Optional[str]]:
+    """
+    Check a password without blocking the event loop.
+    Returns (valid, new_hash); new_hash is set when the stored hash should be replaced.
+    """
+    global _semaphore
+    if not hashed:
+        return False, None
+    if _semaphore is None:
+        _semaphore = asyncio.Semaphore(HASH_MAX_CONCURRENCY)
+
+    submitted = time.time()
+    hash_stats.adjust(waiting=1)
+    async with _semaphore:
+        hash_stats.adjust(waiting=-1, running=1)
+        try:
+            if HASH_WORKERS > 0:
+                loop = asyncio.get_running_loop()
+                result = await loop.run_in_executor(_get_executor(), _verify_and_update, password, hashed)
+            else:
+                result = await run_in_threadpool(_verify_and_update, password, hashed)
+        finally:
+            hash_stats.adjust(running=-1)
+
+    valid, new_hash, started, hash_time = result
+    hash_stats.record(valid, bool(new_hash), max(started - submitted, 0.0), hash_time)
+    return valid, new_hash
+
+def hash_password(password: str) -> str:
+    """bcrypt hash with the configured cost (synchronous; used for account creation)"""
+    return pwd_context.hash(password)
+
+def shutdown():
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=False, cancel_futures=True)
+            _executor = None
@@ -2,4 +2,16 @@ from pydantic import BaseModel
 
 class UserToken(BaseModel):
     phone_number: str
-    password: str
\ No newline at end of file
+    password: str
+
+class Principal(BaseModel):
+    """The verified caller behind an access token"""
+    id: int
+    sub: str
+    role: str
+    exp: int
+    ver: int = 0  # token_version at issue; tokens from before versioning count as 0
+
+    @property
+    def is_staff(self) -> bool:
+        return self.role == "admin"
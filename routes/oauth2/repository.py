@@ -2,12 +2,18 @@ from fastapi import Depends, HTTPException, status
 from typing import Optional
 from jose import JWTError, jwt
 from fastapi.security import HTTPBearer
-from passlib.context import CryptContext
 from datetime import datetime, timedelta
 from sqlalchemy.orm import Session
 from entities import Account
+from database import get_db
+from routes.oauth2.model import Principal
+from routes.oauth2.hashing import hash_password
+from cache import TTLCache
+import cache_bus
 from dotenv import load_dotenv
+import hashlib
 import os
+import time
 
 load_dotenv()
 
@@ -19,7 +25,44 @@ if not SECRET_KEY:
     raise ValueError("SECRET_KEY environment variable is required. Please set it in your .env file.")
 
 http_bearer = HTTPBearer()
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+
+# Verified access tokens by SHA-256 of the token, each kept only until the token's own `exp`
+AUTH_TOKEN_CACHE_SIZE = int(os.getenv("AUTH_TOKEN_CACHE_SIZE", "10000"))
+token_cache = TTLCache("access_tokens", AUTH_TOKEN_CACHE_SIZE, ttl=0)
+
+# Current token_version per account, so refreshes are checked without reading the accounts table
+TOKEN_VERSION_CACHE_SIZE = int(os.getenv("TOKEN_VERSION_CACHE_SIZE", "10000"))
+TOKEN_VERSION_CACHE_TTL = int(os.getenv("TOKEN_VERSION_CACHE_TTL", "3600"))
+token_versions = TTLCache("token_versions", TOKEN_VERSION_CACHE_SIZE, ttl=TOKEN_VERSION_CACHE_TTL)
+
+# Another worker revoked a user's tokens; re-read that version on the next refresh
+cache_bus.subscribe("token_versions", lambda payload: token_versions.pop(payload.get("cus_id")))
+cache_bus.on_reset(token_versions.clear)
+
+def get_token_version(db: Session, cus_id: int) -> Optional[int]:
+    """The account's current token_version (None if the account is gone), from memory when possible"""
+    version = token_versions.get(cus_id)
+    if version is None:
+        version = db.query(Account.token_version).filter(Account.cus_id == cus_id).scalar()
+        if version is None:
+            return None
+        token_versions.set(cus_id, version)
+    return version
+
+def revoke_tokens(db: Session, cus_id: int) -> Optional[int]:
+    """Bump the account's token_version, rejecting every access and refresh token issued so far in all workers"""
+    updated = (
+        db.query(Account)
+        .filter(Account.cus_id == cus_id)
+        .update({Account.token_version: Account.token_version + 1}, synchronize_session=False)
+    )
+    if not updated:
+        return None
+    version = db.query(Account.token_version).filter(Account.cus_id == cus_id).scalar()
+    cache_bus.publish(db, "token_versions", cus_id=cus_id)
+    db.commit()
+    token_versions.set(cus_id, version)
+    return version
 
 def create_user(db: Session, cus_name: str, phone_number: str, password: Optional[str] = None):
     user = Account(
@@ -27,7 +70,7 @@ def create_user(db: Session, cus_name: str, phone_number: str, password: Optiona
         phone_number=phone_number,)
     
     if password:
-        user.password = pwd_context.hash(password)
+        user.password = hash_password(password)
         user.role = "admin"
     
     db.add(user)
@@ -35,6 +78,11 @@ def create_user(db: Session, cus_name: str, phone_number: str, password: Optiona
     db.refresh(user)
     return user
 
+def store_rehashed_password(db: Session, cus_id: int, new_hash: str):
+    """Persist a hash upgraded to the current BCRYPT_ROUNDS on login"""
+    db.query(Account).filter(Account.cus_id == cus_id).update({"password": new_hash}, synchronize_session=False)
+    db.commit()
+
 def create_token(data: dict, expires_delta: timedelta):
     to_encode = data.copy()
     expire = datetime.utcnow() + expires_delta
@@ -60,11 +108,40 @@ def verify_refresh_token(token: str, credentials_exception):
     except JWTError:
         raise credentials_exception
 
-def get_current_user(token: str = Depends(http_bearer)):
+def get_current_user(token: str = Depends(http_bearer), db: Session = Depends(get_db)) -> Principal:
+    """
+    Resolve the bearer token to a Principal, skipping the JWT decode for tokens already verified.
+    Tokens issued before the account's last revoke_tokens are rejected; the version is usually
+    read from memory, so `db` is only used after a revoke or a cold start.
+    """
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
-    payload = verify_access_token(token.credentials, credentials_exception)
-    return payload
+    key = hashlib.sha256(token.credentials.encode()).hexdigest()
+    principal = token_cache.get(key)
+    if principal is None:
+        payload = verify_access_token(token.credentials, credentials_exception)
+        try:
+            principal = Principal.model_validate(payload)
+        except ValueError:
+            raise credentials_exception
+
+        remaining = principal.exp - time.time()
+        if remaining > 0:
+            token_cache.set(key, principal, ttl=remaining)
+
+    if get_token_version(db, principal.id) != principal.ver:
+        token_cache.pop(key)
+        raise credentials_exception
+    return principal
+
+def get_current_staff(principal: Principal = Depends(get_current_user)) -> Principal:
+    """get_current_user for the staff (admin) endpoints"""
+    if not principal.is_staff:
+        raise HTTPException(
+            status_code=403,
+            detail="Permission denied",
+        )
+    return principal
@@ -1,10 +1,14 @@
 from typing import List
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
+from export_stream import export_response
+from bulk_import import ImportReport, detect_format, iter_grouped_records, run_import
 from database import get_db
 from response_model import ResponseModel
-from routes.oauth2.repository import get_current_user
-from routes.order.repository import Staff
+from routes.oauth2.repository import get_current_staff
+from routes.oauth2.model import Principal
+from routes.order.repository import Staff, ORDER_IMPORT_DETAIL_COLUMNS
 from routes.order.model import *
 
 router = APIRouter(
@@ -17,33 +21,62 @@ staff_service = Staff()
 
 """ Manage Order and Payment """
 @router.post("/order", response_model = ResponseModel)
-def create_order(order_info: CreateOrder, db: Session = Depends(get_db), current_user: dict = Depends(get_current_user)):
-    staff.is_staff(current_user)
+def create_order(order_info: CreateOrder, db: Session = Depends(get_db), current_user: Principal = Depends(get_current_staff)):
     return staff.create_order(order_info, db, current_user)
 
+@router.post("/order/import", response_model=ResponseModel)
+async def import_orders(
+    request: Request,
+    file_format: Optional[str] = Query(None, alias="format"),
+    chunk_size: int = Query(500, ge=1, le=5000),
+    db: Session = Depends(get_db),
+    current_user: Principal = Depends(get_current_staff)
+):
+    """
+    Bulk import sales history from a streamed upload: CSV (one row per order line, rows of the same
+    order share order_id) or NDJSON (one CreateOrder object per line). Returns a per-row error report.
+    """
+    report = ImportReport()
+    records = iter_grouped_records(
+        request, detect_format(request, file_format), "order_id", "order_product_detail", ORDER_IMPORT_DETAIL_COLUMNS
+    )
+
+    await run_import(
+        records,
+        staff.parse_import_order,
+        lambda batch: run_in_threadpool(staff.import_orders, batch, db, current_user, report),
+        report,
+        chunk_size,
+    )
+    await run_in_threadpool(staff.sync_order_id_sequence, db)
+
+    return ResponseModel(
+        code=200,
+        status="Success",
+        message=f"Imported {report.imported_records} orders ({report.failed_rows} rows failed)",
+        result=report.as_dict()
+    )
+
 @router.get("/order", response_model=ResponseModel)
 def get_client_order(
     db: Session = Depends(get_db),
-    current_user: dict = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_staff)
 ):
-    staff.is_staff(current_user)
     return staff.get_client_order(db)
 
 @router.get("/order/all_client", response_model=ResponseModel)
 def get_all_client_order(
     db: Session = Depends(get_db),
-    current_user: dict = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_staff)
 ):
-    staff.is_staff(current_user)
     return staff.get_all_client_order(db)
 
 @router.get("/order/client/{cus_id}", response_model=ResponseModel)
 def get_client_id(
     cus_id: int,
     db: Session = Depends(get_db),
-    current_user: dict = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_staff)
 ):
-    staff.is_staff(current_user)
     return staff.get_client_id(cus_id, db)
 
 @router.get("/order/search", response_model=ResponseModel)
@@ -52,34 +85,38 @@ def get_client_order(
     cus_name: Optional[str] = None,
     cus_id: Optional[int] = None,
     db: Session = Depends(get_db),
-    current_user: dict = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_staff)
 ):
-    staff.is_staff(current_user)
     return staff.get_client_order(db, phone_number, cus_name, cus_id)
 
+@router.get("/order/export")
+def export_orders(
+    file_format: str = Query("ndjson", alias="format", pattern="^(ndjson|json)$"),
+    current_user: Principal = Depends(get_current_staff)
+):
+    """Stream every order grouped by customer as NDJSON (one customer per line) or a chunked JSON array"""
+    return export_response(staff.iter_order_export, file_format, "order_export")
+
 @router.get("/order/next-id", response_model=ResponseModel)
 def get_next_order_id(
     db: Session = Depends(get_db),
-    current_user: dict = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_staff)
 ):
-    staff.is_staff(current_user)
     return staff.get_next_order_id(db)
 
 @router.get("/order/last", response_model=ResponseModel)
 def get_last_order(
     db: Session = Depends(get_db),
-    current_user: dict = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_staff)
 ):
-    staff.is_staff(current_user)
     return staff.get_last_order(db)
 
 @router.get("/order/print", response_model=ResponseModel)
 def get_order_print(
     order_id: Optional[int] = None, 
     db: Session = Depends(get_db), 
-    current_user: dict = Depends(get_current_user)):
+    current_user: Principal = Depends(get_current_staff)):
 
-    staff.is_staff(current_user) 
     if not order_id:
         raise HTTPException(status_code=400, detail="Order ID is required")
     
@@ -1,18 +1,122 @@
 from fastapi import HTTPException
 from routes.user.model import *
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from entities import *
 from response_model import ResponseModel
+from routes.oauth2.model import Principal
+from database import LISTING_QUERY_ENGINE
+from routes.product.repository import product_catalog, publish_product_change, resolve_product_ids
+from routes.search.repository import contains
+from routes.client.repository import find_customer, remember_customer, forget_customer, publish_customer_change
 from typing import List, Dict, Optional
 # from app.models import Client, Pawn
-from sqlalchemy.sql import func, or_, and_
-from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy import insert
+from sqlalchemy.sql import Select
+from sqlalchemy.sql import func, and_
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
 from collections import defaultdict
-from typing import Dict, Any
+from datetime import datetime
+from typing import Dict, Any, Iterator, Tuple
+from bulk_import import ImportReport, TicketImport, sync_serial_sequence
+from id_allocator import order_ids, customer_ids
+from totals import order_totals
+import queries
+from queries import ORDER_PRODUCT_COLUMNS, ORDER_SUMMARY_COLUMNS
+from weights import order_weight_fields
+from routes.report.rollups import record_orders
+
+# CSV columns that describe one order line; every other column describes the order
+ORDER_IMPORT_DETAIL_COLUMNS = (
+    "prod_id", "prod_name", "order_weight", "order_amount",
+    "product_sell_price", "product_labor_cost", "product_buy_price",
+)
+
+def _import_order_date(order_info: CreateOrder) -> datetime:
+    return order_info.order_date or datetime.utcnow()
+
+# Order-specific columns of a bulk import (bulk_import.TicketImport does the rest)
+ORDER_IMPORT = TicketImport(
+    label="order",
+    ticket_model=Order,
+    detail_model=OrderDetail,
+    ids=order_ids,
+    id_field="order_id",
+    detail_field="order_product_detail",
+    required_item_fields=("order_weight", "product_sell_price", "product_labor_cost", "product_buy_price"),
+    ticket_row=lambda order_info: {
+        "order_deposit": order_info.order_deposit or 0,
+        "order_date": _import_order_date(order_info),
+        **order_totals(order_info.order_product_detail),
+    },
+    detail_row=lambda order_info, product: {
+        "order_weight": product.order_weight,
+        **order_weight_fields(product.order_weight),
+        "order_amount": product.order_amount,
+        "product_sell_price": product.product_sell_price,
+        "product_labor_cost": product.product_labor_cost,
+        "product_buy_price": product.product_buy_price,
+        "order_date": _import_order_date(order_info),
+    },
+    record_rollups=lambda db, written: record_orders(
+        db, [(details[0]["order_date"], details) for _, details in written]
+    ),
+)
+
+def group_order_rows(rows) -> List[dict]:
+    """Group flat ORDER_SUMMARY_COLUMNS + ORDER_PRODUCT_COLUMNS rows into one record per order, in a single pass"""
+    grouped_orders = {}
+    summary_width = len(ORDER_SUMMARY_COLUMNS)
+
+    for row in rows:
+        record = grouped_orders.get(row.order_id)
+        if record is None:
+            record = grouped_orders[row.order_id] = {
+                column.key: row[index] for index, column in enumerate(ORDER_SUMMARY_COLUMNS)
+            }
+            record["products"] = []
+
+        record["products"].append({
+            column.key: row[index] for index, column in enumerate(ORDER_PRODUCT_COLUMNS, summary_width)
+        })
+
+    return list(grouped_orders.values())
+
+def load_order_records(
+    db: Session,
+    statements: Dict[bool, Select] = queries.USER_ORDER_RECORDS,
+    params: Optional[dict] = None,
+    query_engine: Optional[str] = None,
+) -> List[dict]:
+    """
+    Fetch orders as records: the ORDER_SUMMARY_COLUMNS keys plus a `products` list, from one of the
+    pre-built statement pairs in queries.py run with `params`.
+    "python" groups the flat join with group_order_rows; "json" has Postgres nest the products (see load_pawn_records).
+    """
+    engine = query_engine or LISTING_QUERY_ENGINE
+    rows = db.execute(statements[engine == "json"], params or {})
+
+    if engine == "json":
+        return [dict(row._mapping) for row in rows]
+    return group_order_rows(rows)
+
+def _listing_products(order: dict) -> List[dict]:
+    return [
+        {
+            "prod_name": product["prod_name"],
+            "prod_id": product["prod_id"],
+            "order_weight": product["order_weight"],
+            "order_amount": product["order_amount"],
+            "product_sell_price": product["product_sell_price"],
+            "product_labor_cost": product["product_labor_cost"],
+            "product_buy_price": product["product_buy_price"],
+        }
+        for product in order["products"]
+    ]
 
 class Staff:
-    def is_staff(self, current_user: dict):
-        if current_user['role'] != 'admin':
+    def is_staff(self, current_user: Principal):
+        if current_user.role != 'admin':
             raise HTTPException(
                 status_code=403,
                 detail="Permission denied",
@@ -20,12 +124,9 @@ class Staff:
         
     def create_client(self, client_info: CreateClient, db: Session, not_exist: bool = False):
         # Check for existing client by phone_number
-        existing_client = db.query(Account).filter(
-            Account.phone_number == client_info.phone_number,
-            Account.role == 'user'
-        ).first()
+        existing_client = find_customer(db, phone_number=client_info.phone_number)
 
-        if existing_client:
+        if existing_client and existing_client["role"] == 'user':
             raise HTTPException(
                 status_code=400,
                 detail="Phone Number already registered",
@@ -66,33 +167,27 @@ class Staff:
             message="Client created successfully"
         )
         
-    def create_order(self, order_info: CreateOrder, db: Session, current_user: dict):
-        existing_customer = db.query(Account).filter(
-            and_(
-                or_(Account.cus_id == order_info.cus_id),  # Simplified (removed duplicate)
-                Account.role == 'user'
+    def create_order(self, order_info: CreateOrder, db: Session, current_user: Principal):
+        """Create an order, its customer, products and details in a single transaction"""
+        if any(not product.prod_name for product in order_info.order_product_detail):
+            raise HTTPException(
+                status_code=400,
+                detail="Product name is required for every order item.",
             )
-        ).first()
 
-        if existing_customer:
-            existing_customer.cus_name = order_info.cus_name
-            existing_customer.address = order_info.address
-            db.commit()
-            db.refresh(existing_customer)
-        else:
-            existing_customer = self.create_client(
-                CreateClient(
-                    cus_name=order_info.cus_name,
-                    address=order_info.address,
-                    phone_number=order_info.phone_number  # Only these fields
-                ),
-                db,
-                True
-            )
+        # Lines sharing a product would collide on the (order_id, prod_id) key; the import rejects them the same way
+        duplicate = ORDER_IMPORT.duplicate_product(order_info.order_product_detail)
+        if duplicate:
+            raise HTTPException(status_code=400, detail=duplicate)
 
-        # Rest of the method remains the same...
         if hasattr(order_info, "order_id") and order_info.order_id:
-            existing_order = db.query(Order).filter(Order.order_id == order_info.order_id).first()
+            # A submitted order_id must have been reserved through /next-id, and still be free
+            if not order_ids.was_issued(db, order_info.order_id):
+                raise HTTPException(
+                    status_code=400,
+                    detail=f"Order ID {order_info.order_id} was not reserved.",
+                )
+            existing_order = db.query(Order.order_id).filter(Order.order_id == order_info.order_id).first()
             if existing_order:
                 return ResponseModel(
                     code=400,
@@ -100,38 +195,99 @@ class Staff:
                     message="ផលិតផលបានរក្សាទុករួចរាល់ហើយ"
                 )
 
-        order = Order(
-            cus_id=existing_customer.cus_id,
-            order_deposit=order_info.order_deposit
-        )
-        db.add(order)
-        db.commit()
-        db.refresh(order)
+        # Cached customer lookups by cus_id, then by phone number for the duplicate check
+        customer = find_customer(db, cus_id=order_info.cus_id)
+        if customer and customer["role"] != 'user':
+            customer = None
 
-        for product in order_info.order_product_detail:
-            existing_product = db.query(Product).filter(
-                Product.prod_name == func.lower(product.prod_name)
-            ).first()
+        if not customer:
+            # Registered to anyone (customer or staff): a new account can't take it
+            phone_taken = find_customer(db, phone_number=order_info.phone_number)
+            if phone_taken:
+                raise HTTPException(
+                    status_code=400,
+                    detail="Phone Number already registered",
+                )
 
-            if not existing_product:
-                prod = self.create_product(CreateProduct(prod_name=product.prod_name), db, current_user)
-                prod_id = prod.prod_id
+        try:
+            if customer:
+                db.query(Account).filter(Account.cus_id == customer["cus_id"]).update(
+                    {Account.cus_name: order_info.cus_name, Account.address: order_info.address},
+                    synchronize_session=False,
+                )
+                cus_id = customer["cus_id"]
+                publish_customer_change(db, cus_id, customer["phone_number"])
             else:
-                prod_id = existing_product.prod_id
-
-            order_detail = OrderDetail(
-                order_id=order.order_id,
-                prod_id=prod_id,
-                order_weight=product.order_weight,
-                order_amount=product.order_amount,
-                product_sell_price=product.product_sell_price,
-                product_labor_cost=product.product_labor_cost,
-                product_buy_price=product.product_buy_price,
+                new_customer = Account(
+                    cus_name=order_info.cus_name,
+                    address=order_info.address,
+                    phone_number=order_info.phone_number,
+                    role='user'
+                )
+                # Keep the cus_id reserved through /next-id, if one was submitted
+                if order_info.cus_id and customer_ids.was_issued(db, order_info.cus_id) and not find_customer(db, cus_id=order_info.cus_id):
+                    new_customer.cus_id = order_info.cus_id
+                db.add(new_customer)
+                db.flush()
+                cus_id = new_customer.cus_id
+
+            order = Order(
+                cus_id=cus_id,
+                order_deposit=order_info.order_deposit,
+                **order_totals(order_info.order_product_detail),
+            )
+            if order_info.order_id:
+                order.order_id = order_info.order_id
+            db.add(order)
+            try:
+                db.flush()
+            except IntegrityError:
+                # was_issued only proves the sequence passed the id; another request may have inserted it first
+                if not order_info.order_id:
+                    raise
+                db.rollback()
+                raise HTTPException(
+                    status_code=400,
+                    detail=f"Order ID {order_info.order_id} already exists.",
+                )
+
+            # Resolve every product name in one query, creating the missing ones in one batch
+            product_ids = resolve_product_ids(
+                db,
+                [product.prod_name for product in order_info.order_product_detail],
+                current_user.id,
             )
 
-            db.add(order_detail)
+            details = [
+                {
+                    "order_id": order.order_id,
+                    "prod_id": product_ids[product.prod_name.lower()],
+                    "order_weight": product.order_weight,
+                    **order_weight_fields(product.order_weight),
+                    "order_amount": product.order_amount,
+                    "product_sell_price": product.product_sell_price,
+                    "product_labor_cost": product.product_labor_cost,
+                    "product_buy_price": product.product_buy_price,
+                }
+                for product in order_info.order_product_detail
+            ]
+            if details:
+                db.execute(insert(OrderDetail), details)
+
+            # Reporting rollups move in the same transaction as the order
+            record_orders(db, [(order.order_date, details)])
 
-        db.commit()
+            db.commit()
+        except SQLAlchemyError as e:
+            db.rollback()
+            if customer:
+                forget_customer(customer["cus_id"], customer["phone_number"])  # may have been stale
+            print(f"Error occurred: {str(e)}")
+            raise HTTPException(status_code=500, detail="Database error occurred.")
+
+        # Write-through: keep the cached customer in step with the committed name/address
+        if customer:
+            remember_customer({**customer, "cus_name": order_info.cus_name, "address": order_info.address})
 
         return ResponseModel(
             code=200,
@@ -139,6 +295,20 @@ class Staff:
             message="ផលិតផលរក្សាទុកបានជោគជ័យ"
         )
         
+    def parse_import_order(self, payload: dict) -> CreateOrder:
+        """Validate one imported order; raises ValueError with a row-report friendly message"""
+        return ORDER_IMPORT.check_items(CreateOrder.model_validate(payload))
+
+    def import_orders(self, orders: List[Tuple[List[int], CreateOrder]], db: Session, current_user: Principal, report: ImportReport):
+        """Write one chunk of validated orders in a single transaction (see TicketImport.import_chunk)"""
+        ORDER_IMPORT.import_chunk(orders, db, current_user.id, report)
+
+    def sync_order_id_sequence(self, db: Session):
+        """Keep generated order ids above any order numbers brought in by an import"""
+        # Imported order numbers may overlap any worker's prefetched block; the notice goes out with the sync's commit
+        order_ids.discard_everywhere(db)
+        sync_serial_sequence(db, "orders", "order_id")
+
     def get_client_order(self, db: Session, phone_number: Optional[str] = None, cus_name: Optional[str] = None, cus_id: Optional[int] = None):
         # Build dynamic filters based on provided parameters
         filters = [Account.role == 'user']
@@ -146,7 +316,7 @@ class Staff:
         if phone_number:
             filters.append(Account.phone_number == phone_number)
         if cus_name:
-            filters.append(func.lower(Account.cus_name) == func.lower(cus_name))  # Case-insensitive search
+            filters.append(contains(Account.cus_name, cus_name))  # Case-insensitive partial match (trigram index)
         if cus_id:
             filters.append(Account.cus_id == cus_id)
 
@@ -236,8 +406,8 @@ class Staff:
             result=serialized_products
         )
 
-    def create_product(self, product_info: CreateProduct, db: Session, current_user: dict):
-            existing_product = db.query(Product).filter(Product.prod_name == func.lower(product_info.prod_name)).first()
+    def create_product(self, product_info: CreateProduct, db: Session, current_user: Principal):
+            existing_product = db.query(Product).filter(func.lower(Product.prod_name) == func.lower(product_info.prod_name)).first()
             if existing_product:
                 raise HTTPException(
                     status_code=400,
@@ -249,15 +419,19 @@ class Staff:
                     prod_name = func.lower(product_info.prod_name),
                     unit_price = product_info.unit_price,
                     amount = product_info.amount,
-                    user_id = current_user['id'])
+                    user_id = current_user.id)
                 db.add(product)
+                publish_product_change(db)
                 db.commit()
+                product_catalog.invalidate()
                 db.refresh(product)
                 
             else: 
-                product = Product(prod_name = func.lower(product_info.prod_name), user_id = current_user['id'])
+                product = Product(prod_name = func.lower(product_info.prod_name), user_id = current_user.id)
                 db.add(product)
+                publish_product_change(db)
                 db.commit()
+                product_catalog.invalidate()
                 db.refresh(product)
                 return product
             
@@ -268,55 +442,19 @@ class Staff:
                 message="ការបញ្ជាទិញត្រូវបានជោគជ័យ"
             )
       
-    def get_order_detail(self, db: Session, cus_ids: List[int]):
-        # Ensure we are filtering with multiple `cus_id`s
-        orders = (
-            db.query(
-                Order.order_id,
-                Order.order_deposit,
-                Order.order_date,
-                Product.prod_name,
-                Product.prod_id,
-                OrderDetail.order_weight,
-                OrderDetail.order_amount,
-                OrderDetail.product_sell_price,
-                OrderDetail.product_labor_cost,
-                OrderDetail.product_buy_price,
-            )
-            .join(Order, OrderDetail.order_id == Order.order_id)
-            .join(Product, OrderDetail.prod_id == Product.prod_id)
-            .filter(Order.cus_id.in_(cus_ids))  # Fetch orders for multiple `cus_id`s
-            .all()
-        )
-
-        grouped_orders = defaultdict(lambda: {
-            "order_id": None,
-            "order_deposit": 0,
-            "order_date": "",
-            "products": [],
-        })
+    def get_order_detail(self, db: Session, cus_ids: List[int], query_engine: Optional[str] = None):
+        # Fetch orders for multiple `cus_id`s, one record per order
+        orders = load_order_records(db, queries.ORDER_RECORDS_BY_CUSTOMERS, {"cus_ids": list(cus_ids)}, query_engine=query_engine)
 
-        for order in orders:
-            order_id = order[0]  # `order_id`
-
-            if grouped_orders[order_id]["order_id"] is None:
-                grouped_orders[order_id]["order_id"] = order_id
-                grouped_orders[order_id]["order_deposit"] = order[1]
-                grouped_orders[order_id]["order_date"] = order[2]  # Order Date
-
-            product = {
-                "prod_name": order[3],  # Product Name
-                "prod_id": order[4],  # Product ID
-                "order_weight": order[5],  # Product Weight
-                "order_amount": order[6],  # Order Amount
-                "product_sell_price": order[7],  # Sell Price
-                "product_labor_cost": order[8],  # Labor Cost
-                "product_buy_price": order[9],  # Buy Price
+        return [
+            {
+                "order_id": order["order_id"],
+                "order_deposit": order["order_deposit"],
+                "order_date": order["order_date"],
+                "products": _listing_products(order),
             }
-
-            grouped_orders[order_id]["products"].append(product)  # Append products correctly
-
-        return list(grouped_orders.values())  # Return all orders
+            for order in orders
+        ]
 
     def get_all_client_order(self, db: Session):
         clients_with_orders = db.query(
@@ -354,72 +492,35 @@ class Staff:
             result=clients_data
         )
     
-    def get_client_id(self, cus_id: int, db: Session):  # Changed from str to int
+    def get_client_id(self, cus_id: int, db: Session, query_engine: Optional[str] = None):  # Changed from str to int
         # First check if client exists
-        client = db.query(Account).filter(
-            and_(
-                Account.cus_id == cus_id,
-                Account.role == 'user'
-            )
-        ).first()
+        client = find_customer(db, cus_id=cus_id)
         
-        if not client:
+        if not client or client["role"] != 'user':
             raise HTTPException(status_code=404, detail="Client not found")
         
-        # Get client's order details
-        orders = db.query(
-            Order.order_id,
-            Order.order_deposit,
-            Order.order_date,
-            Product.prod_name,
-            Product.prod_id,
-            OrderDetail.order_weight,
-            OrderDetail.order_amount,
-            OrderDetail.product_sell_price,
-            OrderDetail.product_labor_cost,
-            OrderDetail.product_buy_price,
-        ).join(OrderDetail, Order.order_id == OrderDetail.order_id)\
-        .join(Product, OrderDetail.prod_id == Product.prod_id)\
-        .filter(Order.cus_id == cus_id)\
-        .all()
-        
-        # Group orders by order_id
-        grouped_orders = defaultdict(lambda: {
-            "order_id": None,
-            "order_deposit": 0,
-            "order_date": "",
-            "products": [],
-        })
+        # Get client's order details, one record per order
+        orders = load_order_records(db, queries.ORDER_RECORDS_BY_CUSTOMER, {"cus_id": cus_id}, query_engine=query_engine)
 
-        for order in orders:
-            order_id = order[0]
-
-            if grouped_orders[order_id]["order_id"] is None:
-                grouped_orders[order_id]["order_id"] = order_id
-                grouped_orders[order_id]["order_deposit"] = order[1]
-                grouped_orders[order_id]["order_date"] = order[2].strftime("%Y-%m-%d") if order[2] else ""
-
-            product = {
-                "prod_name": order[3],
-                "prod_id": order[4],
-                "order_weight": order[5],
-                "order_amount": order[6],
-                "product_sell_price": order[7],
-                "product_labor_cost": order[8],
-                "product_buy_price": order[9],
+        grouped_orders = [
+            {
+                "order_id": order["order_id"],
+                "order_deposit": order["order_deposit"],
+                "order_date": order["order_date"].strftime("%Y-%m-%d") if order["order_date"] else "",
+                "products": _listing_products(order),
             }
-
-            grouped_orders[order_id]["products"].append(product)
+            for order in orders
+        ]
 
         # Return the complete client and order information
         result = {
             "client_info": {
-                "cus_id": client.cus_id,
-                "cus_name": client.cus_name,
-                "address": client.address,
-                "phone_number": client.phone_number
+                "cus_id": client["cus_id"],
+                "cus_name": client["cus_name"],
+                "address": client["address"],
+                "phone_number": client["phone_number"]
             },
-            "orders": list(grouped_orders.values()) if grouped_orders else [],
+            "orders": grouped_orders,
             "total_orders": len(grouped_orders)
         }
 
@@ -429,12 +530,9 @@ class Staff:
             result=result
         )
     def get_next_order_id(self, db: Session):
+        """Reserve an order number; submit it back as order_id when creating the order"""
         try:
-            # Get the highest order_id from the database
-            max_order = db.query(func.max(Order.order_id)).scalar()
-            
-            # If no orders exist, start with 1, otherwise increment by 1
-            next_id = 1 if max_order is None else max_order + 1
+            next_id = order_ids.reserve(db)
             
             return ResponseModel(
                 code=200,
@@ -451,7 +549,7 @@ class Staff:
     def get_last_order(self, db: Session):
         """Get the last 3 most recently created orders with all details"""
         try:
-            # Get the last 3 orders (highest order_ids)
+            # Get the last 3 orders (highest order_ids), totals included
             last_orders = db.query(Order).order_by(Order.order_id.desc()).limit(3).all()
             
             if not last_orders:
@@ -462,46 +560,43 @@ class Staff:
                     result=[]
                 )
             
+            # Get the products of all three orders in one query
+            products_by_order = defaultdict(list)
+            order_details = db.query(
+                OrderDetail.order_id,
+                OrderDetail.order_weight,
+                OrderDetail.order_amount,
+                OrderDetail.product_sell_price,
+                OrderDetail.product_labor_cost,
+                OrderDetail.product_buy_price,
+                Product.prod_name,
+                Product.prod_id
+            ).join(Product, OrderDetail.prod_id == Product.prod_id)\
+            .filter(OrderDetail.order_id.in_([order.order_id for order in last_orders]))\
+            .all()
+            for detail in order_details:
+                products_by_order[detail.order_id].append({
+                    "prod_name": detail.prod_name,
+                    "prod_id": detail.prod_id,
+                    "order_weight": detail.order_weight,
+                    "order_amount": detail.order_amount,
+                    "product_sell_price": detail.product_sell_price,
+                    "product_labor_cost": detail.product_labor_cost,
+                    "product_buy_price": detail.product_buy_price,
+                    "subtotal": detail.order_amount * detail.product_sell_price
+                })
+
             orders_result = []
             
             for order in last_orders:
                 # Get client information for each order
-                client = db.query(Account).filter(
-                    and_(
-                        Account.cus_id == order.cus_id,
-                        Account.role == 'user'
-                    )
-                ).first()
+                client = find_customer(db, cus_id=order.cus_id)
+                if client and client["role"] != 'user':
+                    client = None
                 
-                # Get order details with products for each order
-                order_details = db.query(
-                    OrderDetail.order_weight,
-                    OrderDetail.order_amount,
-                    OrderDetail.product_sell_price,
-                    OrderDetail.product_labor_cost,
-                    OrderDetail.product_buy_price,
-                    Product.prod_name,
-                    Product.prod_id
-                ).join(Product, OrderDetail.prod_id == Product.prod_id)\
-                .filter(OrderDetail.order_id == order.order_id)\
-                .all()
-                
-                # Format products data for each order
-                products = []
-                total_amount = 0
-                for detail in order_details:
-                    product = {
-                        "prod_name": detail.prod_name,
-                        "prod_id": detail.prod_id,
-                        "order_weight": detail.order_weight,
-                        "order_amount": detail.order_amount,
-                        "product_sell_price": detail.product_sell_price,
-                        "product_labor_cost": detail.product_labor_cost,
-                        "product_buy_price": detail.product_buy_price,
-                        "subtotal": detail.order_amount * detail.product_sell_price
-                    }
-                    products.append(product)
-                    total_amount += product["subtotal"]
+                products = products_by_order[order.order_id]
+                # Stored total; orders from before totals existed are added up from their lines
+                total_amount = order.total_value if order.total_value is not None else sum(product["subtotal"] for product in products)
                 
                 # Prepare each order's data
                 order_data = {
@@ -513,14 +608,14 @@ class Staff:
                         "remaining_balance": total_amount - order.order_deposit
                     },
                     "client_info": {
-                        "cus_id": client.cus_id,
-                        "cus_name": client.cus_name,
-                        "address": client.address,
-                        "phone_number": client.phone_number
+                        "cus_id": client["cus_id"],
+                        "cus_name": client["cus_name"],
+                        "address": client["address"],
+                        "phone_number": client["phone_number"]
                     } if client else None,
                     "products": products,
                     "summary": {
-                        "total_products": len(products),
+                        "total_products": order.item_count if order.item_count is not None else len(products),
                         "total_amount": total_amount,
                         "deposit_paid": order.order_deposit,
                         "balance_due": total_amount - order.order_deposit
@@ -543,39 +638,64 @@ class Staff:
                 message=f"Failed to retrieve last orders: {str(e)}"
             )
 
-    def get_order_print(self, db: Session, order_id: Optional[int] = None):
+    def iter_order_export(self, db: Session, batch_size: int = 1000) -> Iterator[dict]:
         """
-        Retrieve all orders or a specific order by ID along with customer details.
+        Yield one customer at a time (customer → orders → products) for a full export.
+        Rows come from a server-side cursor ordered by customer and order, so only the
+        current customer is ever held in memory.
         """
-        # Base query for fetching order data
-        order_query = (
-            db.query(
-                Account.cus_id,
-                Account.cus_name,
-                Account.phone_number,
-                Account.address,
-                Order.order_id,
-                Order.order_deposit,
-                Order.order_date,
-                Product.prod_id,
-                Product.prod_name,
-                OrderDetail.order_weight,
-                OrderDetail.order_amount,
-                OrderDetail.product_sell_price,
-                OrderDetail.product_labor_cost,
-                OrderDetail.product_buy_price,
-            )
-            .join(Order, Account.cus_id == Order.cus_id)
-            .join(OrderDetail, Order.order_id == OrderDetail.order_id)
-            .join(Product, OrderDetail.prod_id == Product.prod_id)
-            .filter(Account.role == "user")
-        )
+        rows = db.execute(queries.ORDER_EXPORT, execution_options={"yield_per": batch_size})
+
+        customer = None
+        order = None
+        for row in rows:
+            if customer is None or customer["cus_id"] != row.cus_id:
+                if customer is not None:
+                    yield customer
+                customer = {
+                    "cus_id": row.cus_id,
+                    "customer_name": row.cus_name,
+                    "phone_number": row.phone_number,
+                    "address": row.address,
+                    "orders": [],
+                }
+                order = None
+
+            if order is None or order["order_id"] != row.order_id:
+                order = {
+                    "order_id": row.order_id,
+                    "order_deposit": row.order_deposit,
+                    "order_date": row.order_date.strftime("%Y-%m-%d %H:%M:%S"),
+                    "products": [],
+                    "order_total": 0,
+                }
+                customer["orders"].append(order)
+
+            amount = row.order_amount or 0
+            order["products"].append({
+                "prod_id": row.prod_id,
+                "prod_name": row.prod_name,
+                "order_weight": row.order_weight,
+                "order_amount": row.order_amount,
+                "product_sell_price": row.product_sell_price,
+                "product_labor_cost": row.product_labor_cost,
+                "product_buy_price": row.product_buy_price,
+                "item_profit": amount - ((row.product_labor_cost or 0) + (row.product_buy_price or 0)),
+            })
+            order["order_total"] += amount
 
-        # Filter by specific order_id if provided
-        if order_id:
-            order_query = order_query.filter(Order.order_id == order_id)
+        if customer is not None:
+            yield customer
 
-        orders = order_query.all()
+    def get_order_print(self, db: Session, order_id: Optional[int] = None, query_engine: Optional[str] = None):
+        """
+        Retrieve all orders or a specific order by ID along with customer details.
+        """
+        # Fetch all orders (or only order_id if provided), one record per order
+        if order_id:
+            orders = load_order_records(db, queries.ORDER_RECORDS_BY_ID, {"order_id": order_id}, query_engine=query_engine)
+        else:
+            orders = load_order_records(db, queries.USER_ORDER_RECORDS, query_engine=query_engine)
 
         # Handle empty results
         if not orders:
@@ -586,44 +706,53 @@ class Staff:
                 result=[]
             )
 
+        def print_products(order):
+            return [
+                {
+                    "prod_id": product["prod_id"],
+                    "prod_name": product["prod_name"],
+                    "order_weight": product["order_weight"],
+                    "order_amount": product["order_amount"],
+                    "product_sell_price": product["product_sell_price"],
+                    "product_labor_cost": product["product_labor_cost"],
+                    "product_buy_price": product["product_buy_price"],
+                    "item_profit": product["order_amount"] - ((product["product_labor_cost"] or 0) + (product["product_buy_price"] or 0))
+                }
+                for product in order["products"]
+            ]
+
+        def print_total_amount(order):
+            if order["total_amount"] is not None:
+                return order["total_amount"]
+            return sum(product["order_amount"] for product in order["products"])
+
         # Structure the response differently based on whether we're fetching a single order or all orders
         if order_id:
             # Single order response - more detailed structure
-            order_data = orders[0]  # Get first row for basic info
+            order_data = orders[0]
             
-            # Calculate totals for the order
-            total_amount = sum(order[10] for order in orders)  # order_amount
-            total_cost = sum((order[12] or 0) + (order[13] or 0) for order in orders)  # labor_cost + buy_price
+            # Stored totals (see totals.py), recomputed from the lines only for orders not yet backfilled
+            total_amount = print_total_amount(order_data)
+            total_cost = order_data["total_cost"]
+            if total_cost is None:
+                total_cost = sum((product["product_labor_cost"] or 0) + (product["product_buy_price"] or 0) for product in order_data["products"])
             
             response_data = {
-                "order_id": order_data[4],
-                "order_deposit": order_data[5],
-                "order_date": order_data[6].strftime("%Y-%m-%d %H:%M:%S"),
+                "order_id": order_data["order_id"],
+                "order_deposit": order_data["order_deposit"],
+                "order_date": order_data["order_date"].strftime("%Y-%m-%d %H:%M:%S"),
                 "total_amount": total_amount,
                 "total_cost": total_cost,
                 "profit": total_amount - total_cost,
                 "customer": {
-                    "cus_id": order_data[0],
-                    "customer_name": order_data[1],
-                    "phone_number": order_data[2],
-                    "address": order_data[3]
+                    "cus_id": order_data["cus_id"],
+                    "customer_name": order_data["cus_name"],
+                    "phone_number": order_data["phone_number"],
+                    "address": order_data["address"]
                 },
-                "products": []
+                "products": print_products(order_data)
             }
             
-            # Add all products for this order
-            for order in orders:
-                response_data["products"].append({
-                    "prod_id": order[7],
-                    "prod_name": order[8],
-                    "order_weight": order[9],
-                    "order_amount": order[10],
-                    "product_sell_price": order[11],
-                    "product_labor_cost": order[12],
-                    "product_buy_price": order[13],
-                    "item_profit": order[10] - ((order[12] or 0) + (order[13] or 0))
-                })
-            
             return ResponseModel(
                 code=200,
                 status="Success",
@@ -636,48 +765,26 @@ class Staff:
             order_list = {}
             
             for order in orders:
-                cus_id = order[0]
-                order_id_current = order[4]
+                cus_id = order["cus_id"]
 
                 if cus_id not in order_list:
                     order_list[cus_id] = {
                         "cus_id": cus_id,
-                        "customer_name": order[1],
-                        "phone_number": order[2],
-                        "address": order[3],
-                        "orders": {}
-                    }
-
-                # Group products by order_id within each customer
-                if order_id_current not in order_list[cus_id]["orders"]:
-                    order_list[cus_id]["orders"][order_id_current] = {
-                        "order_id": order_id_current,
-                        "order_deposit": order[5],
-                        "order_date": order[6].strftime("%Y-%m-%d %H:%M:%S"),
-                        "products": [],
-                        "order_total": 0
+                        "customer_name": order["cus_name"],
+                        "phone_number": order["phone_number"],
+                        "address": order["address"],
+                        "orders": []
                     }
 
-                # Add product to the specific order
-                product_data = {
-                    "prod_id": order[7],
-                    "prod_name": order[8],
-                    "order_weight": order[9],
-                    "order_amount": order[10],
-                    "product_sell_price": order[11],
-                    "product_labor_cost": order[12],
-                    "product_buy_price": order[13],
-                    "item_profit": order[10] - ((order[12] or 0) + (order[13] or 0))
-                }
-                
-                order_list[cus_id]["orders"][order_id_current]["products"].append(product_data)
-                order_list[cus_id]["orders"][order_id_current]["order_total"] += order[10]
+                order_list[cus_id]["orders"].append({
+                    "order_id": order["order_id"],
+                    "order_deposit": order["order_deposit"],
+                    "order_date": order["order_date"].strftime("%Y-%m-%d %H:%M:%S"),
+                    "products": print_products(order),
+                    "order_total": print_total_amount(order)
+                })
 
-            # Convert nested dict structure to list format
-            result = []
-            for customer_data in order_list.values():
-                customer_data["orders"] = list(customer_data["orders"].values())
-                result.append(customer_data)
+            result = list(order_list.values())
 
             return ResponseModel(
                 code=200,
@@ -685,3 +792,45 @@ class Staff:
                 message=f"Retrieved {len(result)} customers with orders.",
                 result=result
             )
+
+class AsyncStaff:
+    """
+    Asyncio variant of Staff used when ASYNC_DATABASE is enabled.
+    Runs the same repository code on the AsyncSession's underlying Session via run_sync,
+    so every query is awaited on the event loop instead of holding a threadpool worker.
+    """
+    def __init__(self):
+        self.staff = Staff()
+
+    def is_staff(self, current_user: Principal):
+        self.staff.is_staff(current_user)
+
+    async def create_order(self, order_info: CreateOrder, db: AsyncSession, current_user: Principal):
+        return await db.run_sync(lambda session: self.staff.create_order(order_info, session, current_user))
+
+    def parse_import_order(self, payload: dict) -> CreateOrder:
+        return self.staff.parse_import_order(payload)
+
+    async def import_orders(self, orders: List[Tuple[List[int], CreateOrder]], db: AsyncSession, current_user: Principal, report: ImportReport):
+        await db.run_sync(lambda session: self.staff.import_orders(orders, session, current_user, report))
+
+    async def sync_order_id_sequence(self, db: AsyncSession):
+        await db.run_sync(lambda session: self.staff.sync_order_id_sequence(session))
+
+    async def get_client_order(self, db: AsyncSession, phone_number: Optional[str] = None, cus_name: Optional[str] = None, cus_id: Optional[int] = None):
+        return await db.run_sync(lambda session: self.staff.get_client_order(session, phone_number, cus_name, cus_id))
+
+    async def get_all_client_order(self, db: AsyncSession):
+        return await db.run_sync(lambda session: self.staff.get_all_client_order(session))
+
+    async def get_client_id(self, cus_id: int, db: AsyncSession):
+        return await db.run_sync(lambda session: self.staff.get_client_id(cus_id, session))
+
+    async def get_next_order_id(self, db: AsyncSession):
+        return await db.run_sync(lambda session: self.staff.get_next_order_id(session))
+
+    async def get_last_order(self, db: AsyncSession):
+        return await db.run_sync(lambda session: self.staff.get_last_order(session))
+
+    async def get_order_print(self, db: AsyncSession, order_id: Optional[int] = None):
+        return await db.run_sync(lambda session: self.staff.get_order_print(session, order_id))
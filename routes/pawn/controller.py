@@ -1,12 +1,17 @@
 from typing import List
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
+from export_stream import export_response
+from bulk_import import ImportReport, detect_format, iter_grouped_records, run_import
 # from models import Account
 from database import get_db
 from response_model import ResponseModel
-from routes.oauth2.repository import get_current_user
-from routes.pawn.repository import Staff
+from routes.oauth2.repository import get_current_staff
+from routes.oauth2.model import Principal
+from routes.pawn.repository import Staff, PAWN_IMPORT_DETAIL_COLUMNS, DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
 from routes.pawn.model import *
+from scheduler import PAWN_DUE_HORIZON_DAYS
 # from routes.user.model import CreatePawn 
 
 router = APIRouter(
@@ -20,43 +25,75 @@ staff_service = Staff()
 """ Manage Pawn and Payment """ 
 @router.get("/pawn", response_model=ResponseModel)
 def get_pawn_by_id(
-    db: Session = Depends(get_db), 
-    current_user: dict = Depends(get_current_user)
+    cursor: Optional[int] = Query(None, description="next_cursor from the previous page"),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    db: Session = Depends(get_db),
+    current_user: Principal = Depends(get_current_staff)
 ):
-    staff.is_staff(current_user)
-    result = staff.get_all_pawn_details(db)  # Use the new method
-    
+    result, next_cursor = staff.get_all_pawn_details(db, cursor, limit)
+
     return ResponseModel(
         code=200,
-        status="success", 
+        status="success",
         message="Pawn details retrieved successfully",
-        result=result
+        result=result,
+        next_cursor=next_cursor
     )
 
 @router.post("/pawn", response_model = ResponseModel)
 def create_pawn(
     pawn_info: CreatePawn, 
     db: Session = Depends(get_db), 
-    current_user: dict = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_staff)
 ):
-    staff.is_staff(current_user)
     return staff.create_pawn(pawn_info, db, current_user)
 
+@router.post("/pawn/import", response_model=ResponseModel)
+async def import_pawns(
+    request: Request,
+    file_format: Optional[str] = Query(None, alias="format"),
+    chunk_size: int = Query(500, ge=1, le=5000),
+    db: Session = Depends(get_db),
+    current_user: Principal = Depends(get_current_staff)
+):
+    """
+    Bulk import pawn tickets from a streamed upload: CSV (one row per item, rows of the same
+    ticket share pawn_id) or NDJSON (one CreatePawn object per line). Returns a per-row error report.
+    """
+    report = ImportReport()
+    records = iter_grouped_records(
+        request, detect_format(request, file_format), "pawn_id", "pawn_product_detail", PAWN_IMPORT_DETAIL_COLUMNS
+    )
+
+    await run_import(
+        records,
+        staff.parse_import_pawn,
+        lambda batch: run_in_threadpool(staff.import_pawns, batch, db, current_user, report),
+        report,
+        chunk_size,
+    )
+    await run_in_threadpool(staff.sync_pawn_id_sequence, db)
+
+    return ResponseModel(
+        code=200,
+        status="Success",
+        message=f"Imported {report.imported_records} pawn tickets ({report.failed_rows} rows failed)",
+        result=report.as_dict()
+    )
+
 @router.get("/pawn/all_client", response_model=ResponseModel)
 def get_all_client_pawn(
     db: Session = Depends(get_db),
-    current_user: dict = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_staff)
 ):
-    staff.is_staff(current_user)
     return staff.get_all_client_pawn(db)
 
 @router.get("/pawn/client/{cus_id}", response_model=ResponseModel)
 def get_client_id(
     cus_id: int,
     db: Session = Depends(get_db),
-    current_user: dict = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_staff)
 ):
-    staff.is_staff(current_user)
     return staff.get_client_id(cus_id, db)
 
 @router.get("/pawn/search", response_model=ResponseModel)
@@ -65,25 +102,40 @@ def get_client_pawn(
     cus_name: Optional[str] = None,
     cus_id: Optional[int] = None,
     db: Session = Depends(get_db),
-    current_user: dict = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_staff)
 ):
-    staff.is_staff(current_user)
     return staff.get_client_pawn(db, phone_number, cus_name, cus_id)
 
+@router.get("/pawn/export")
+def export_pawns(
+    file_format: str = Query("ndjson", alias="format", pattern="^(ndjson|json)$"),
+    current_user: Principal = Depends(get_current_staff)
+):
+    """Stream every pawn grouped by customer as NDJSON (one customer per line) or a chunked JSON array"""
+    return export_response(staff.iter_pawn_export, file_format, "pawn_export")
+
 @router.get("/pawn/next-id", response_model=ResponseModel)
 def get_next_pawn_id(
     db: Session = Depends(get_db),
-    current_user: dict = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_staff)
 ):
-    staff.is_staff(current_user)
     return staff.get_next_pawn_id(db)
 
+@router.get("/pawn/expiring", response_model=ResponseModel)
+def get_expiring_pawns(
+    days: int = Query(7, ge=0, le=PAWN_DUE_HORIZON_DAYS, description="Expiring within this many days"),
+    include_overdue: bool = Query(True, description="Also list pawns already past their expiry date"),
+    db: Session = Depends(get_db),
+    current_user: Principal = Depends(get_current_staff)
+):
+    """Pawns coming due, from the state the scheduler precomputes (refreshed every SCHEDULER_INTERVAL)"""
+    return staff.get_expiring_pawns(db, days, include_overdue)
+
 @router.get("/pawn/last", response_model=ResponseModel)
 def get_last_pawns(
     db: Session = Depends(get_db),
-    current_user: dict = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_staff)
 ):
-    staff.is_staff(current_user)
     return staff.get_last_pawns(db)
 
 
@@ -91,7 +143,6 @@ def get_last_pawns(
 def get_pawn_by_id(
     pawn_id: Optional[int] = None, 
     db: Session = Depends(get_db),
-    current_user: dict = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_staff)
 ):
-    staff.is_staff(current_user)
     return staff.get_pawn_print(db, pawn_id)
\ No newline at end of file
@@ -60,6 +60,7 @@ class CreatePawn(BaseModel):
     pawn_date: Optional[date] = None
     pawn_expire_date: Optional[date] = None
     pawn_deposit: Optional[float] = 0
+    interest_rate: Optional[float] = Field(None, ge=0, description="Monthly interest in percent (default PAWN_INTEREST_RATE)")
     # products: List[PawnProducts] = []
     pawn_product_detail: List[PawnProductDetail] = Field(default_factory=list)
     
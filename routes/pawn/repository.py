@@ -1,104 +1,278 @@
 from fastapi import HTTPException
 from routes.user.model import *
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from entities import *
 from response_model import ResponseModel
+from routes.oauth2.model import Principal
+from database import LISTING_QUERY_ENGINE
+from routes.product.repository import product_catalog, publish_product_change, resolve_product_ids
+from routes.search.repository import contains
+from routes.client.repository import find_customer, remember_customer, forget_customer, publish_customer_change
 from typing import List, Dict
 # from app.models import Client, Pawn
+from sqlalchemy import insert
+from sqlalchemy.sql import Select
 from sqlalchemy.sql import func, or_, and_
-from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
 from collections import defaultdict
-from typing import Dict, Any
+from datetime import datetime, timedelta
+from typing import Dict, Any, Iterator, Tuple
+from bulk_import import ImportReport, TicketImport, sync_serial_sequence
+from id_allocator import pawn_ids, customer_ids
+from totals import pawn_line_grams, pawn_totals
+import queries
+from queries import PAWN_PRODUCT_COLUMNS, PAWN_SUMMARY_COLUMNS
+from weights import pawn_weight_fields
+from routes.report.rollups import record_pawns
+
+def group_pawn_rows(rows) -> List[dict]:
+    """Group flat PAWN_DETAIL_COLUMNS rows into one record per pawn, in first-seen order, in a single pass"""
+    grouped_pawns = {}
+    summary_width = len(PAWN_SUMMARY_COLUMNS)
+
+    for row in rows:
+        record = grouped_pawns.get(row.pawn_id)
+        if record is None:
+            record = grouped_pawns[row.pawn_id] = {
+                column.key: row[index] for index, column in enumerate(PAWN_SUMMARY_COLUMNS)
+            }
+            record["products"] = []
+
+        record["products"].append({
+            column.key: row[index] for index, column in enumerate(PAWN_PRODUCT_COLUMNS, summary_width)
+        })
+
+    return list(grouped_pawns.values())
+
+def load_pawn_records(
+    db: Session,
+    statements: Dict[bool, Select] = queries.USER_PAWN_RECORDS,
+    params: Optional[dict] = None,
+    criteria: tuple = (),
+    query_engine: Optional[str] = None,
+) -> List[dict]:
+    """
+    Fetch pawns as records: the PAWN_SUMMARY_COLUMNS keys plus a `products` list. `statements` is one
+    of the pre-built pairs in queries.py, run with `params`; extra `criteria` are for ad hoc filters.
+    The "python" engine fetches the flat join and groups it with group_pawn_rows; the "json" engine
+    lets Postgres build the nested products with json_agg, returning one row per pawn.
+    """
+    engine = query_engine or LISTING_QUERY_ENGINE
+    nested = engine == "json"
+
+    statement = statements[nested]
+    if criteria:
+        statement = statement.where(*criteria)
+    rows = db.execute(statement, params or {})
+
+    if nested:
+        return [dict(row._mapping) for row in rows]
+    return group_pawn_rows(rows)
+
+def format_pawn_listing(record: dict) -> dict:
+    """Shape a pawn record for the /pawn listing and search responses (each product listed once)"""
+    seen_products = set()
+    products = []
+    for product in record["products"]:
+        if product["prod_id"] in seen_products:
+            continue
+        seen_products.add(product["prod_id"])
+        products.append(product)
+
+    return {
+        "pawn_id": record["pawn_id"],
+        "cus_id": record["cus_id"],
+        "customer_name": record["cus_name"],
+        "phone_number": record["phone_number"],
+        "address": record["address"],
+        "pawn_deposit": float(record["pawn_deposit"]) if record["pawn_deposit"] else 0,
+        "pawn_date": str(record["pawn_date"]) if record["pawn_date"] else "",
+        "pawn_expire_date": str(record["pawn_expire_date"]) if record["pawn_expire_date"] else "",
+        "products": [
+            {
+                "prod_id": product["prod_id"],
+                "prod_name": product["prod_name"],
+                "pawn_weight": product["pawn_weight"] or "",
+                "pawn_amount": product["pawn_amount"] or 0,
+                "pawn_unit_price": float(product["pawn_unit_price"]) if product["pawn_unit_price"] else 0,
+            }
+            for product in products
+        ],
+    }
+
+# Keyset pagination limits for pawn listings
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+# CSV columns that describe one pawned item; every other column describes the ticket
+PAWN_IMPORT_DETAIL_COLUMNS = ("prod_id", "prod_name", "pawn_weight", "pawn_amount", "pawn_unit_price")
+
+# Pawn-specific columns of a bulk import (bulk_import.TicketImport does the rest)
+PAWN_IMPORT = TicketImport(
+    label="pawn",
+    ticket_model=Pawn,
+    detail_model=PawnDetail,
+    ids=pawn_ids,
+    id_field="pawn_id",
+    detail_field="pawn_product_detail",
+    required_item_fields=("pawn_weight", "pawn_amount", "pawn_unit_price"),
+    ticket_row=lambda pawn_info: {
+        "pawn_date": pawn_info.pawn_date or datetime.utcnow(),
+        "pawn_deposit": pawn_info.pawn_deposit or 0,
+        "pawn_expire_date": pawn_info.pawn_expire_date,
+        "interest_rate": pawn_info.interest_rate,
+        **pawn_totals(pawn_info.pawn_product_detail),
+    },
+    detail_row=lambda pawn_info, product: {
+        "pawn_weight": product.pawn_weight,
+        **pawn_weight_fields(product.pawn_weight),
+        "pawn_amount": product.pawn_amount,
+        "pawn_unit_price": product.pawn_unit_price,
+    },
+    record_rollups=lambda db, written: record_pawns(
+        db, [(pawn_info.pawn_date, pawn_info.pawn_deposit, details) for pawn_info, details in written]
+    ),
+)
 
 class Staff:
-    def is_staff(self, current_user: dict):
-        if current_user['role'] != 'admin':
+    def is_staff(self, current_user: Principal):
+        if current_user.role != 'admin':
             raise HTTPException(
                 status_code=403,
                 detail="Permission denied",
             )
               
               
-    def create_pawn(self, pawn_info: CreatePawn, db: Session, current_user: dict):
+    def create_pawn(self, pawn_info: CreatePawn, db: Session, current_user: Principal):
+            """Create a pawn ticket, its customer, products and details in a single transaction"""
             if pawn_info.pawn_date > pawn_info.pawn_expire_date:
                 raise HTTPException(
                     status_code=400,
                     detail="Pawn date must be before the expire date.",
                 )
 
-            # ✅ Check if the provided pawn_id already exists
-            existing_pawn = db.query(Pawn).filter(Pawn.pawn_id == pawn_info.pawn_id).first()
-            
-            if existing_pawn:
+            if any(not product.prod_name for product in pawn_info.pawn_product_detail):
                 raise HTTPException(
                     status_code=400,
-                    detail=f"Pawn record with ID {pawn_info.pawn_id} already exists."
+                    detail="Product name is required for every pawn item.",
                 )
 
-            # ✅ Check if customer exists by phone number or cus_id
-            existing_customer = db.query(Account).filter(
-                or_(
-                    Account.phone_number == pawn_info.phone_number, 
-                    Account.cus_id == pawn_info.cus_id
-                ),
-                Account.role == 'user'
-            ).first()
-
-            if existing_customer:
-                # ✅ Update existing customer's name and address
-                existing_customer.cus_name = pawn_info.cus_name
-                existing_customer.address = pawn_info.address
-                db.commit()
-                db.refresh(existing_customer)
-            else:
-                # ✅ Create a new customer if not found
-                existing_customer = self.create_client(
-                    CreateClient(
-                        cus_name=pawn_info.cus_name,
-                        phone_number=pawn_info.phone_number,
-                        address=pawn_info.address
-                    ), 
-                    db, 
-                    True
-                )
+            # Lines sharing a product would collide on the (pawn_id, prod_id) key; the import rejects them the same way
+            duplicate = PAWN_IMPORT.duplicate_product(pawn_info.pawn_product_detail)
+            if duplicate:
+                raise HTTPException(status_code=400, detail=duplicate)
+
+            # ✅ A submitted pawn_id must have been reserved through /next-id, and still be free
+            if pawn_info.pawn_id:
+                if not pawn_ids.was_issued(db, pawn_info.pawn_id):
+                    raise HTTPException(
+                        status_code=400,
+                        detail=f"Pawn ID {pawn_info.pawn_id} was not reserved.",
+                    )
+                existing_pawn = db.query(Pawn.pawn_id).filter(Pawn.pawn_id == pawn_info.pawn_id).first()
 
-            # ✅ Create a new Pawn record
-            pawn = Pawn(
-                cus_id=existing_customer.cus_id,
-                pawn_date=pawn_info.pawn_date,
-                pawn_deposit=pawn_info.pawn_deposit,
-                pawn_expire_date=pawn_info.pawn_expire_date
-            )
+                if existing_pawn:
+                    raise HTTPException(
+                        status_code=400,
+                        detail=f"Pawn record with ID {pawn_info.pawn_id} already exists."
+                    )
 
-            db.add(pawn)
-            db.commit()
-            db.refresh(pawn)
+            # ✅ Check if customer exists by phone number or cus_id (cached lookups)
+            by_phone = find_customer(db, phone_number=pawn_info.phone_number)
+            customer = by_phone if by_phone and by_phone["role"] == "user" else None
+            if customer is None and pawn_info.cus_id:
+                by_id = find_customer(db, cus_id=pawn_info.cus_id)
+                customer = by_id if by_id and by_id["role"] == "user" else None
 
-            # ✅ Insert Pawn Products (Allow multiple products per pawn)
-            for product in pawn_info.pawn_product_detail:
-                # 🔹 Ensure product exists or create new one
-                existing_product = db.query(Product).filter(
-                    Product.prod_name.ilike(product.prod_name)
-                ).first()
+            if not customer and by_phone:
+                raise HTTPException(
+                    status_code=400,
+                    detail="Phone Number already registered",
+                )
 
-                if not existing_product:
-                    prod = self.create_product(CreateProduct(prod_name=product.prod_name), db, current_user)
-                    prod_id = prod.prod_id
+            try:
+                if customer:
+                    # ✅ Update existing customer's name and address
+                    db.query(Account).filter(Account.cus_id == customer["cus_id"]).update(
+                        {Account.cus_name: pawn_info.cus_name, Account.address: pawn_info.address},
+                        synchronize_session=False,
+                    )
+                    cus_id = customer["cus_id"]
+                    publish_customer_change(db, cus_id, customer["phone_number"])
                 else:
-                    prod_id = existing_product.prod_id
-
-                # ✅ Create PawnDetail for each product
-                pawn_detail = PawnDetail(
-                    pawn_id=pawn.pawn_id,
-                    prod_id=prod_id,
-                    pawn_weight=product.pawn_weight,
-                    pawn_amount=product.pawn_amount,
-                    pawn_unit_price=product.pawn_unit_price
+                    # ✅ Create a new customer if not found (under the reserved cus_id, if one was submitted)
+                    new_customer = Account(
+                        cus_name=pawn_info.cus_name,
+                        address=pawn_info.address,
+                        phone_number=pawn_info.phone_number,
+                    )
+                    if pawn_info.cus_id and customer_ids.was_issued(db, pawn_info.cus_id) and not find_customer(db, cus_id=pawn_info.cus_id):
+                        new_customer.cus_id = pawn_info.cus_id
+                    db.add(new_customer)
+                    db.flush()
+                    cus_id = new_customer.cus_id
+
+                # ✅ Create a new Pawn record (flush only to get its pawn_id)
+                pawn = Pawn(
+                    cus_id=cus_id,
+                    pawn_date=pawn_info.pawn_date,
+                    pawn_deposit=pawn_info.pawn_deposit,
+                    pawn_expire_date=pawn_info.pawn_expire_date,
+                    interest_rate=pawn_info.interest_rate,
+                    **pawn_totals(pawn_info.pawn_product_detail),
+                )
+                if pawn_info.pawn_id:
+                    pawn.pawn_id = pawn_info.pawn_id
+                db.add(pawn)
+                try:
+                    db.flush()
+                except IntegrityError:
+                    # was_issued only proves the sequence passed the id; another request may have inserted it first
+                    if not pawn_info.pawn_id:
+                        raise
+                    db.rollback()
+                    raise HTTPException(
+                        status_code=400,
+                        detail=f"Pawn record with ID {pawn_info.pawn_id} already exists.",
+                    )
+
+                # ✅ Resolve every product name in one query, creating the missing ones in one batch
+                product_ids = resolve_product_ids(
+                    db,
+                    [product.prod_name for product in pawn_info.pawn_product_detail],
+                    current_user.id,
                 )
 
-                db.add(pawn_detail)
+                # ✅ Insert all PawnDetail rows in one executemany
+                details = [
+                    {
+                        "pawn_id": pawn.pawn_id,
+                        "prod_id": product_ids[product.prod_name.lower()],
+                        "pawn_weight": product.pawn_weight,
+                        **pawn_weight_fields(product.pawn_weight),
+                        "pawn_amount": product.pawn_amount,
+                        "pawn_unit_price": product.pawn_unit_price,
+                    }
+                    for product in pawn_info.pawn_product_detail
+                ]
+                if details:
+                    db.execute(insert(PawnDetail), details)
 
-            db.commit()  # ✅ Commit all pawn details at once for efficiency
+                # ✅ Reporting rollups move in the same transaction as the ticket
+                record_pawns(db, [(pawn.pawn_date, pawn.pawn_deposit, details)])
+
+                db.commit()  # ✅ Single commit: customer, pawn, products and details are atomic
+            except SQLAlchemyError as e:
+                db.rollback()
+                if customer:
+                    forget_customer(customer["cus_id"], customer["phone_number"])  # may have been stale
+                print(f"Error occurred: {str(e)}")
+                raise HTTPException(status_code=500, detail="Database error occurred.")
+
+            # ✅ Write-through: keep the cached customer in step with the committed name/address
+            if customer:
+                remember_customer({**customer, "cus_name": pawn_info.cus_name, "address": pawn_info.address})
 
             return ResponseModel(
                 code=200,
@@ -106,9 +280,28 @@ class Staff:
                 message=f"Pawn record created successfully with multiple products. (Pawn ID: {pawn.pawn_id})"
             )
 
+    def parse_import_pawn(self, payload: dict) -> CreatePawn:
+        """Validate one imported ticket; raises ValueError with a row-report friendly message"""
+        pawn_info = CreatePawn.model_validate(payload)
+
+        if not pawn_info.pawn_expire_date:
+            raise ValueError("pawn_expire_date is required")
+        if pawn_info.pawn_date and pawn_info.pawn_date > pawn_info.pawn_expire_date:
+            raise ValueError("Pawn date must be before the expire date.")
+        return PAWN_IMPORT.check_items(pawn_info)
+
+    def import_pawns(self, tickets: List[Tuple[List[int], CreatePawn]], db: Session, current_user: Principal, report: ImportReport):
+        """Write one chunk of validated tickets in a single transaction (see TicketImport.import_chunk)"""
+        PAWN_IMPORT.import_chunk(tickets, db, current_user.id, report)
+
+    def sync_pawn_id_sequence(self, db: Session):
+        """Keep generated pawn ids above any ticket numbers brought in by an import"""
+        # Imported ticket numbers may overlap any worker's prefetched block; the notice goes out with the sync's commit
+        pawn_ids.discard_everywhere(db)
+        sync_serial_sequence(db, "pawns", "pawn_id")
+
     def create_client(self, client_info: CreateClient, db: Session, not_exist: bool = False):
-        existing_client = db.query(Account).filter(Account.phone_number == client_info.phone_number).first()
-        if existing_client:
+        if find_customer(db, phone_number=client_info.phone_number):
             raise HTTPException(
                 status_code=400,
                 detail="Phone Number already registered",
@@ -145,8 +338,8 @@ class Staff:
             message="Client created successfully"
         )
         
-    def create_product(self, product_info: CreateProduct, db: Session, current_user: dict):
-            existing_product = db.query(Product).filter(Product.prod_name == func.lower(product_info.prod_name)).first()
+    def create_product(self, product_info: CreateProduct, db: Session, current_user: Principal):
+            existing_product = db.query(Product).filter(func.lower(Product.prod_name) == func.lower(product_info.prod_name)).first()
             if existing_product:
                 raise HTTPException(
                     status_code=400,
@@ -158,15 +351,19 @@ class Staff:
                     prod_name = func.lower(product_info.prod_name),
                     unit_price = product_info.unit_price,
                     amount = product_info.amount,
-                    user_id = current_user['id'])
+                    user_id = current_user.id)
                 db.add(product)
+                publish_product_change(db)
                 db.commit()
+                product_catalog.invalidate()
                 db.refresh(product)
                 
             else: 
-                product = Product(prod_name = func.lower(product_info.prod_name), user_id = current_user['id'])
+                product = Product(prod_name = func.lower(product_info.prod_name), user_id = current_user.id)
                 db.add(product)
+                publish_product_change(db)
                 db.commit()
+                product_catalog.invalidate()
                 db.refresh(product)
                 return product
             
@@ -184,7 +381,7 @@ class Staff:
         if phone_number:
             filters.append(Account.phone_number == phone_number)
         if cus_name:
-            filters.append(func.lower(Account.cus_name) == func.lower(cus_name))  # Case-insensitive search
+            filters.append(contains(Account.cus_name, cus_name))  # Case-insensitive partial match (trigram index)
         if cus_id:
             filters.append(Account.cus_id == cus_id)
 
@@ -227,6 +424,7 @@ class Staff:
         cus_id: Optional[int] = None,
         phone_number: Optional[str] = None,
         cus_name: Optional[str] = None,
+        query_engine: Optional[str] = None,
     ):
         """Get pawn details with search conditions - supports both single ID and list of IDs"""
         
@@ -250,148 +448,37 @@ class Staff:
         if not search_conditions:
             return []
         
-        pawns = (
-            db.query(
-                Account.cus_id,  # 0
-                Account.cus_name, # 1
-                Account.phone_number, # 2
-                Account.address, # 3
-                Pawn.pawn_id, # 4
-                Pawn.pawn_deposit, # 5
-                Pawn.pawn_date, # 6
-                Pawn.pawn_expire_date, # 7
-                Product.prod_id, # 8
-                Product.prod_name, # 9
-                PawnDetail.pawn_weight, # 10
-                PawnDetail.pawn_amount, # 11
-                PawnDetail.pawn_unit_price, # 12
-            )
-            .select_from(Account)
-            .join(Pawn, Account.cus_id == Pawn.cus_id)
-            .join(PawnDetail, Pawn.pawn_id == PawnDetail.pawn_id)
-            .join(Product, PawnDetail.prod_id == Product.prod_id)
-            .filter(
-                and_(
-                    or_(*search_conditions),
-                    Account.role == "user",
-                )
-            )
-            .all()
+        pawns = load_pawn_records(
+            db,
+            criteria=(or_(*search_conditions),),
+            query_engine=query_engine,
         )
 
-        grouped_pawns = defaultdict(lambda: {
-            "pawn_id": None,
-            "cus_id": None,
-            "customer_name": "",
-            "phone_number": "",
-            "address": "",
-            "pawn_deposit": 0,
-            "pawn_date": "",
-            "pawn_expire_date": "",
-            "products": [],
-        })
-
-        for pawn in pawns:
-            pawn_id = pawn[4]
-            if grouped_pawns[pawn_id]["pawn_id"] is None:
-                grouped_pawns[pawn_id].update({
-                    "pawn_id": pawn[4],
-                    "cus_id": pawn[0],
-                    "customer_name": pawn[1],
-                    "phone_number": pawn[2],
-                    "address": pawn[3],
-                    "pawn_deposit": float(pawn[5]) if pawn[5] else 0,
-                    "pawn_date": str(pawn[6]) if pawn[6] else "",
-                    "pawn_expire_date": str(pawn[7]) if pawn[7] else "",
-                })
-
-            product = {
-                "prod_id": pawn[8],
-                "prod_name": pawn[9],
-                "pawn_weight": pawn[10] or "",
-                "pawn_amount": pawn[11] or 0,
-                "pawn_unit_price": float(pawn[12]) if pawn[12] else 0,
-            }
-
-            # Check if product already exists before appending
-            product_exists = any(
-                p["prod_id"] == product["prod_id"] 
-                for p in grouped_pawns[pawn_id]["products"]
-            )
-            if not product_exists:
-                grouped_pawns[pawn_id]["products"].append(product)
-
-        return list(grouped_pawns.values())
+        return [format_pawn_listing(pawn) for pawn in pawns]
         
-    def get_all_pawn_details(self, db: Session):
-        """Get all pawn details without search conditions"""
-        pawns = (
-            db.query(
-                Account.cus_id,  # 0
-                Account.cus_name, # 1
-                Account.phone_number, # 2
-                Account.address, # 3
-                Pawn.pawn_id, # 4
-                Pawn.pawn_deposit, # 5
-                Pawn.pawn_date, # 6
-                Pawn.pawn_expire_date, # 7
-                Product.prod_id, # 8
-                Product.prod_name, # 9
-                PawnDetail.pawn_weight, # 10
-                PawnDetail.pawn_amount, # 11
-                PawnDetail.pawn_unit_price, # 12
-            )
-            .select_from(Account)
-            .join(Pawn, Account.cus_id == Pawn.cus_id)
-            .join(PawnDetail, Pawn.pawn_id == PawnDetail.pawn_id)
-            .join(Product, PawnDetail.prod_id == Product.prod_id)
-            .filter(Account.role == "user")
-            .all()
-        )
+    def get_all_pawn_details(self, db: Session, cursor: Optional[int] = None, limit: int = DEFAULT_PAGE_SIZE, query_engine: Optional[str] = None):
+        """
+        Get one page of pawn details, newest first, using keyset pagination on pawn_id.
+        Returns (pawns, next_cursor); pass next_cursor back as `cursor` for the following page.
+        """
+        limit = max(1, min(limit, MAX_PAGE_SIZE))
 
-        grouped_pawns = defaultdict(lambda: {
-            "pawn_id": None,
-            "cus_id": None,
-            "customer_name": "",
-            "phone_number": "",
-            "address": "",
-            "pawn_deposit": 0,
-            "pawn_date": "",
-            "pawn_expire_date": "",
-            "products": [],
-        })
+        # Walk the pawn_id index to pick the page, then fetch details only for those pawns
+        if cursor is None:
+            page = db.execute(queries.PAWN_PAGE_IDS, {"limit": limit + 1})
+        else:
+            page = db.execute(queries.PAWN_PAGE_IDS_BEFORE, {"limit": limit + 1, "cursor": cursor})
 
-        for pawn in pawns:
-            pawn_id = pawn[4]
-            if grouped_pawns[pawn_id]["pawn_id"] is None:
-                grouped_pawns[pawn_id].update({
-                    "pawn_id": pawn[4],
-                    "cus_id": pawn[0],
-                    "customer_name": pawn[1],
-                    "phone_number": pawn[2],
-                    "address": pawn[3],
-                    "pawn_deposit": float(pawn[5]) if pawn[5] else 0,
-                    "pawn_date": str(pawn[6]) if pawn[6] else "",
-                    "pawn_expire_date": str(pawn[7]) if pawn[7] else "",
-                })
+        page_ids = list(page.scalars())
+        next_cursor = page_ids[limit - 1] if len(page_ids) > limit else None
+        page_ids = page_ids[:limit]
 
-            product = {
-                "prod_id": pawn[8],
-                "prod_name": pawn[9],
-                "pawn_weight": pawn[10] or "",
-                "pawn_amount": pawn[11] or 0,
-                "pawn_unit_price": float(pawn[12]) if pawn[12] else 0,
-            }
+        if not page_ids:
+            return [], None
 
-            # Check if product already exists before appending
-            product_exists = any(
-                p["prod_id"] == product["prod_id"] 
-                for p in grouped_pawns[pawn_id]["products"]
-            )
-            if not product_exists:
-                grouped_pawns[pawn_id]["products"].append(product)
+        pawns = load_pawn_records(db, queries.PAWN_RECORDS_BY_IDS, {"pawn_ids": page_ids}, query_engine=query_engine)
 
-        return list(grouped_pawns.values())
+        return [format_pawn_listing(pawn) for pawn in pawns], next_cursor
     
     def get_all_client_pawn(self, db: Session):
         clients_with_pawns = db.query(
@@ -429,69 +516,44 @@ class Staff:
             result=clients_data
         )
         
-    def get_client_id(self, cus_id: int, db: Session):
+    def get_client_id(self, cus_id: int, db: Session, query_engine: Optional[str] = None):
         # First check if client exists
-        client = db.query(Account).filter(
-            and_(
-                Account.cus_id == cus_id,
-                Account.role == 'user'
-            )
-        ).first()
+        client = find_customer(db, cus_id=cus_id)
         
-        if not client:
+        if not client or client["role"] != 'user':
             raise HTTPException(status_code=404, detail="Client not found")
         
-        # Get client's pawn details
-        pawns = db.query(
-            Pawn.pawn_id,           
-            Pawn.pawn_deposit,      
-            Pawn.pawn_date,         
-            Product.prod_name,
-            Product.prod_id,
-            PawnDetail.pawn_weight,      
-            PawnDetail.pawn_amount,      
-            PawnDetail.pawn_unit_price,  
-        ).join(PawnDetail, Pawn.pawn_id == PawnDetail.pawn_id)\
-        .join(Product, PawnDetail.prod_id == Product.prod_id)\
-        .filter(Pawn.cus_id == cus_id)\
-        .all()
-        
-        # Group pawns by pawn_id
-        grouped_pawns = defaultdict(lambda: {
-            "pawn_id": None,
-            "pawn_deposit": 0,
-            "pawn_date": "",
-            "products": [],
-        })
-
-        for pawn in pawns:
-            pawn_id = pawn[0]
-
-            if grouped_pawns[pawn_id]["pawn_id"] is None:
-                grouped_pawns[pawn_id]["pawn_id"] = pawn_id
-                grouped_pawns[pawn_id]["pawn_deposit"] = pawn[1]
-                grouped_pawns[pawn_id]["pawn_date"] = pawn[2].strftime("%Y-%m-%d") if pawn[2] else ""
-
-            product = {
-                "prod_name": pawn[3],
-                "prod_id": pawn[4],
-                "pawn_weight": pawn[5],     
-                "pawn_amount": pawn[6],     
-                "pawn_unit_price": pawn[7], 
-                
+        # Get client's pawn details, one record per pawn
+        pawns = load_pawn_records(db, queries.PAWN_RECORDS_BY_CUSTOMER, {"cus_id": cus_id}, query_engine=query_engine)
+
+        grouped_pawns = [
+            {
+                "pawn_id": pawn["pawn_id"],
+                "pawn_deposit": pawn["pawn_deposit"],
+                "pawn_date": pawn["pawn_date"].strftime("%Y-%m-%d") if pawn["pawn_date"] else "",
+                "products": [
+                    {
+                        "prod_name": product["prod_name"],
+                        "prod_id": product["prod_id"],
+                        "pawn_weight": product["pawn_weight"],
+                        "pawn_amount": product["pawn_amount"],
+                        "pawn_unit_price": product["pawn_unit_price"],
+                    }
+                    for product in pawn["products"]
+                ],
             }
-
-            grouped_pawns[pawn_id]["products"].append(product)
+            for pawn in pawns
+        ]
 
         # Return the complete client and pawn information
         result = {
             "client_info": {
-                "cus_id": client.cus_id,
-                "cus_name": client.cus_name,
-                "address": client.address,
-                "phone_number": client.phone_number
+                "cus_id": client["cus_id"],
+                "cus_name": client["cus_name"],
+                "address": client["address"],
+                "phone_number": client["phone_number"]
             },
-            "pawns": list(grouped_pawns.values()) if grouped_pawns else [],  # Changed from pawns
+            "pawns": grouped_pawns,
             "total_pawns": len(grouped_pawns) 
         }
 
@@ -502,13 +564,9 @@ class Staff:
         )
         
     def get_next_pawn_id(self, db: Session):
+        """Reserve a ticket number; submit it back as pawn_id when creating the pawn"""
         try:
-            # Get the highest pawn_id from the database
-            # Adjust 'Pawn' and 'pawn_id' to match your actual model and field names
-            max_pawn = db.query(func.max(Pawn.pawn_id)).scalar()
-            
-            # If no pawns exist, start with 1, otherwise increment by 1
-            next_id = 1 if max_pawn is None else max_pawn + 1
+            next_id = pawn_ids.reserve(db)
             
             return ResponseModel(
                 code=200,
@@ -525,7 +583,7 @@ class Staff:
     def get_last_pawns(self, db: Session):
         """Get the last 3 most recently created pawns with all details"""
         try:
-            # Get the last 3 pawns (highest pawn_ids)
+            # Get the last 3 pawns (highest pawn_ids), totals included
             last_pawns = db.query(Pawn).order_by(Pawn.pawn_id.desc()).limit(3).all()
             
             if not last_pawns:
@@ -536,42 +594,39 @@ class Staff:
                     result=[]
                 )
             
+            # Get the products of all three pawns in one query
+            products_by_pawn = defaultdict(list)
+            pawn_details = db.query(
+                PawnDetail.pawn_id,
+                PawnDetail.pawn_weight,
+                PawnDetail.pawn_amount,
+                PawnDetail.pawn_unit_price,
+                Product.prod_name,
+                Product.prod_id
+            ).join(Product, PawnDetail.prod_id == Product.prod_id)\
+            .filter(PawnDetail.pawn_id.in_([pawn.pawn_id for pawn in last_pawns]))\
+            .all()
+            for detail in pawn_details:
+                products_by_pawn[detail.pawn_id].append({
+                    "prod_name": detail.prod_name,
+                    "prod_id": detail.prod_id,
+                    "pawn_weight": detail.pawn_weight,
+                    "pawn_amount": detail.pawn_amount,
+                    "pawn_unit_price": detail.pawn_unit_price,
+                    "subtotal": detail.pawn_amount * detail.pawn_unit_price
+                })
+
             pawns_result = []
             
             for pawn in last_pawns:
                 # Get client information for each pawn
-                client = db.query(Account).filter(
-                    and_(
-                        Account.cus_id == pawn.cus_id,
-                        Account.role == 'user'
-                    )
-                ).first()
+                client = find_customer(db, cus_id=pawn.cus_id)
+                if client and client["role"] != 'user':
+                    client = None
                 
-                # Get pawn details with products for each pawn
-                pawn_details = db.query(
-                    PawnDetail.pawn_weight,
-                    PawnDetail.pawn_amount,
-                    PawnDetail.pawn_unit_price,
-                    Product.prod_name,
-                    Product.prod_id
-                ).join(Product, PawnDetail.prod_id == Product.prod_id)\
-                .filter(PawnDetail.pawn_id == pawn.pawn_id)\
-                .all()
-                
-                # Format products data for each pawn
-                products = []
-                total_amount = 0
-                for detail in pawn_details:
-                    product = {
-                        "prod_name": detail.prod_name,
-                        "prod_id": detail.prod_id,
-                        "pawn_weight": detail.pawn_weight,
-                        "pawn_amount": detail.pawn_amount,
-                        "pawn_unit_price": detail.pawn_unit_price,
-                        "subtotal": detail.pawn_amount * detail.pawn_unit_price
-                    }
-                    products.append(product)
-                    total_amount += product["subtotal"]
+                products = products_by_pawn[pawn.pawn_id]
+                # Stored total; pawns from before totals existed are added up from their lines
+                total_amount = pawn.total_value if pawn.total_value is not None else sum(product["subtotal"] for product in products)
                 
                 # Prepare each pawn's data
                 pawn_data = {
@@ -584,14 +639,14 @@ class Staff:
                         "remaining_balance": total_amount - pawn.pawn_deposit
                     },
                     "client_info": {
-                        "cus_id": client.cus_id,
-                        "cus_name": client.cus_name,
-                        "address": client.address,
-                        "phone_number": client.phone_number
+                        "cus_id": client["cus_id"],
+                        "cus_name": client["cus_name"],
+                        "address": client["address"],
+                        "phone_number": client["phone_number"]
                     } if client else None,
                     "products": products,
                     "summary": {
-                        "total_products": len(products),
+                        "total_products": pawn.item_count if pawn.item_count is not None else len(products),
                         "total_amount": total_amount,
                         "deposit_paid": pawn.pawn_deposit,
                         "balance_due": total_amount - pawn.pawn_deposit
@@ -614,53 +669,117 @@ class Staff:
                 message=f"Failed to retrieve last pawns: {str(e)}"
             )
 
-    def get_pawn_print(self, db: Session, pawn_id: Optional[int] = None):
-        """
-        Retrieve all pawn records or a specific pawn by ID along with customer and product details.
-        """
-        
-        def parse_weight(weight_str):
-            """Helper function to extract numeric value from weight string"""
-            if not weight_str:
-                return 0.0
-            # Convert to string if it's not already
-            weight_str = str(weight_str)
-            # Remove common units and extract numeric part
-            import re
-            # Extract number from string (handles formats like "500g", "1.5kg", "250", etc.)
-            match = re.search(r'(\d+\.?\d*)', weight_str)
-            if match:
-                return float(match.group(1))
-            return 0.0
-        
-        # Query to fetch all pawn records (or filter by pawn_id if provided)
-        pawn_query = (
+    def get_expiring_pawns(self, db: Session, days: int = 7, include_overdue: bool = True):
+        """Pawns expiring within `days` days (and overdue ones), read from the scheduler's pawn_due_status"""
+        now = datetime.utcnow()
+        criteria = [PawnDueStatus.pawn_expire_date <= now + timedelta(days=days)]
+        if not include_overdue:
+            criteria.append(PawnDueStatus.pawn_expire_date >= now)
+
+        rows = (
             db.query(
+                PawnDueStatus.pawn_id,
+                PawnDueStatus.pawn_expire_date,
+                PawnDueStatus.status,
+                PawnDueStatus.refreshed_at,
+                Pawn.pawn_date,
+                Pawn.pawn_deposit,
+                Pawn.total_value,
                 Account.cus_id,
                 Account.cus_name,
                 Account.phone_number,
-                Account.address,
-                Pawn.pawn_id,
-                Pawn.pawn_deposit,
-                Pawn.pawn_date,
-                Pawn.pawn_expire_date,
-                Product.prod_id,
-                Product.prod_name,
-                PawnDetail.pawn_weight,
-                PawnDetail.pawn_amount,
-                PawnDetail.pawn_unit_price,
             )
-            .join(Pawn, Account.cus_id == Pawn.cus_id)
-            .join(PawnDetail, Pawn.pawn_id == PawnDetail.pawn_id)
-            .join(Product, PawnDetail.prod_id == Product.prod_id)
-            .filter(Account.role == "user")
+            .join(Pawn, PawnDueStatus.pawn_id == Pawn.pawn_id)
+            .join(Account, PawnDueStatus.cus_id == Account.cus_id)
+            .filter(*criteria)
+            .order_by(PawnDueStatus.pawn_expire_date, PawnDueStatus.pawn_id)
+            .all()
         )
 
-        # If pawn_id is provided, filter the query
-        if pawn_id:
-            pawn_query = pawn_query.filter(Pawn.pawn_id == pawn_id)
+        result = [
+            {
+                "pawn_id": row.pawn_id,
+                "cus_id": row.cus_id,
+                "customer_name": row.cus_name,
+                "phone_number": row.phone_number,
+                "pawn_date": row.pawn_date.strftime("%Y-%m-%d") if row.pawn_date else "",
+                "pawn_expire_date": row.pawn_expire_date.strftime("%Y-%m-%d"),
+                "days_left": (row.pawn_expire_date.date() - now.date()).days,
+                "status": row.status,
+                "pawn_deposit": row.pawn_deposit,
+                "total_amount": row.total_value,
+                "refreshed_at": row.refreshed_at.strftime("%Y-%m-%d %H:%M:%S"),
+            }
+            for row in rows
+        ]
 
-        pawns = pawn_query.all()
+        return ResponseModel(
+            code=200,
+            status="Success",
+            message=f"{len(result)} pawn(s) expiring within {days} day(s)",
+            result=result
+        )
+
+    def iter_pawn_export(self, db: Session, batch_size: int = 1000) -> Iterator[dict]:
+        """
+        Yield one customer at a time (customer → pawns → products) for a full export.
+        Rows come from a server-side cursor ordered by customer and pawn, so only the
+        current customer is ever held in memory.
+        """
+        rows = db.execute(queries.PAWN_EXPORT, execution_options={"yield_per": batch_size})
+
+        customer = None
+        pawn = None
+        for row in rows:
+            if customer is None or customer["cus_id"] != row.cus_id:
+                if customer is not None:
+                    yield customer
+                customer = {
+                    "cus_id": row.cus_id,
+                    "customer_name": row.cus_name,
+                    "phone_number": row.phone_number,
+                    "address": row.address,
+                    "pawns": [],
+                }
+                pawn = None
+
+            if pawn is None or pawn["pawn_id"] != row.pawn_id:
+                pawn = {
+                    "pawn_id": row.pawn_id,
+                    "pawn_deposit": row.pawn_deposit,
+                    "pawn_date": row.pawn_date.strftime("%Y-%m-%d %H:%M:%S"),
+                    "pawn_expire_date": row.pawn_expire_date.strftime("%Y-%m-%d %H:%M:%S") if row.pawn_expire_date else None,
+                    "products": [],
+                    "pawn_total_amount": 0,
+                    "pawn_total_weight": 0,
+                }
+                customer["pawns"].append(pawn)
+
+            weight = pawn_line_grams(row)
+            pawn["products"].append({
+                "prod_id": row.prod_id,
+                "prod_name": row.prod_name,
+                "pawn_weight": row.pawn_weight,
+                "pawn_weight_numeric": weight,
+                "pawn_amount": row.pawn_amount,
+                "pawn_unit_price": row.pawn_unit_price,
+            })
+            pawn["pawn_total_amount"] += float(row.pawn_amount) if row.pawn_amount else 0
+            pawn["pawn_total_weight"] += weight
+
+        if customer is not None:
+            yield customer
+
+    def get_pawn_print(self, db: Session, pawn_id: Optional[int] = None, query_engine: Optional[str] = None):
+        """
+        Retrieve all pawn records or a specific pawn by ID along with customer and product details.
+        """
+        
+        # Fetch all pawn records (or only pawn_id if provided), one record per pawn
+        if pawn_id:
+            pawns = load_pawn_records(db, queries.PAWN_RECORDS_BY_ID, {"pawn_id": pawn_id}, query_engine=query_engine)
+        else:
+            pawns = load_pawn_records(db, queries.USER_PAWN_RECORDS, query_engine=query_engine)
 
         # If no pawn records found, return a 404 response
         if not pawns:
@@ -671,42 +790,53 @@ class Staff:
                 result=[]
             )
 
+        def print_products(pawn):
+            return [
+                {
+                    "prod_id": product["prod_id"],
+                    "prod_name": product["prod_name"],
+                    "pawn_weight": product["pawn_weight"],  # Keep original format for display
+                    "pawn_weight_numeric": pawn_line_grams(product),  # grams, normalized at write time (parsed if not yet)
+                    "pawn_weight_unit": product["pawn_weight_unit"],
+                    "pawn_amount": product["pawn_amount"],
+                    "pawn_unit_price": product["pawn_unit_price"],
+                }
+                for product in pawn["products"]
+            ]
+
+        # Stored totals (see totals.py), recomputed from the lines only for pawns not yet backfilled
+        def print_total_amount(pawn, products):
+            if pawn["total_amount"] is not None:
+                return float(pawn["total_amount"])
+            return sum(float(product["pawn_amount"]) if product["pawn_amount"] else 0 for product in products)
+
+        def print_total_weight(pawn, products):
+            if pawn["total_weight"] is not None:
+                return pawn["total_weight"]
+            return sum(product["pawn_weight_numeric"] for product in products)
+
         # Structure the response differently based on whether we're fetching a single pawn or all pawns
         if pawn_id:
             # Single pawn response - more detailed structure
-            pawn_data = pawns[0]  # Get first row for basic info
-            
-            # Calculate totals for the pawn - Fixed weight calculation
-            total_amount = sum(float(pawn[11]) if pawn[11] else 0 for pawn in pawns)  # pawn_amount
-            total_weight = sum(parse_weight(pawn[10]) for pawn in pawns)  # pawn_weight - using helper function
+            pawn_data = pawns[0]
+            products = print_products(pawn_data)
             
             response_data = {
-                "pawn_id": pawn_data[4],
-                "pawn_deposit": pawn_data[5],
-                "pawn_date": pawn_data[6].strftime("%Y-%m-%d %H:%M:%S"),
-                "pawn_expire_date": pawn_data[7].strftime("%Y-%m-%d %H:%M:%S") if pawn_data[7] else None,
-                "total_amount": total_amount,
-                "total_weight": total_weight,
+                "pawn_id": pawn_data["pawn_id"],
+                "pawn_deposit": pawn_data["pawn_deposit"],
+                "pawn_date": pawn_data["pawn_date"].strftime("%Y-%m-%d %H:%M:%S"),
+                "pawn_expire_date": pawn_data["pawn_expire_date"].strftime("%Y-%m-%d %H:%M:%S") if pawn_data["pawn_expire_date"] else None,
+                "total_amount": print_total_amount(pawn_data, products),
+                "total_weight": print_total_weight(pawn_data, products),
                 "customer": {
-                    "cus_id": pawn_data[0],
-                    "customer_name": pawn_data[1],
-                    "phone_number": pawn_data[2],
-                    "address": pawn_data[3]
+                    "cus_id": pawn_data["cus_id"],
+                    "customer_name": pawn_data["cus_name"],
+                    "phone_number": pawn_data["phone_number"],
+                    "address": pawn_data["address"]
                 },
-                "products": []
+                "products": products
             }
             
-            # Add all products for this pawn
-            for pawn in pawns:
-                response_data["products"].append({
-                    "prod_id": pawn[8],
-                    "prod_name": pawn[9],
-                    "pawn_weight": pawn[10],  # Keep original format for display
-                    "pawn_weight_numeric": parse_weight(pawn[10]),  # Add numeric version
-                    "pawn_amount": pawn[11],
-                    "pawn_unit_price": pawn[12],
-                })
-            
             return ResponseModel(
                 code=200,
                 status="Success",
@@ -719,49 +849,29 @@ class Staff:
             pawn_list = {}
             
             for pawn in pawns:
-                cus_id = pawn[0]
-                pawn_id_current = pawn[4]
+                cus_id = pawn["cus_id"]
 
                 if cus_id not in pawn_list:
                     pawn_list[cus_id] = {
                         "cus_id": cus_id,
-                        "customer_name": pawn[1],
-                        "phone_number": pawn[2],
-                        "address": pawn[3],
-                        "pawns": {}
-                    }
-
-                # Group products by pawn_id within each customer
-                if pawn_id_current not in pawn_list[cus_id]["pawns"]:
-                    pawn_list[cus_id]["pawns"][pawn_id_current] = {
-                        "pawn_id": pawn_id_current,
-                        "pawn_deposit": pawn[5],
-                        "pawn_date": pawn[6].strftime("%Y-%m-%d %H:%M:%S"),
-                        "pawn_expire_date": pawn[7].strftime("%Y-%m-%d %H:%M:%S") if pawn[7] else None,
-                        "products": [],
-                        "pawn_total_amount": 0,
-                        "pawn_total_weight": 0
+                        "customer_name": pawn["cus_name"],
+                        "phone_number": pawn["phone_number"],
+                        "address": pawn["address"],
+                        "pawns": []
                     }
 
-                # Add product to the specific pawn
-                product_data = {
-                    "prod_id": pawn[8],
-                    "prod_name": pawn[9],
-                    "pawn_weight": pawn[10],  # Keep original format
-                    "pawn_weight_numeric": parse_weight(pawn[10]),  # Add numeric version
-                    "pawn_amount": pawn[11],
-                    "pawn_unit_price": pawn[12],
-                }
-                
-                pawn_list[cus_id]["pawns"][pawn_id_current]["products"].append(product_data)
-                pawn_list[cus_id]["pawns"][pawn_id_current]["pawn_total_amount"] += float(pawn[11]) if pawn[11] else 0
-                pawn_list[cus_id]["pawns"][pawn_id_current]["pawn_total_weight"] += parse_weight(pawn[10])  # Fixed
+                products = print_products(pawn)
+                pawn_list[cus_id]["pawns"].append({
+                    "pawn_id": pawn["pawn_id"],
+                    "pawn_deposit": pawn["pawn_deposit"],
+                    "pawn_date": pawn["pawn_date"].strftime("%Y-%m-%d %H:%M:%S"),
+                    "pawn_expire_date": pawn["pawn_expire_date"].strftime("%Y-%m-%d %H:%M:%S") if pawn["pawn_expire_date"] else None,
+                    "products": products,
+                    "pawn_total_amount": print_total_amount(pawn, products),
+                    "pawn_total_weight": print_total_weight(pawn, products)
+                })
 
-            # Convert nested dict structure to list format
-            result = []
-            for customer_data in pawn_list.values():
-                customer_data["pawns"] = list(customer_data["pawns"].values())
-                result.append(customer_data)
+            result = list(pawn_list.values())
 
             # Return a successful response
             return ResponseModel(
@@ -769,4 +879,55 @@ class Staff:
                 status="Success",
                 message=f"Retrieved {len(result)} customers with pawn records.",
                 result=result
-            )
\ No newline at end of file
+            )
+
+class AsyncStaff:
+    """
+    Asyncio variant of Staff used when ASYNC_DATABASE is enabled.
+    Runs the same repository code on the AsyncSession's underlying Session via run_sync,
+    so every query is awaited on the event loop instead of holding a threadpool worker.
+    run_sync also keeps the Python work between queries on the event loop, so grouping a large
+    listing stalls every other request meanwhile: this mode suits many small requests, not
+    listing-heavy traffic (LISTING_QUERY_ENGINE=json moves the grouping into Postgres).
+    """
+    def __init__(self):
+        self.staff = Staff()
+
+    def is_staff(self, current_user: Principal):
+        self.staff.is_staff(current_user)
+
+    async def create_pawn(self, pawn_info: CreatePawn, db: AsyncSession, current_user: Principal):
+        return await db.run_sync(lambda session: self.staff.create_pawn(pawn_info, session, current_user))
+
+    def parse_import_pawn(self, payload: dict) -> CreatePawn:
+        return self.staff.parse_import_pawn(payload)
+
+    async def import_pawns(self, tickets: List[Tuple[List[int], CreatePawn]], db: AsyncSession, current_user: Principal, report: ImportReport):
+        await db.run_sync(lambda session: self.staff.import_pawns(tickets, session, current_user, report))
+
+    async def sync_pawn_id_sequence(self, db: AsyncSession):
+        await db.run_sync(lambda session: self.staff.sync_pawn_id_sequence(session))
+
+    async def get_client_pawn(self, db: AsyncSession, phone_number: Optional[str] = None, cus_name: Optional[str] = None, cus_id: Optional[int] = None):
+        return await db.run_sync(lambda session: self.staff.get_client_pawn(session, phone_number, cus_name, cus_id))
+
+    async def get_all_pawn_details(self, db: AsyncSession, cursor: Optional[int] = None, limit: int = DEFAULT_PAGE_SIZE):
+        return await db.run_sync(lambda session: self.staff.get_all_pawn_details(session, cursor, limit))
+
+    async def get_all_client_pawn(self, db: AsyncSession):
+        return await db.run_sync(lambda session: self.staff.get_all_client_pawn(session))
+
+    async def get_client_id(self, cus_id: int, db: AsyncSession):
+        return await db.run_sync(lambda session: self.staff.get_client_id(cus_id, session))
+
+    async def get_next_pawn_id(self, db: AsyncSession):
+        return await db.run_sync(lambda session: self.staff.get_next_pawn_id(session))
+
+    async def get_expiring_pawns(self, db: AsyncSession, days: int = 7, include_overdue: bool = True):
+        return await db.run_sync(lambda session: self.staff.get_expiring_pawns(session, days, include_overdue))
+
+    async def get_last_pawns(self, db: AsyncSession):
+        return await db.run_sync(lambda session: self.staff.get_last_pawns(session))
+
+    async def get_pawn_print(self, db: AsyncSession, pawn_id: Optional[int] = None):
+        return await db.run_sync(lambda session: self.staff.get_pawn_print(session, pawn_id))
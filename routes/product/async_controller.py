@@ -0,0 +1,58 @@
+from typing import Optional
+from fastapi import APIRouter, Depends, Header, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+from database import get_async_db
+from response_model import ResponseModel
+from routes.oauth2.repository import get_current_staff
+from routes.oauth2.model import Principal
+from routes.product.repository import AsyncStaff, etag_matches
+from routes.product.model import *
+
+router = APIRouter(
+    tags=["Product"],
+    prefix="/api"
+)
+
+staff = AsyncStaff()
+
+""" Product Management (async engine) """
+@router.post("/product", response_model = ResponseModel)
+async def create_product(product_info: CreateProduct, db: AsyncSession = Depends(get_async_db), current_user: Principal = Depends(get_current_staff)):
+    return await staff.create_product(product_info, db, current_user)
+
+@router.get("/product", response_model=ResponseModel)
+async def get_all_product(
+    response: Response,
+    if_none_match: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Principal = Depends(get_current_staff)
+):
+    """Product catalog; send the last ETag in If-None-Match to get 304 when nothing changed"""
+    etag, products = await staff.get_product_snapshot(db)
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers={"ETag": etag})
+    response.headers["ETag"] = etag
+    return await staff.get_product(db=db, products=products)
+
+@router.put("/product", response_model=ResponseModel)
+async def update_product(
+    updated_product: UpdateProduct,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Principal = Depends(get_current_staff),
+):
+
+    return await staff.update_product(
+        db,
+        prod_id=updated_product.prod_id,
+        prod_name=updated_product.prod_name,
+        unit_price=updated_product.unit_price,
+        amount=updated_product.amount
+    )
+
+@router.delete("/product/{product_id}")
+async def delete_product_by_id(
+    product_id: int,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Principal = Depends(get_current_staff)
+):
+    return await staff.delete_product_by_id(product_id, db)
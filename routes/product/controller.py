@@ -1,11 +1,12 @@
-from typing import List
-from fastapi import APIRouter, Depends, HTTPException, Query
+from typing import List, Optional
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Response
 from sqlalchemy.orm import Session
 # from models import Account
 from database import get_db
 from response_model import ResponseModel
-from routes.oauth2.repository import get_current_user
-from routes.product.repository import Staff
+from routes.oauth2.repository import get_current_staff
+from routes.oauth2.model import Principal
+from routes.product.repository import Staff, etag_matches
 from routes.product.model import *
 # from routes.user.model import CreatePawn 
 
@@ -19,23 +20,30 @@ staff_service = Staff()
 
 """ Product Management """
 @router.post("/product", response_model = ResponseModel)
-def create_product(product_info: CreateProduct, db: Session = Depends(get_db), current_user: dict = Depends(get_current_user)):
-    staff.is_staff(current_user)
+def create_product(product_info: CreateProduct, db: Session = Depends(get_db), current_user: Principal = Depends(get_current_staff)):
     return staff.create_product(product_info, db, current_user)
 
 @router.get("/product", response_model=ResponseModel)
-def get_all_product(db: Session = Depends(get_db), current_user: dict = Depends(get_current_user)):
-    staff.is_staff(current_user)
-    return staff.get_product(db=db)
+def get_all_product(
+    response: Response,
+    if_none_match: Optional[str] = Header(None),
+    db: Session = Depends(get_db),
+    current_user: Principal = Depends(get_current_staff)
+):
+    """Product catalog; send the last ETag in If-None-Match to get 304 when nothing changed"""
+    etag, products = staff.get_product_snapshot(db)
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers={"ETag": etag})
+    response.headers["ETag"] = etag
+    return staff.get_product(db=db, products=products)
 
 @router.put("/product", response_model=ResponseModel)
 def update_product(
     updated_product: UpdateProduct, 
     db: Session = Depends(get_db),
-    current_user: dict = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_staff),
 ):
     staff_service = Staff()
-    staff_service.is_staff(current_user)  
 
     return staff_service.update_product(
         db,
@@ -49,7 +57,6 @@ def update_product(
 def delete_product_by_id(
     product_id: int, 
     db: Session = Depends(get_db), 
-    current_user: dict = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_staff)
 ):
-    staff.is_staff(current_user)
     return staff.delete_product_by_id(product_id, db)
@@ -1,26 +1,165 @@
+import hashlib
+import json
+import threading
 from fastapi import HTTPException
 from routes.user.model import *
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from entities import *
 from response_model import ResponseModel
+from routes.oauth2.model import Principal
+import cache_bus
 from typing import List, Dict
 # from app.models import Client, Pawn
+from sqlalchemy import event, insert
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.sql import func, or_, and_
 from sqlalchemy.exc import SQLAlchemyError
 from collections import defaultdict
-from typing import Dict, Any
+from typing import Dict, Any, Tuple
+
+# ========== Product Catalog ==========
+class ProductCatalog:
+    """
+    In-memory copy of the (small, rarely changing) product table: normalized name → prod_id,
+    prod_id → row, plus a version and a content-hash ETag for GET /product.
+    Loaded at startup and reloaded lazily after invalidate().
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._loaded = False
+        self._generation = 0
+        self.version = 0
+        self.etag = ""
+        self.products: List[Dict] = []
+        self._by_id: Dict[int, Dict] = {}
+        self._by_name: Dict[str, int] = {}
+
+    def load(self, db: Session):
+        generation = self._generation
+        rows = db.query(Product.prod_id, Product.prod_name, Product.unit_price, Product.amount).order_by(Product.prod_id).all()
+        products = [
+            {"id": row.prod_id, "name": row.prod_name, "price": row.unit_price, "amount": row.amount}
+            for row in rows
+        ]
+        digest = hashlib.sha256(json.dumps(products, sort_keys=True, default=str).encode()).hexdigest()
+
+        with self._lock:
+            self.products = products
+            self._by_id = {product["id"]: product for product in products}
+            self._by_name = {product["name"].lower(): product["id"] for product in products if product["name"]}
+            self.version += 1
+            self.etag = f'"{digest[:32]}"'
+            # Invalidated while reading: serve these rows, but let the next reader load newer ones
+            self._loaded = generation == self._generation
+
+    def ensure_loaded(self, db: Session):
+        if not self._loaded:
+            self.load(db)
+
+    def invalidate(self):
+        """Drop the cached copy; the next reader reloads it"""
+        with self._lock:
+            self._generation += 1
+            self._loaded = False
+
+    def invalidate_on_commit(self, db: Session):
+        """Invalidate once `db` commits, so no reader can reload the catalog before the write is visible"""
+        event.listen(db, "after_commit", lambda session: self.invalidate(), once=True)
+
+    def snapshot(self, db: Session) -> Tuple[str, List[Dict]]:
+        """(etag, products) taken together, so the ETag always describes the returned listing"""
+        self.ensure_loaded(db)
+        with self._lock:
+            return self.etag, self.products
+
+    def get(self, db: Session, prod_id: int) -> Optional[Dict]:
+        self.ensure_loaded(db)
+        return self._by_id.get(prod_id)
+
+    def lookup_ids(self, db: Session, names) -> Dict[str, int]:
+        """prod_id of every already-known normalized name"""
+        self.ensure_loaded(db)
+        by_name = self._by_name
+        return {name: by_name[name] for name in names if name in by_name}
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"loaded": self._loaded, "version": self.version, "size": len(self.products), "etag": self.etag}
+
+product_catalog = ProductCatalog()
+
+def publish_product_change(db: Session):
+    """Tell every worker (on commit) to reload its product catalog"""
+    cache_bus.publish(db, "products")
+
+cache_bus.subscribe("products", lambda payload: product_catalog.invalidate())
+cache_bus.on_reset(product_catalog.invalidate)
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """True if an If-None-Match header value lists `etag` (weak or strong) or is '*'"""
+    if not if_none_match:
+        return False
+    candidates = [value.strip() for value in if_none_match.split(",")]
+    return "*" in candidates or etag in candidates or f"W/{etag}" in candidates
+
+def resolve_product_ids(db: Session, names: List[Optional[str]], user_id: Optional[int] = None) -> Dict[str, int]:
+    """
+    Map product names (case-insensitive) to prod_id, from the catalog when known, otherwise with
+    one set-based lookup, inserting every missing product in a single batch. Does not commit.
+    On Postgres the insert is ON CONFLICT DO NOTHING on uq_products_lower_prod_name, so two
+    requests creating the same new product both get its id instead of one failing.
+    """
+    wanted = {name.lower() for name in names if name}
+    if not wanted:
+        return {}
+
+    product_ids = product_catalog.lookup_ids(db, wanted)
+
+    unknown = wanted - product_ids.keys()
+    if unknown:
+        product_ids.update({
+            prod_name: prod_id
+            for prod_id, prod_name in db.query(Product.prod_id, func.lower(Product.prod_name))
+            .filter(func.lower(Product.prod_name).in_(unknown))
+        })
+
+    missing = wanted - product_ids.keys()
+    if missing:
+        rows = [{"prod_name": prod_name, "user_id": user_id} for prod_name in sorted(missing)]
+        if db.get_bind().dialect.name == "postgresql":
+            statement = pg_insert(Product).values(rows).on_conflict_do_nothing(
+                index_elements=[func.lower(Product.prod_name)]
+            )
+            created = db.execute(statement.returning(Product.prod_id, Product.prod_name))
+        else:
+            created = db.execute(insert(Product).returning(Product.prod_id, Product.prod_name), rows)
+        product_ids.update({prod_name: prod_id for prod_id, prod_name in created})
+
+        # Names a concurrent request inserted first: their rows are visible once it committed
+        raced = wanted - product_ids.keys()
+        if raced:
+            product_ids.update({
+                prod_name: prod_id
+                for prod_id, prod_name in db.query(Product.prod_id, func.lower(Product.prod_name))
+                .filter(func.lower(Product.prod_name).in_(raced))
+            })
+        product_catalog.invalidate_on_commit(db)
+        publish_product_change(db)
+
+    return product_ids
 
 class Staff:
-    def is_staff(self, current_user: dict):
-        if current_user['role'] != 'admin':
+    def is_staff(self, current_user: Principal):
+        if current_user.role != 'admin':
             raise HTTPException(
                 status_code=403,
                 detail="Permission denied",
             )
             
     # ========== Create New Product ==========
-    def create_product(self, product_info: CreateProduct, db: Session, current_user: dict):
-            existing_product = db.query(Product).filter(Product.prod_name == func.lower(product_info.prod_name)).first()
+    def create_product(self, product_info: CreateProduct, db: Session, current_user: Principal):
+            existing_product = db.query(Product).filter(func.lower(Product.prod_name) == func.lower(product_info.prod_name)).first()
             if existing_product:
                 raise HTTPException(
                     status_code=400,
@@ -32,15 +171,19 @@ class Staff:
                     prod_name = func.lower(product_info.prod_name),
                     unit_price = product_info.unit_price,
                     amount = product_info.amount,
-                    user_id = current_user['id'])
+                    user_id = current_user.id)
                 db.add(product)
+                publish_product_change(db)
                 db.commit()
+                product_catalog.invalidate()
                 db.refresh(product)
                 
             else: 
-                product = Product(prod_name = func.lower(product_info.prod_name), user_id = current_user['id'])
+                product = Product(prod_name = func.lower(product_info.prod_name), user_id = current_user.id)
                 db.add(product)
+                publish_product_change(db)
                 db.commit()
+                product_catalog.invalidate()
                 db.refresh(product)
                 return product
             
@@ -52,26 +195,22 @@ class Staff:
             )
             
     # ========== Get ALl Product ==========
-    def get_product(self, db: Session):
-            products = db.query(Product).all()
+    def get_product_snapshot(self, db: Session) -> Tuple[str, List[Dict]]:
+        """(etag, products) of the current catalog version"""
+        return product_catalog.snapshot(db)
+
+    def get_product(self, db: Session, products: Optional[List[Dict]] = None):
+            if products is None:
+                _, products = product_catalog.snapshot(db)
             if not products:
                 raise HTTPException(
                     status_code=404,
                     detail="Products not found",
                 )
-            serialized_products = [
-                {
-                    "id": product.prod_id,
-                    "name": product.prod_name,
-                    "price": product.unit_price,
-                    "amount": product.amount,
-                }
-                for product in products
-            ]
             return ResponseModel(
                 code=200,
                 status="Success",
-                result=serialized_products
+                result=products
             )
         
     # ========== Update Existing Product ==========
@@ -110,7 +249,9 @@ class Staff:
         if amount is not None:
             product.amount = amount
 
+        publish_product_change(db)
         db.commit()
+        product_catalog.invalidate()
         db.refresh(product)
 
         return ResponseModel(
@@ -141,7 +282,9 @@ class Staff:
 
         try:
             db.delete(product)
+            publish_product_change(db)
             db.commit()
+            product_catalog.invalidate()
             return ResponseModel(
                 code=200,
                 status="Success",
@@ -152,4 +295,44 @@ class Staff:
             raise HTTPException(
                 status_code=500,
                 detail=f"Database error occurred: {str(e)}",
-            )
\ No newline at end of file
+            )
+
+class AsyncStaff:
+    """
+    Asyncio variant of Staff used when ASYNC_DATABASE is enabled.
+    Runs the same repository code on the AsyncSession's underlying Session via run_sync,
+    so every query is awaited on the event loop instead of holding a threadpool worker.
+    """
+    def __init__(self):
+        self.staff = Staff()
+
+    def is_staff(self, current_user: Principal):
+        self.staff.is_staff(current_user)
+
+    async def create_product(self, product_info: CreateProduct, db: AsyncSession, current_user: Principal):
+        return await db.run_sync(lambda session: self.staff.create_product(product_info, session, current_user))
+
+    async def get_product_snapshot(self, db: AsyncSession) -> Tuple[str, List[Dict]]:
+        return await db.run_sync(lambda session: self.staff.get_product_snapshot(session))
+
+    async def get_product(self, db: AsyncSession, products: Optional[List[Dict]] = None):
+        return await db.run_sync(lambda session: self.staff.get_product(session, products))
+
+    async def update_product(
+        self,
+        db: AsyncSession,
+        prod_id: Optional[int] = None,
+        prod_name: Optional[str] = None,
+        unit_price: Optional[float] = None,
+        amount: Optional[int] = None,
+    ):
+        return await db.run_sync(lambda session: self.staff.update_product(
+            session,
+            prod_id=prod_id,
+            prod_name=prod_name,
+            unit_price=unit_price,
+            amount=amount
+        ))
+
+    async def delete_product_by_id(self, product_id: int, db: AsyncSession):
+        return await db.run_sync(lambda session: self.staff.delete_product_by_id(product_id, session))
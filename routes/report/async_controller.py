@@ -0,0 +1,48 @@
+from datetime import date
+from typing import Optional
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+from database import get_async_db
+from response_model import ResponseModel
+from routes.oauth2.repository import get_current_staff
+from routes.oauth2.model import Principal
+from routes.report.repository import AsyncStaff
+
+router = APIRouter(
+    tags=["Report"],
+    prefix="/api"
+)
+
+staff = AsyncStaff()
+
+""" Daily / Monthly / Per-Product Reports (read from the rollup tables, async engine) """
+@router.get("/report/daily", response_model=ResponseModel)
+async def get_daily_report(
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Principal = Depends(get_current_staff)
+):
+    """Pawn principal, order revenue, labor/buy cost and profit per day (default: the last 30 days)"""
+    return await staff.get_daily_report(db, start, end)
+
+@router.get("/report/monthly", response_model=ResponseModel)
+async def get_monthly_report(
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Principal = Depends(get_current_staff)
+):
+    """The same figures summed per calendar month"""
+    return await staff.get_monthly_report(db, start, end)
+
+@router.get("/report/products", response_model=ResponseModel)
+async def get_product_report(
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    limit: int = Query(50, ge=1, le=1000),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Principal = Depends(get_current_staff)
+):
+    """Per-product figures over the window, most profitable first"""
+    return await staff.get_product_report(db, start, end, limit)
@@ -0,0 +1,169 @@
+import os
+from datetime import date, datetime, timedelta
+from typing import Optional, Tuple
+
+from fastapi import HTTPException
+from sqlalchemy import func
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+import cache_bus
+from cache import TTLCache
+from entities import DailyProductRollup, DailyRollup, Product
+from response_model import ResponseModel
+from routes.oauth2.model import Principal
+
+# Default window of the date-range reports
+REPORT_DEFAULT_DAYS = 30
+# Report results per worker, dropped whenever a pawn/order write moves the rollups
+REPORT_CACHE_SIZE = int(os.getenv("REPORT_CACHE_SIZE", "256"))
+REPORT_CACHE_TTL = float(os.getenv("REPORT_CACHE_TTL", "60"))
+report_cache = TTLCache("reports", REPORT_CACHE_SIZE, REPORT_CACHE_TTL)
+
+cache_bus.subscribe("reports", lambda payload: report_cache.clear())
+cache_bus.on_reset(report_cache.clear)
+
+def _round(value) -> float:
+    return round(float(value or 0), 2)
+
+def _figures(row) -> dict:
+    """Money columns of a rollup row (or a SUM over rollup rows), with profit as get_order_print counts it"""
+    revenue = _round(row.order_revenue)
+    labor_cost = _round(row.order_labor_cost)
+    buy_cost = _round(row.order_buy_cost)
+    return {
+        "pawn_value": _round(row.pawn_value),
+        "order_revenue": revenue,
+        "order_labor_cost": labor_cost,
+        "order_buy_cost": buy_cost,
+        "profit": round(revenue - labor_cost - buy_cost, 2),
+    }
+
+def _period(row, label: str) -> dict:
+    return {
+        label: row.period.strftime("%Y-%m-%d" if label == "day" else "%Y-%m"),
+        "pawn_count": int(row.pawn_count or 0),
+        "pawn_principal": _round(row.pawn_principal),
+        "order_count": int(row.order_count or 0),
+        **_figures(row),
+    }
+
+class Staff:
+    def is_staff(self, current_user: Principal):
+        if current_user.role != 'admin':
+            raise HTTPException(
+                status_code=403,
+                detail="Permission denied",
+            )
+
+    def _window(self, start: Optional[date], end: Optional[date]) -> Tuple[date, date]:
+        end = end or datetime.utcnow().date()
+        start = start or end - timedelta(days=REPORT_DEFAULT_DAYS)
+        if start > end:
+            raise HTTPException(status_code=400, detail="start must be on or before end")
+        return start, end
+
+    def _cached(self, key: tuple, compute):
+        result = report_cache.get(key)
+        if result is None:
+            result = compute()
+            report_cache.set(key, result)
+        return ResponseModel(code=200, status="Success", result=result)
+
+    def _periods(self, db: Session, start: date, end: date, monthly: bool) -> dict:
+        """One row per day (or month) in the window, read from daily_rollups only"""
+        period = func.date_trunc("month", DailyRollup.day) if monthly else DailyRollup.day
+        rows = (
+            db.query(
+                period.label("period"),
+                func.sum(DailyRollup.pawn_count).label("pawn_count"),
+                func.sum(DailyRollup.pawn_principal).label("pawn_principal"),
+                func.sum(DailyRollup.pawn_value).label("pawn_value"),
+                func.sum(DailyRollup.order_count).label("order_count"),
+                func.sum(DailyRollup.order_revenue).label("order_revenue"),
+                func.sum(DailyRollup.order_labor_cost).label("order_labor_cost"),
+                func.sum(DailyRollup.order_buy_cost).label("order_buy_cost"),
+            )
+            .filter(DailyRollup.day.between(start, end))
+            .group_by(period)
+            .order_by(period)
+            .all()
+        )
+        periods = [_period(row, "month" if monthly else "day") for row in rows]
+        totals = {
+            key: round(sum(record[key] for record in periods), 2)
+            for key in ("pawn_count", "pawn_principal", "pawn_value", "order_count", "order_revenue", "order_labor_cost", "order_buy_cost", "profit")
+        }
+        return {"start": start.isoformat(), "end": end.isoformat(), "periods": periods, "totals": totals}
+
+    def get_daily_report(self, db: Session, start: Optional[date] = None, end: Optional[date] = None):
+        """Pawn principal, order revenue, costs and profit per day"""
+        start, end = self._window(start, end)
+        return self._cached(("daily", start, end), lambda: self._periods(db, start, end, monthly=False))
+
+    def get_monthly_report(self, db: Session, start: Optional[date] = None, end: Optional[date] = None):
+        """The daily figures summed per calendar month"""
+        start, end = self._window(start, end)
+        return self._cached(("monthly", start, end), lambda: self._periods(db, start, end, monthly=True))
+
+    def get_product_report(self, db: Session, start: Optional[date] = None, end: Optional[date] = None, limit: int = 50):
+        """Per-product pawn and order figures over the window, most profitable first"""
+        start, end = self._window(start, end)
+
+        def compute():
+            profit = func.sum(
+                DailyProductRollup.order_revenue - DailyProductRollup.order_labor_cost - DailyProductRollup.order_buy_cost
+            )
+            rows = (
+                db.query(
+                    DailyProductRollup.prod_id,
+                    Product.prod_name,
+                    func.sum(DailyProductRollup.pawn_lines).label("pawn_lines"),
+                    func.sum(DailyProductRollup.pawn_amount).label("pawn_amount"),
+                    func.sum(DailyProductRollup.pawn_value).label("pawn_value"),
+                    func.sum(DailyProductRollup.order_lines).label("order_lines"),
+                    func.sum(DailyProductRollup.order_revenue).label("order_revenue"),
+                    func.sum(DailyProductRollup.order_labor_cost).label("order_labor_cost"),
+                    func.sum(DailyProductRollup.order_buy_cost).label("order_buy_cost"),
+                )
+                .join(Product, Product.prod_id == DailyProductRollup.prod_id)
+                .filter(DailyProductRollup.day.between(start, end))
+                .group_by(DailyProductRollup.prod_id, Product.prod_name)
+                .order_by(profit.desc(), DailyProductRollup.prod_id)
+                .limit(limit)
+                .all()
+            )
+            return {
+                "start": start.isoformat(),
+                "end": end.isoformat(),
+                "products": [
+                    {
+                        "prod_id": row.prod_id,
+                        "prod_name": row.prod_name,
+                        "pawn_lines": int(row.pawn_lines or 0),
+                        "pawn_amount": int(row.pawn_amount or 0),
+                        "order_lines": int(row.order_lines or 0),
+                        **_figures(row),
+                    }
+                    for row in rows
+                ],
+            }
+
+        return self._cached(("products", start, end, limit), compute)
+
+class AsyncStaff:
+    """Asyncio variant of Staff used when ASYNC_DATABASE is enabled (see routes/pawn/repository.py)"""
+    def __init__(self):
+        self.staff = Staff()
+
+    def is_staff(self, current_user: Principal):
+        self.staff.is_staff(current_user)
+
+    async def get_daily_report(self, db: AsyncSession, start: Optional[date] = None, end: Optional[date] = None):
+        return await db.run_sync(lambda session: self.staff.get_daily_report(session, start, end))
+
+    async def get_monthly_report(self, db: AsyncSession, start: Optional[date] = None, end: Optional[date] = None):
+        return await db.run_sync(lambda session: self.staff.get_monthly_report(session, start, end))
+
+    async def get_product_report(self, db: AsyncSession, start: Optional[date] = None, end: Optional[date] = None, limit: int = 50):
+        return await db.run_sync(lambda session: self.staff.get_product_report(session, start, end, limit))
@@ -0,0 +1,149 @@
+"""
+Daily reporting rollups, maintained incrementally.
+
+Every pawn/order write adds its figures to one daily_rollups row and one daily_product_rollups
+row per product (INSERT ... ON CONFLICT DO UPDATE SET x = x + excluded.x) in the same
+transaction as the ticket, so reports read O(days) rows instead of every detail line.
+rebuild_rollups() recomputes both tables from the tickets (`python manage.py rebuild-rollups`).
+"""
+from collections import defaultdict
+from datetime import date, datetime
+from typing import Dict, Iterable, List, Optional, Tuple, Union
+
+from sqlalchemy import text
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+
+import cache_bus
+from entities import DailyProductRollup, DailyRollup
+
+DAILY_COUNTERS = (
+    "pawn_count", "pawn_principal", "pawn_value",
+    "order_count", "order_revenue", "order_labor_cost", "order_buy_cost",
+)
+PRODUCT_COUNTERS = (
+    "pawn_lines", "pawn_amount", "pawn_value",
+    "order_lines", "order_revenue", "order_labor_cost", "order_buy_cost",
+)
+
+DateLike = Union[date, datetime, None]
+
+def _day(value: DateLike) -> date:
+    if value is None:
+        return datetime.utcnow().date()
+    return value.date() if isinstance(value, datetime) else value
+
+def _upsert(db: Session, model, keys: Tuple[str, ...], counters: Tuple[str, ...], totals: Dict[tuple, Dict[str, float]]):
+    # Sorted keys: concurrent writers lock the rollup rows in the same order, so they can't deadlock
+    rows = [dict(zip(keys, key), **values) for key, values in sorted(totals.items())]
+    statement = pg_insert(model).values(rows)
+    db.execute(statement.on_conflict_do_update(
+        index_elements=list(keys),
+        set_={column: getattr(model, column) + statement.excluded[column] for column in counters},
+    ))
+
+def _apply(db: Session, daily: Dict[tuple, Dict[str, float]], products: Dict[tuple, Dict[str, float]]):
+    if not daily or db.get_bind().dialect.name != "postgresql":
+        return  # no ON CONFLICT upserts elsewhere; rebuild_rollups() catches up
+    _upsert(db, DailyRollup, ("day",), DAILY_COUNTERS, daily)
+    if products:
+        _upsert(db, DailyProductRollup, ("day", "prod_id"), PRODUCT_COUNTERS, products)
+    cache_bus.publish(db, "reports")
+
+def _counters(names: Tuple[str, ...]):
+    return lambda: dict.fromkeys(names, 0)
+
+def record_pawns(db: Session, tickets: Iterable[Tuple[DateLike, Optional[float], List[dict]]]):
+    """Add pawns to the rollups: (pawn_date, pawn_deposit, detail rows with prod_id/pawn_amount/pawn_unit_price)"""
+    daily = defaultdict(_counters(DAILY_COUNTERS))
+    products = defaultdict(_counters(PRODUCT_COUNTERS))
+    for pawn_date, deposit, details in tickets:
+        day = _day(pawn_date)
+        totals = daily[(day,)]
+        totals["pawn_count"] += 1
+        totals["pawn_principal"] += deposit or 0
+        for detail in details:
+            amount = detail["pawn_amount"] or 0
+            value = amount * (detail["pawn_unit_price"] or 0)
+            totals["pawn_value"] += value
+            product = products[(day, detail["prod_id"])]
+            product["pawn_lines"] += 1
+            product["pawn_amount"] += amount
+            product["pawn_value"] += value
+    _apply(db, daily, products)
+
+def record_orders(db: Session, orders: Iterable[Tuple[DateLike, List[dict]]]):
+    """Add orders to the rollups: (order_date, detail rows with prod_id/order_amount/labor and buy cost)"""
+    daily = defaultdict(_counters(DAILY_COUNTERS))
+    products = defaultdict(_counters(PRODUCT_COUNTERS))
+    for order_date, details in orders:
+        day = _day(order_date)
+        totals = daily[(day,)]
+        totals["order_count"] += 1
+        for detail in details:
+            # Revenue, cost and profit as get_order_print counts them
+            revenue = detail["order_amount"] or 0
+            labor = detail["product_labor_cost"] or 0
+            buy = detail["product_buy_price"] or 0
+            totals["order_revenue"] += revenue
+            totals["order_labor_cost"] += labor
+            totals["order_buy_cost"] += buy
+            product = products[(day, detail["prod_id"])]
+            product["order_lines"] += 1
+            product["order_revenue"] += revenue
+            product["order_labor_cost"] += labor
+            product["order_buy_cost"] += buy
+    _apply(db, daily, products)
+
+REBUILD_DAILY = text("""
+    INSERT INTO daily_rollups (day, pawn_count, pawn_principal, pawn_value, order_count, order_revenue, order_labor_cost, order_buy_cost)
+    SELECT day, SUM(pawn_count), SUM(pawn_principal), SUM(pawn_value), SUM(order_count), SUM(order_revenue), SUM(order_labor_cost), SUM(order_buy_cost)
+    FROM (
+        SELECT CAST(p.pawn_date AS date) AS day, 1 AS pawn_count, COALESCE(p.pawn_deposit, 0) AS pawn_principal,
+               COALESCE(d.value, 0) AS pawn_value, 0 AS order_count, 0 AS order_revenue, 0 AS order_labor_cost, 0 AS order_buy_cost
+        FROM pawns p
+        LEFT JOIN (
+            SELECT pawn_id, SUM(COALESCE(pawn_amount, 0) * COALESCE(pawn_unit_price, 0)) AS value
+            FROM pawn_details GROUP BY pawn_id
+        ) d ON d.pawn_id = p.pawn_id
+        UNION ALL
+        SELECT CAST(o.order_date AS date), 0, 0, 0, 1, COALESCE(d.revenue, 0), COALESCE(d.labor, 0), COALESCE(d.buy, 0)
+        FROM orders o
+        LEFT JOIN (
+            SELECT order_id, SUM(COALESCE(order_amount, 0)) AS revenue,
+                   SUM(COALESCE(product_labor_cost, 0)) AS labor, SUM(COALESCE(product_buy_price, 0)) AS buy
+            FROM order_details GROUP BY order_id
+        ) d ON d.order_id = o.order_id
+    ) tickets
+    GROUP BY day
+""")
+
+REBUILD_PRODUCTS = text("""
+    INSERT INTO daily_product_rollups (day, prod_id, pawn_lines, pawn_amount, pawn_value, order_lines, order_revenue, order_labor_cost, order_buy_cost)
+    SELECT day, prod_id, SUM(pawn_lines), SUM(pawn_amount), SUM(pawn_value), SUM(order_lines), SUM(order_revenue), SUM(order_labor_cost), SUM(order_buy_cost)
+    FROM (
+        SELECT CAST(p.pawn_date AS date) AS day, d.prod_id, 1 AS pawn_lines, COALESCE(d.pawn_amount, 0) AS pawn_amount,
+               COALESCE(d.pawn_amount, 0) * COALESCE(d.pawn_unit_price, 0) AS pawn_value,
+               0 AS order_lines, 0 AS order_revenue, 0 AS order_labor_cost, 0 AS order_buy_cost
+        FROM pawn_details d JOIN pawns p ON p.pawn_id = d.pawn_id
+        UNION ALL
+        SELECT CAST(o.order_date AS date), d.prod_id, 0, 0, 0, 1, COALESCE(d.order_amount, 0),
+               COALESCE(d.product_labor_cost, 0), COALESCE(d.product_buy_price, 0)
+        FROM order_details d JOIN orders o ON o.order_id = d.order_id
+    ) lines
+    GROUP BY day, prod_id
+""")
+
+def rebuild_rollups(db: Session) -> dict:
+    """
+    Recompute both rollup tables from the tickets in one transaction. The EXCLUSIVE lock makes
+    concurrent writers wait, so no increment is lost or counted twice while this runs.
+    """
+    db.execute(text("LOCK TABLE daily_rollups, daily_product_rollups IN EXCLUSIVE MODE"))
+    db.execute(text("DELETE FROM daily_product_rollups"))
+    db.execute(text("DELETE FROM daily_rollups"))
+    days = db.execute(REBUILD_DAILY).rowcount
+    product_days = db.execute(REBUILD_PRODUCTS).rowcount
+    cache_bus.publish(db, "reports")
+    db.commit()
+    return {"days": days, "product_days": product_days}
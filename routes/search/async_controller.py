@@ -0,0 +1,25 @@
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+from database import get_async_db
+from response_model import ResponseModel
+from routes.oauth2.repository import get_current_staff
+from routes.oauth2.model import Principal
+from routes.search.repository import AsyncStaff, DEFAULT_SEARCH_LIMIT, MAX_SEARCH_LIMIT
+
+router = APIRouter(
+    tags=["Search"],
+    prefix="/api"
+)
+
+staff = AsyncStaff()
+
+""" Counter Search (async engine) """
+@router.get("/search", response_model=ResponseModel)
+async def search(
+    q: str = Query(..., min_length=1, max_length=100),
+    limit: int = Query(DEFAULT_SEARCH_LIMIT, ge=1, le=MAX_SEARCH_LIMIT),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Principal = Depends(get_current_staff)
+):
+    """Partial, ranked match over customer names, phone numbers and product names"""
+    return await staff.search(db, q, limit)
@@ -0,0 +1,165 @@
+import heapq
+import re
+from typing import Dict, List, Set
+
+from fastapi import HTTPException
+from sqlalchemy import case, literal
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from sqlalchemy.sql import func, or_
+
+from entities import Account, Product
+from response_model import ResponseModel
+from routes.oauth2.model import Principal
+
+DEFAULT_SEARCH_LIMIT = 10
+MAX_SEARCH_LIMIT = 50
+
+# Fewer digits than this match too many phone numbers to be useful
+MIN_PHONE_DIGITS = 3
+
+def like_pattern(term: str) -> str:
+    """'%term%' with LIKE wildcards in the term escaped (use with escape='\\')"""
+    escaped = term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"%{escaped}%"
+
+def contains(column, term: str):
+    """Case-insensitive substring match that the lower(...) gin_trgm_ops indexes can serve"""
+    return func.lower(column).like(like_pattern(term.lower()), escape="\\")
+
+def phone_digits(term: str) -> str:
+    return re.sub(r"\D", "", term)
+
+# ========== Pure-Python trigram fallback (SQLite and other non-Postgres databases) ==========
+_WORD = re.compile(r"\w+", re.UNICODE)
+
+def trigrams(text: str) -> Set[str]:
+    """pg_trgm style trigrams: each lowercased word padded with two leading and one trailing space"""
+    grams = set()
+    for word in _WORD.findall((text or "").lower()):
+        padded = f"  {word} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+def word_similarity(term: str, text: str) -> float:
+    """Share of the term's trigrams found in the text (an approximation of pg_trgm's word_similarity)"""
+    wanted = trigrams(term)
+    if not wanted:
+        return 0.0
+    return len(wanted & trigrams(text)) / len(wanted)
+
+class Staff:
+    def is_staff(self, current_user: Principal):
+        if current_user.role != 'admin':
+            raise HTTPException(
+                status_code=403,
+                detail="Permission denied",
+            )
+
+    def search(self, db: Session, q: str, limit: int = DEFAULT_SEARCH_LIMIT):
+        """Ranked customer (by name or phone) and product matches for a partial search term"""
+        term = q.strip()
+        if not term:
+            raise HTTPException(status_code=400, detail="Search term is required")
+
+        if db.get_bind().dialect.name == "postgresql":
+            customers = self._search_customers_pg(db, term, limit)
+            products = self._search_products_pg(db, term, limit)
+        else:
+            customers = self._search_customers_python(db, term, limit)
+            products = self._search_products_python(db, term, limit)
+
+        return ResponseModel(
+            code=200,
+            status="Success",
+            message=f"Found {len(customers)} customer(s) and {len(products)} product(s)",
+            result={"customers": customers, "products": products},
+        )
+
+    def _search_customers_pg(self, db: Session, term: str, limit: int) -> List[Dict]:
+        name = func.lower(Account.cus_name)
+        lowered = term.lower()
+        # `term <% name` (word similarity) and LIKE both use the trigram GIN indexes
+        conditions = [literal(lowered).op("<%")(name), contains(Account.cus_name, term)]
+        score = func.word_similarity(lowered, name)
+
+        digits = phone_digits(term)
+        if len(digits) >= MIN_PHONE_DIGITS:
+            phone_match = Account.phone_number.like(like_pattern(digits), escape="\\")
+            conditions.append(phone_match)
+            score = func.greatest(score, case((phone_match, 1.0), else_=0.0))
+
+        rows = (
+            db.query(Account.cus_id, Account.cus_name, Account.phone_number, Account.address, score.label("score"))
+            .filter(Account.role == "user", or_(*conditions))
+            .order_by(score.desc(), Account.cus_id)
+            .limit(limit)
+            .all()
+        )
+        return [self._customer(row, row.score) for row in rows]
+
+    def _search_products_pg(self, db: Session, term: str, limit: int) -> List[Dict]:
+        name = func.lower(Product.prod_name)
+        lowered = term.lower()
+        score = func.word_similarity(lowered, name)
+
+        rows = (
+            db.query(Product.prod_id, Product.prod_name, Product.unit_price, Product.amount, score.label("score"))
+            .filter(or_(literal(lowered).op("<%")(name), contains(Product.prod_name, term)))
+            .order_by(score.desc(), Product.prod_id)
+            .limit(limit)
+            .all()
+        )
+        return [self._product(row, row.score) for row in rows]
+
+    def _search_customers_python(self, db: Session, term: str, limit: int) -> List[Dict]:
+        digits = phone_digits(term)
+        lowered = term.lower()
+        scored = []
+        for row in db.query(Account.cus_id, Account.cus_name, Account.phone_number, Account.address).filter(Account.role == "user"):
+            name = (row.cus_name or "").lower()
+            score = 1.0 if lowered in name else word_similarity(term, name)
+            if len(digits) >= MIN_PHONE_DIGITS and digits in (row.phone_number or ""):
+                score = 1.0
+            if score >= 0.3:
+                scored.append((score, -row.cus_id, row))
+        return [self._customer(row, score) for score, _, row in heapq.nlargest(limit, scored, key=lambda item: item[:2])]
+
+    def _search_products_python(self, db: Session, term: str, limit: int) -> List[Dict]:
+        lowered = term.lower()
+        scored = []
+        for row in db.query(Product.prod_id, Product.prod_name, Product.unit_price, Product.amount):
+            name = (row.prod_name or "").lower()
+            score = 1.0 if lowered in name else word_similarity(term, name)
+            if score >= 0.3:
+                scored.append((score, -row.prod_id, row))
+        return [self._product(row, score) for score, _, row in heapq.nlargest(limit, scored, key=lambda item: item[:2])]
+
+    def _customer(self, row, score) -> Dict:
+        return {
+            "cus_id": row.cus_id,
+            "cus_name": row.cus_name,
+            "phone_number": row.phone_number,
+            "address": row.address,
+            "score": round(float(score), 3),
+        }
+
+    def _product(self, row, score) -> Dict:
+        return {
+            "prod_id": row.prod_id,
+            "prod_name": row.prod_name,
+            "unit_price": row.unit_price,
+            "amount": row.amount,
+            "score": round(float(score), 3),
+        }
+
+class AsyncStaff:
+    """Asyncio variant of Staff used when ASYNC_DATABASE is enabled (see routes/pawn/repository.py)"""
+    def __init__(self):
+        self.staff = Staff()
+
+    def is_staff(self, current_user: Principal):
+        self.staff.is_staff(current_user)
+
+    async def search(self, db: AsyncSession, q: str, limit: int = DEFAULT_SEARCH_LIMIT):
+        return await db.run_sync(lambda session: self.staff.search(session, q, limit))
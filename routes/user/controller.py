@@ -4,7 +4,8 @@ from sqlalchemy.orm import Session
 # from models import Account
 from database import get_db
 from response_model import ResponseModel
-from routes.oauth2.repository import get_current_user
+from routes.oauth2.repository import get_current_staff
+from routes.oauth2.model import Principal
 from routes.user.repository import Staff
 from routes.user.model import *
 # from routes.user.model import CreatePawn 
@@ -37,9 +38,8 @@ def get_pawn_by_id(pawn_id: Optional[int] = None, db: Session = Depends(get_db))
 def delete_product_by_id(
     product_id: int, 
     db: Session = Depends(get_db), 
-    current_user: dict = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_staff)
 ):
-    staff.is_staff(current_user)
     return staff.delete_product_by_id(product_id, db)
 
 """Delete product by name"""
@@ -47,27 +47,24 @@ def delete_product_by_id(
 def delete_product_by_name(
     product_name: str, 
     db: Session = Depends(get_db), 
-    current_user: dict = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_staff)
 ):
-    staff.is_staff(current_user)
     return staff.delete_product_by_name(product_name, db)
 
 """Delete all products"""
 @router.delete("/products")
 def delete_all_products(
     db: Session = Depends(get_db), 
-    current_user: dict = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_staff)
 ):
-    staff.is_staff(current_user)
     return staff.delete_all_products(db)
 
 @router.get("/products/search/{search_input}", response_model=ResponseModel)
 def search_product(
     search_input: str,
     db: Session = Depends(get_db),
-    current_user: dict = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_staff),
 ):
-    staff.is_staff(current_user)
     try:
         if search_input.isdigit():
             product = staff.get_product_by_id(int(search_input), db)
@@ -93,9 +90,8 @@ def search_product(
 def delete_product_by_id(
     product_id: int, 
     db: Session = Depends(get_db), 
-    current_user: dict = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_staff)
 ):
-    staff.is_staff(current_user)
     return staff.delete_product_by_id(product_id, db)
 
 """Delete product by name"""
@@ -103,27 +99,24 @@ def delete_product_by_id(
 def delete_product_by_name(
     product_name: str, 
     db: Session = Depends(get_db), 
-    current_user: dict = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_staff)
 ):
-    staff.is_staff(current_user)
     return staff.delete_product_by_name(product_name, db)
 
 """Delete all products"""
 @router.delete("/products")
 def delete_all_products(
     db: Session = Depends(get_db), 
-    current_user: dict = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_staff)
 ):
-    staff.is_staff(current_user)
     return staff.delete_all_products(db)
 
 @router.get("/products/search/{search_input}", response_model=ResponseModel)
 def search_product(
     search_input: str,
     db: Session = Depends(get_db),
-    current_user: dict = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_staff),
 ):
-    staff.is_staff(current_user)
     try:
         if search_input.isdigit():
             product = staff.get_product_by_id(int(search_input), db)
@@ -149,9 +142,8 @@ def search_product(
 @router.get("/next-product-id", response_model=ResponseModel)
 def get_next_product_id(
     db: Session = Depends(get_db), 
-    current_user: dict = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_staff)
 ):
-    staff.is_staff(current_user)  # Ensure authorization
     response = staff.get_next_product_id(db)
 
     return ResponseModel(
@@ -166,9 +158,8 @@ def get_next_product_id(
 @router.get("/next-client-id", response_model=ResponseModel)
 def get_next_client_id(
     db: Session = Depends(get_db), 
-    current_user: dict = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_staff)
 ):
-    staff.is_staff(current_user)  # Ensure authorization
     response = staff.get_next_client_id(db)
 
     return ResponseModel(
@@ -183,9 +174,8 @@ def get_next_client_id(
 @router.get("/next-order-id", response_model=ResponseModel)
 def get_next_order_id(
     db: Session = Depends(get_db), 
-    current_user: dict = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_staff)
 ):
-    staff.is_staff(current_user)  # Ensure authorization
     response = staff.get_next_order_id(db)
 
     return ResponseModel(
@@ -200,9 +190,8 @@ def get_next_order_id(
 @router.get("/next-pawn-id", response_model=ResponseModel)
 def get_next_pawn_id(
     db: Session = Depends(get_db), 
-    current_user: dict = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_staff)
 ):
-    staff.is_staff(current_user)  # Ensure authorization
     response = staff.get_next_pawn_id(db)
 
     return ResponseModel(
@@ -217,10 +206,9 @@ def get_next_pawn_id(
 def update_product(
     updated_product: UpdateProduct,  # Accept JSON as request body
     db: Session = Depends(get_db),
-    current_user: dict = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_staff),
 ):
     staff_service = Staff()
-    staff_service.is_staff(current_user)  # Ensure user is staff/admin
 
     return staff_service.update_product(
         db,
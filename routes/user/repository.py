@@ -3,22 +3,31 @@ from routes.user.model import *
 from sqlalchemy.orm import Session
 from entities import *
 from response_model import ResponseModel
+from routes.oauth2.model import Principal
+from routes.search.repository import contains
+from routes.product.repository import product_catalog, publish_product_change, resolve_product_ids
+from routes.pawn.repository import load_pawn_records
+import id_allocator
+from totals import order_totals, pawn_totals
+import queries
+from weights import order_weight_fields, pawn_weight_fields
+from routes.report.rollups import record_orders, record_pawns
 from typing import List, Dict
 # from app.models import Client, Pawn
 from sqlalchemy.sql import func, or_, and_
-from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
 from collections import defaultdict
 from typing import Dict, Any
 
 class Staff:
-    def is_staff(self, current_user: dict):
-        if current_user['role'] != 'admin':
+    def is_staff(self, current_user: Principal):
+        if current_user.role != 'admin':
             raise HTTPException(
                 status_code=403,
                 detail="Permission denied",
             )
                 
-    def create_order(self, order_info: CreateOrder, db: Session, current_user: dict):
+    def create_order(self, order_info: CreateOrder, db: Session, current_user: Principal):
         existing_customer = db.query(Account).filter(
             and_(
                 or_(
@@ -30,25 +39,27 @@ class Staff:
         ).first()
 
         if existing_customer:
-            # ✅ Update existing customer's name and address
+            # ✅ Update existing customer's name and address (committed with the ticket below)
             existing_customer.cus_name = order_info.cus_name
             existing_customer.address = order_info.address
-            db.commit()
-            db.refresh(existing_customer)
         else:
-            # ✅ Create new customer if not found
-            existing_customer = self.create_client(
-                CreateClient(
-                    cus_name=order_info.cus_name, 
-                    phone_number=order_info.phone_number, 
-                    address=order_info.address
-                ), 
-                db, 
-                True
+            # ✅ Create new customer if not found (flushed for its cus_id)
+            existing_customer = Account(
+                cus_name=order_info.cus_name,
+                phone_number=order_info.phone_number,
+                address=order_info.address,
+                role='user',
             )
+            db.add(existing_customer)
+            db.flush()
 
         # ✅ Check if order_id is provided, if it exists, return an error
         if hasattr(order_info, "order_id") and order_info.order_id:
+            if not id_allocator.order_ids.was_issued(db, order_info.order_id):
+                raise HTTPException(
+                    status_code=400,
+                    detail=f"Order ID {order_info.order_id} was not reserved.",
+                )
             existing_order = db.query(Order).filter(Order.order_id == order_info.order_id).first()
             if existing_order:
                 return ResponseModel(
@@ -57,31 +68,42 @@ class Staff:
                     message="ផលិតផលបានរក្សាទុករួចរាល់ហើយ"
                 )
 
-        # ✅ Create a new order if order_id is not provided
+        # ✅ Create the order, under the reserved order_id if one was submitted
         order = Order(
             cus_id=existing_customer.cus_id,
-            order_deposit=order_info.order_deposit
+            order_deposit=order_info.order_deposit,
+            **order_totals(order_info.order_product_detail),
         )
+        if order_info.order_id:
+            order.order_id = order_info.order_id
         db.add(order)
-        db.commit()
-        db.refresh(order)
-
-        for product in order_info.order_product_detail:
-            existing_product = db.query(Product).filter(
-                Product.prod_name == func.lower(product.prod_name)
-            ).first()
+        try:
+            db.flush()  # for its order_id; the one commit below covers customer, order, details and rollups
+        except IntegrityError:
+            # was_issued only proves the sequence passed the id; another request may have inserted it first
+            db.rollback()
+            if not order_info.order_id:
+                raise
+            raise HTTPException(
+                status_code=400,
+                detail=f"Order ID {order_info.order_id} already exists.",
+            )
 
-            if not existing_product:
-                prod = self.create_product(CreateProduct(prod_name=product.prod_name), db, current_user)
-                prod_id = prod.prod_id
-            else:
-                prod_id = existing_product.prod_id
+        # ✅ Resolve every line item's product from the catalog (one batch for unknown names)
+        product_ids = resolve_product_ids(
+            db,
+            [product.prod_name for product in order_info.order_product_detail],
+            current_user.id,
+        )
 
+        rollup_details = []
+        for product in order_info.order_product_detail:
             # ✅ Add order details (always create new details, do not delete old ones)
             order_detail = OrderDetail(
                 order_id=order.order_id,
-                prod_id=prod_id,
+                prod_id=product_ids[product.prod_name.lower()],
                 order_weight=product.order_weight,
+                **order_weight_fields(product.order_weight),
                 order_amount=product.order_amount,
                 product_sell_price=product.product_sell_price,
                 product_labor_cost=product.product_labor_cost,
@@ -89,7 +111,14 @@ class Staff:
             )
 
             db.add(order_detail)
+            rollup_details.append({
+                "prod_id": order_detail.prod_id,
+                "order_amount": order_detail.order_amount,
+                "product_labor_cost": order_detail.product_labor_cost,
+                "product_buy_price": order_detail.product_buy_price,
+            })
 
+        record_orders(db, [(order.order_date, rollup_details)])
         db.commit()  # Commit all order details at once
 
         return ResponseModel(
@@ -99,14 +128,19 @@ class Staff:
         )
 
           
-    def create_pawn(self, pawn_info: CreatePawn, db: Session, current_user: dict):
+    def create_pawn(self, pawn_info: CreatePawn, db: Session, current_user: Principal):
         if pawn_info.pawn_date > pawn_info.pawn_expire_date:
             raise HTTPException(
                 status_code=400,
                 detail="Pawn date must be before the expire date.",
             )
 
-        # ✅ Check if the provided pawn_id already exists
+        # ✅ A submitted pawn_id must have been reserved, and the provided pawn_id must not exist yet
+        if pawn_info.pawn_id and not id_allocator.pawn_ids.was_issued(db, pawn_info.pawn_id):
+            raise HTTPException(
+                status_code=400,
+                detail=f"Pawn ID {pawn_info.pawn_id} was not reserved.",
+            )
         existing_pawn = db.query(Pawn).filter(Pawn.pawn_id == pawn_info.pawn_id).first()
         
         if existing_pawn:
@@ -125,59 +159,73 @@ class Staff:
         ).first()
 
         if existing_customer:
-            # ✅ Update existing customer's name and address
+            # ✅ Update existing customer's name and address (committed with the ticket below)
             existing_customer.cus_name = pawn_info.cus_name
             existing_customer.address = pawn_info.address
-            db.commit()
-            db.refresh(existing_customer)
         else:
-            # ✅ Create a new customer if not found
-            existing_customer = self.create_client(
-                CreateClient(
-                    cus_name=pawn_info.cus_name,
-                    phone_number=pawn_info.phone_number,
-                    address=pawn_info.address
-                ), 
-                db, 
-                True
+            # ✅ Create new customer if not found (flushed for its cus_id)
+            existing_customer = Account(
+                cus_name=pawn_info.cus_name,
+                phone_number=pawn_info.phone_number,
+                address=pawn_info.address,
+                role='user',
             )
+            db.add(existing_customer)
+            db.flush()
 
         # ✅ Create a new Pawn record
         pawn = Pawn(
             cus_id=existing_customer.cus_id,
             pawn_date=pawn_info.pawn_date,
             pawn_deposit=pawn_info.pawn_deposit,
-            pawn_expire_date=pawn_info.pawn_expire_date
+            pawn_expire_date=pawn_info.pawn_expire_date,
+            interest_rate=pawn_info.interest_rate,
+            **pawn_totals(pawn_info.pawn_product_detail),
         )
+        if pawn_info.pawn_id:
+            pawn.pawn_id = pawn_info.pawn_id
 
         db.add(pawn)
-        db.commit()
-        db.refresh(pawn)
+        try:
+            db.flush()  # for its pawn_id; the one commit below covers customer, pawn, details and rollups
+        except IntegrityError:
+            # was_issued only proves the sequence passed the id; another request may have inserted it first
+            db.rollback()
+            if not pawn_info.pawn_id:
+                raise
+            raise HTTPException(
+                status_code=400,
+                detail=f"Pawn record with ID {pawn_info.pawn_id} already exists.",
+            )
 
         # ✅ Insert Pawn Products (Allow multiple products per pawn)
-        for product in pawn_info.pawn_product_detail:
-            # 🔹 Ensure product exists or create new one
-            existing_product = db.query(Product).filter(
-                Product.prod_name.ilike(product.prod_name)
-            ).first()
-
-            if not existing_product:
-                prod = self.create_product(CreateProduct(prod_name=product.prod_name), db, current_user)
-                prod_id = prod.prod_id
-            else:
-                prod_id = existing_product.prod_id
+        # 🔹 Resolve every product from the catalog, creating unknown names in one batch
+        product_ids = resolve_product_ids(
+            db,
+            [product.prod_name for product in pawn_info.pawn_product_detail],
+            current_user.id,
+        )
 
+        rollup_details = []
+        for product in pawn_info.pawn_product_detail:
             # ✅ Create PawnDetail for each product
             pawn_detail = PawnDetail(
                 pawn_id=pawn.pawn_id,
-                prod_id=prod_id,
+                prod_id=product_ids[product.prod_name.lower()],
                 pawn_weight=product.pawn_weight,
+                **pawn_weight_fields(product.pawn_weight),
                 pawn_amount=product.pawn_amount,
                 pawn_unit_price=product.pawn_unit_price
             )
 
             db.add(pawn_detail)
+            rollup_details.append({
+                "prod_id": pawn_detail.prod_id,
+                "pawn_amount": pawn_detail.pawn_amount,
+                "pawn_unit_price": pawn_detail.pawn_unit_price,
+            })
 
+        record_pawns(db, [(pawn.pawn_date, pawn.pawn_deposit, rollup_details)])
         db.commit()  # ✅ Commit all pawn details at once for efficiency
 
         return ResponseModel(
@@ -297,34 +345,10 @@ class Staff:
         Retrieve all orders or a specific order by ID along with customer details.
         """
         # Fetch all orders (or a specific order if order_id is provided)
-        order_query = (
-            db.query(
-                Account.cus_id,
-                Account.cus_name,
-                Account.phone_number,
-                Account.address,
-                Order.order_id,
-                Order.order_deposit,
-                Order.order_date,
-                Product.prod_id,
-                Product.prod_name,
-                OrderDetail.order_weight,
-                OrderDetail.order_amount,
-                OrderDetail.product_sell_price,
-                OrderDetail.product_labor_cost,
-                OrderDetail.product_buy_price,
-            )
-            .join(Order, Account.cus_id == Order.cus_id)
-            .join(OrderDetail, Order.order_id == OrderDetail.order_id)
-            .join(Product, OrderDetail.prod_id == Product.prod_id)
-            .filter(Account.role == "user")
-        )
-
-        # If order_id is provided, filter the query
         if order_id:
-            order_query = order_query.filter(Order.order_id == order_id)
-
-        orders = order_query.all()
+            orders = db.execute(queries.ORDER_LINES_BY_ID, {"order_id": order_id}).all()
+        else:
+            orders = db.execute(queries.USER_ORDER_LINES).all()
 
         # If no orders found, return an empty response
         if not orders:
@@ -373,25 +397,8 @@ class Staff:
 
         
     def get_order_detail(self, db: Session, cus_ids: List[int]):
-        # Ensure we are filtering with multiple `cus_id`s
-        orders = (
-            db.query(
-                Order.order_id,
-                Order.order_deposit,
-                Order.order_date,
-                Product.prod_name,
-                Product.prod_id,
-                OrderDetail.order_weight,
-                OrderDetail.order_amount,
-                OrderDetail.product_sell_price,
-                OrderDetail.product_labor_cost,
-                OrderDetail.product_buy_price,
-            )
-            .join(Order, OrderDetail.order_id == Order.order_id)
-            .join(Product, OrderDetail.prod_id == Product.prod_id)
-            .filter(Order.cus_id.in_(cus_ids))  # Fetch orders for multiple `cus_id`s
-            .all()
-        )
+        # Fetch orders for multiple `cus_id`s (one expanding IN parameter)
+        orders = db.execute(queries.ORDER_LINES_BY_CUSTOMERS, {"cus_ids": list(cus_ids)}).all()
 
         grouped_orders = defaultdict(lambda: {
             "order_id": None,
@@ -401,21 +408,21 @@ class Staff:
         })
 
         for order in orders:
-            order_id = order[0]  # `order_id`
+            order_id = order.order_id
 
             if grouped_orders[order_id]["order_id"] is None:
                 grouped_orders[order_id]["order_id"] = order_id
-                grouped_orders[order_id]["order_deposit"] = order[1]
-                grouped_orders[order_id]["order_date"] = order[2]  # Order Date
+                grouped_orders[order_id]["order_deposit"] = order.order_deposit
+                grouped_orders[order_id]["order_date"] = order.order_date  # Order Date
 
             product = {
-                "prod_name": order[3],  # Product Name
-                "prod_id": order[4],  # Product ID
-                "order_weight": order[5],  # Product Weight
-                "order_amount": order[6],  # Order Amount
-                "product_sell_price": order[7],  # Sell Price
-                "product_labor_cost": order[8],  # Labor Cost
-                "product_buy_price": order[9],  # Buy Price
+                "prod_name": order.prod_name,  # Product Name
+                "prod_id": order.prod_id,  # Product ID
+                "order_weight": order.order_weight,  # Product Weight
+                "order_amount": order.order_amount,  # Order Amount
+                "product_sell_price": order.product_sell_price,  # Sell Price
+                "product_labor_cost": order.product_labor_cost,  # Labor Cost
+                "product_buy_price": order.product_buy_price,  # Buy Price
             }
 
             grouped_orders[order_id]["products"].append(product)  # Append products correctly
@@ -548,7 +555,9 @@ class Staff:
 
         try:
             db.delete(product)
+            publish_product_change(db)
             db.commit()
+            product_catalog.invalidate()
             return ResponseModel(
                 code=200,
                 status="Success",
@@ -575,7 +584,9 @@ class Staff:
         
         try:
             db.delete(product)
+            publish_product_change(db)
             db.commit()
+            product_catalog.invalidate()
             return ResponseModel(
                 code=200,
                 status="Success",
@@ -594,7 +605,9 @@ class Staff:
         """
         try:
             num_deleted = db.query(Product).delete()
+            publish_product_change(db)
             db.commit()
+            product_catalog.invalidate()
             return ResponseModel(
                 code=200,
                 status="Success",
@@ -611,25 +624,20 @@ class Staff:
         """
         Fetch a product by its ID and return it in a serialized format.
         """
-        product = db.query(Product).filter(Product.prod_id == product_id).first()
+        # Catalog rows are already serialized as {"id", "name", "price", "amount"}
+        product = product_catalog.get(db, product_id)
         if not product:
             raise HTTPException(
                 status_code=404,
                 detail=f"Product with ID {product_id} not found"
             )
-        # Serialize the product
-        return {
-            "id": product.prod_id,  # Changed key name to match the format in `get_product`
-            "name": product.prod_name,
-            "price": product.unit_price,
-            "amount": product.amount,
-        }
+        return dict(product)
         
     def get_product_by_name(self, product_name: str, db: Session) -> List[Dict]:
         """
         Fetch products by their name and return them in a serialized format.
         """
-        products = db.query(Product).filter(Product.prod_name.ilike(f"%{product_name}%")).all()
+        products = db.query(Product).filter(contains(Product.prod_name, product_name)).order_by(Product.prod_name).all()
         if not products:
             raise HTTPException(
                 status_code=404,
@@ -651,37 +659,14 @@ class Staff:
         """
         Retrieve all pawn records or a specific pawn by ID along with customer and product details.
         """
-        # Query to fetch all pawn records (or filter by pawn_id if provided)
-        pawn_query = (
-            db.query(
-                Account.cus_id,
-                Account.cus_name,
-                Account.phone_number,
-                Account.address,
-                Pawn.pawn_id,
-                Pawn.pawn_deposit,
-                Pawn.pawn_date,
-                Pawn.pawn_expire_date,
-                Product.prod_id,
-                Product.prod_name,
-                PawnDetail.pawn_weight,
-                PawnDetail.pawn_amount,
-                PawnDetail.pawn_unit_price,
-            )
-            .join(Pawn, Account.cus_id == Pawn.cus_id)
-            .join(PawnDetail, Pawn.pawn_id == PawnDetail.pawn_id)
-            .join(Product, PawnDetail.prod_id == Product.prod_id)
-            .filter(Account.role == "user")
-        )
-
-        # If pawn_id is provided, filter the query
+        # Fetch all pawn records (or a specific pawn if pawn_id is provided), one record per pawn
         if pawn_id:
-            pawn_query = pawn_query.filter(Pawn.pawn_id == pawn_id)
-
-        pawns = pawn_query.all()
+            records = load_pawn_records(db, queries.PAWN_RECORDS_BY_ID, {"pawn_id": pawn_id})
+        else:
+            records = load_pawn_records(db, queries.USER_PAWN_RECORDS)
 
         # If no pawn records found, return a 404 response
-        if not pawns:
+        if not records:
             return ResponseModel(
                 code=404,
                 status="Error",
@@ -689,35 +674,34 @@ class Staff:
                 result=[]
             )
 
-        # Structure the response
+        # Structure the response: customers, each with their pawns
         pawn_list = {}
-        for pawn in pawns:
-            cus_id = pawn[0]  # Account.cus_id
+        for record in records:
+            cus_id = record["cus_id"]
 
             if cus_id not in pawn_list:
                 pawn_list[cus_id] = {
                     "cus_id": cus_id,
-                    "customer_name": pawn[1],
-                    "phone_number": pawn[2],
-                    "address": pawn[3],
+                    "customer_name": record["cus_name"],
+                    "phone_number": record["phone_number"],
+                    "address": record["address"],
                     "pawns": []
                 }
 
-            # Add pawn details for the customer
             pawn_list[cus_id]["pawns"].append({
-                "pawn_id": pawn[4],
-                "pawn_deposit": pawn[5],
-                "pawn_date": pawn[6].strftime("%Y-%m-%d"),
-                "pawn_expire_date": str(pawn[7]),
+                "pawn_id": record["pawn_id"],
+                "pawn_deposit": record["pawn_deposit"],
+                "pawn_date": record["pawn_date"].strftime("%Y-%m-%d"),
+                "pawn_expire_date": str(record["pawn_expire_date"]),
                 "products": [
                     {
-                        "prod_id": pawn[8],
-                        "prod_name": pawn[9],
-                        "pawn_weight": pawn[10],
-                        "pawn_amount": pawn[11],
-                        "pawn_unit_price": pawn[12],
-                        # "pawn_deposit": pawn[5],  
+                        "prod_id": product["prod_id"],
+                        "prod_name": product["prod_name"],
+                        "pawn_weight": product["pawn_weight"],
+                        "pawn_amount": product["pawn_amount"],
+                        "pawn_unit_price": product["pawn_unit_price"],
                     }
+                    for product in record["products"]
                 ]
             })
 
@@ -735,68 +719,52 @@ class Staff:
 
     def get_next_product_id(self, db: Session):
         """
-        Retrieve the last product ID and return the next available ID.
+        Reserve the next product ID (never handed out twice, see id_allocator.py).
         """
         try:
-            last_product = db.query(Product.prod_id).order_by(Product.prod_id.desc()).first()
-
-            next_product_id = last_product.prod_id + 1 if last_product else 1  # Start from 1 if no product exists
-
             return {
                 "code": 200,
                 "status": "Success",
-                "result": {"id": next_product_id}
+                "result": {"id": id_allocator.product_ids.reserve(db)}
             }
         except SQLAlchemyError as e:
             raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
 
     def get_next_client_id(self, db: Session):
         """
-        Retrieve the last client ID and return the next available ID.
+        Reserve the next client ID (never handed out twice, see id_allocator.py).
         """
         try:
-            last_client = db.query(Account.cus_id).filter(Account.role == "user").order_by(Account.cus_id.desc()).first()
-
-            next_client_id = last_client.cus_id + 1 if last_client else 1  # Start from 1 if no client exists
-
             return {
                 "code": 200,
                 "status": "Success",
-                "result": {"id": next_client_id}
+                "result": {"id": id_allocator.customer_ids.reserve(db)}
             }
         except SQLAlchemyError as e:
             raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
         
     def get_next_order_id(self, db: Session):
         """
-        Retrieve the last order ID and return the next available ID.
+        Reserve the next order ID (never handed out twice, see id_allocator.py).
         """
         try:
-            last_order = db.query(Order.order_id).order_by(Order.order_id.desc()).first()
-
-            next_order_id = last_order.order_id + 1 if last_order else 1  # Start from 1 if no order exists
-
             return {
                 "code": 200,
                 "status": "Success",
-                "result": {"id": next_order_id}
+                "result": {"id": id_allocator.order_ids.reserve(db)}
             }
         except SQLAlchemyError as e:
             raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
 
     def get_next_pawn_id(self, db: Session):
         """
-        Retrieve the last pawn ID and return the next available ID.
+        Reserve the next pawn ID (never handed out twice, see id_allocator.py).
         """
         try:
-            last_pawn = db.query(Pawn.pawn_id).order_by(Pawn.pawn_id.desc()).first()
-
-            next_pawn_id = last_pawn.pawn_id + 1 if last_pawn else 1  # Start from 1 if no pawn exists
-
             return {
                 "code": 200,
                 "status": "Success",
-                "result": {"id": next_pawn_id}
+                "result": {"id": id_allocator.pawn_ids.reserve(db)}
             }
         except SQLAlchemyError as e:
             raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
@@ -838,7 +806,9 @@ class Staff:
         if amount is not None:
             product.amount = amount
 
+        publish_product_change(db)
         db.commit()
+        product_catalog.invalidate()
         db.refresh(product)
 
         return ResponseModel(
@@ -862,44 +832,23 @@ class Staff:
         If search parameters (cus_id, cus_name, phone_number) are provided, filter the records.
         Otherwise, return all records.
         """
-        query = (
-            db.query(
-                Account.cus_id,
-                Account.cus_name,
-                Account.phone_number,
-                Account.address,
-                Pawn.pawn_id,
-                Pawn.pawn_deposit,
-                Pawn.pawn_date,
-                Pawn.pawn_expire_date,
-                Product.prod_id,
-                Product.prod_name,
-                PawnDetail.pawn_weight,
-                PawnDetail.pawn_amount,
-                PawnDetail.pawn_unit_price,
-            )
-            .join(Pawn, Account.cus_id == Pawn.cus_id)
-            .join(PawnDetail, Pawn.pawn_id == PawnDetail.pawn_id)
-            .join(Product, PawnDetail.prod_id == Product.prod_id)
-        )
-
         # Apply filters if search parameters are provided
-        if cus_id or cus_name or phone_number:
-            query = query.filter(
-                and_(
-                    or_(
-                        (cus_id is not None and Account.cus_id == cus_id),
-                        (cus_name is not None and func.lower(Account.cus_name).contains(func.lower(cus_name))),
-                        (phone_number is not None and Account.phone_number.contains(phone_number)),
-                    ),
-                    Account.role == "user"
-                )
-            )
+        filters = []
+        if cus_id:
+            filters.append(Account.cus_id == cus_id)
+        if cus_name:
+            filters.append(contains(Account.cus_name, cus_name))
+        if phone_number:
+            filters.append(Account.phone_number.contains(phone_number))
 
-        query = query.order_by(Pawn.pawn_id.desc())  # Sort by latest pawn records
-        pawns = query.all()
+        # One record per pawn, latest first
+        records = load_pawn_records(
+            db,
+            queries.USER_PAWN_RECORDS_NEWEST_FIRST,
+            criteria=(or_(*filters),) if filters else (),
+        )
 
-        if not pawns:
+        if not records:
             return ResponseModel(
                 code=200,
                 status="Success",
@@ -907,44 +856,33 @@ class Staff:
                 result=[]
             )
 
-        # Group the results by cus_id
-        grouped_pawns = defaultdict(lambda: {
-            "cus_id": 0,
-            "customer_name": "",
-            "phone_number": "",
-            "address": "",
-            "pawn_deposit": 0,
-            "pawn_date": "",
-            "pawn_expire_date": "",
-            "products": [],
-        })
-
-        for pawn in pawns:
-            cus_id = pawn[0]  # Extract cus_id
-
-            # Populate customer details only once
-            if not grouped_pawns[cus_id]["customer_name"]:
-                grouped_pawns[cus_id].update({
-                    "pawn_id": pawn[4],
-                    "cus_id": pawn[0],
-                    "customer_name": pawn[1],
-                    "phone_number": pawn[2],
-                    "address": pawn[3],
-                    "pawn_deposit": pawn[5],
-                    "pawn_date": pawn[6],
-                    "pawn_expire_date": pawn[7],
-                })
-
-            # Add product details
-            product = {
-                "prod_id": pawn[8],
-                "prod_name": pawn[9],
-                "pawn_weight": pawn[10],
-                "pawn_amount": pawn[11],
-                "pawn_unit_price": pawn[12],
-            }
+        # Group the records by customer: the latest pawn's details, every pawn's products
+        grouped_pawns = {}
+        for record in records:
+            customer = grouped_pawns.get(record["cus_id"])
+            if customer is None:
+                customer = grouped_pawns[record["cus_id"]] = {
+                    "cus_id": record["cus_id"],
+                    "customer_name": record["cus_name"],
+                    "phone_number": record["phone_number"],
+                    "address": record["address"],
+                    "pawn_id": record["pawn_id"],
+                    "pawn_deposit": record["pawn_deposit"],
+                    "pawn_date": record["pawn_date"],
+                    "pawn_expire_date": record["pawn_expire_date"],
+                    "products": [],
+                }
 
-            grouped_pawns[cus_id]["products"].append(product)
+            customer["products"].extend(
+                {
+                    "prod_id": product["prod_id"],
+                    "prod_name": product["prod_name"],
+                    "pawn_weight": product["pawn_weight"],
+                    "pawn_amount": product["pawn_amount"],
+                    "pawn_unit_price": product["pawn_unit_price"],
+                }
+                for product in record["products"]
+            )
 
         return ResponseModel(
             code=200,
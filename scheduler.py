@@ -0,0 +1,235 @@
+"""
+In-process background jobs with a single leader across workers.
+
+Every worker runs a scheduler thread, but only the leader does work: the worker that wins
+pg_try_advisory_lock keeps it (session-level, on a dedicated connection) until it stops or
+loses that connection, so with N uvicorn workers each job still runs once per interval.
+Followers retry the lock on every tick and take over if the leader goes away.
+
+The pawn due-date job scans pawns expiring inside a window around today, in keyset batches
+over the pawn_expire_date index, and records each one's due/overdue state in pawn_due_status.
+GET /pawn/expiring reads that table instead of scanning every pawn.
+"""
+import logging
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import create_engine, text, tuple_
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import NullPool
+
+from database import DATABASE_URL, SessionLocal
+from entities import Pawn, PawnDueStatus
+
+logger = logging.getLogger(__name__)
+
+SCHEDULER_ENABLED = os.getenv("SCHEDULER_ENABLED", "true").lower() in ("1", "true", "yes")
+# Seconds between ticks
+SCHEDULER_INTERVAL = int(os.getenv("SCHEDULER_INTERVAL", "300"))
+# Pawns expiring within this many days are "due"
+PAWN_DUE_HORIZON_DAYS = int(os.getenv("PAWN_DUE_HORIZON_DAYS", "30"))
+# Pawns that expired more than this many days ago drop out of pawn_due_status
+PAWN_OVERDUE_LOOKBACK_DAYS = int(os.getenv("PAWN_OVERDUE_LOOKBACK_DAYS", "90"))
+PAWN_DUE_BATCH_SIZE = 1000
+
+# Arbitrary constant shared by every worker (see migrate.MIGRATION_LOCK_ID)
+SCHEDULER_LOCK_ID = 724_031_002
+
+def refresh_pawn_due_status(db: Session, now: Optional[datetime] = None, batch_size: int = PAWN_DUE_BATCH_SIZE) -> int:
+    """
+    Upsert the due/overdue state of every unredeemed pawn expiring between now - PAWN_OVERDUE_LOOKBACK_DAYS
+    and now + PAWN_DUE_HORIZON_DAYS, then drop the rows this pass didn't touch. Returns the rows written.
+    """
+    now = now or datetime.utcnow()
+    lower = now - timedelta(days=PAWN_OVERDUE_LOOKBACK_DAYS)
+    upper = now + timedelta(days=PAWN_DUE_HORIZON_DAYS)
+    written = 0
+    last_key: Tuple[datetime, int] = (lower, 0)
+
+    while True:
+        # Keyset batches in (pawn_expire_date, pawn_id) order: a range scan on the expiry index
+        batch = (
+            db.query(Pawn.pawn_id, Pawn.cus_id, Pawn.pawn_expire_date)
+            .filter(
+                tuple_(Pawn.pawn_expire_date, Pawn.pawn_id) > tuple_(*last_key),
+                Pawn.pawn_expire_date <= upper,
+                Pawn.redeemed_at.is_(None),
+            )
+            .order_by(Pawn.pawn_expire_date, Pawn.pawn_id)
+            .limit(batch_size)
+            .all()
+        )
+        if not batch:
+            break
+
+        rows = [
+            {
+                "pawn_id": pawn.pawn_id,
+                "cus_id": pawn.cus_id,
+                "pawn_expire_date": pawn.pawn_expire_date,
+                "status": "overdue" if pawn.pawn_expire_date < now else "due",
+                "refreshed_at": now,
+            }
+            for pawn in batch
+        ]
+        statement = pg_insert(PawnDueStatus).values(rows)
+        db.execute(statement.on_conflict_do_update(
+            index_elements=[PawnDueStatus.pawn_id],
+            set_={
+                "cus_id": statement.excluded.cus_id,
+                "pawn_expire_date": statement.excluded.pawn_expire_date,
+                "status": statement.excluded.status,
+                "refreshed_at": statement.excluded.refreshed_at,
+            },
+        ))
+        db.commit()
+        written += len(rows)
+        last_key = (batch[-1].pawn_expire_date, batch[-1].pawn_id)
+
+    # Pawns that left the window (or whose expiry date moved out of it) weren't refreshed
+    db.query(PawnDueStatus).filter(PawnDueStatus.refreshed_at < now).delete(synchronize_session=False)
+    db.commit()
+    return written
+
+class Job:
+    def __init__(self, name: str, run: Callable[[Session], int]):
+        self.name = name
+        self.run = run
+        self.last_run: Optional[datetime] = None
+        self.last_duration: Optional[float] = None
+        self.last_rows = 0
+        self.last_error: Optional[str] = None
+
+    def status(self) -> dict:
+        return {
+            "last_run": self.last_run.isoformat() if self.last_run else None,
+            "last_duration_ms": round(self.last_duration * 1000, 2) if self.last_duration is not None else None,
+            "last_rows": self.last_rows,
+            "last_error": self.last_error,
+        }
+
+JOBS: List[Job] = [Job("pawn_due_status", refresh_pawn_due_status)]
+
+class Scheduler(threading.Thread):
+    """Daemon thread that runs JOBS every `interval` seconds while this worker holds the leader lock"""
+    def __init__(self, url: str = DATABASE_URL, interval: float = SCHEDULER_INTERVAL):
+        super().__init__(name="scheduler", daemon=True)
+        self.interval = interval
+        # Outside the request pool: the leader's connection stays checked out for good
+        self.engine = create_engine(url, poolclass=NullPool)
+        self._leader_connection: Optional[Connection] = None
+        self._stop_event = threading.Event()
+        self.ticks = 0
+        self.led = 0
+
+    @property
+    def is_leader(self) -> bool:
+        return self._leader_connection is not None
+
+    def stop(self):
+        self._stop_event.set()
+
+    def run(self):
+        try:
+            while not self._stop_event.is_set():
+                try:
+                    self.tick()
+                except Exception as e:
+                    logger.error(f"Scheduler tick failed: {e}")
+                self._stop_event.wait(self.interval)
+        finally:
+            self._resign()
+            self.engine.dispose()
+
+    def _lead(self) -> bool:
+        """Keep or take leadership; False while another worker holds the lock"""
+        if self._leader_connection is not None:
+            try:
+                self._leader_connection.execute(text("SELECT 1"))
+                self._leader_connection.commit()
+                return True
+            except Exception as e:
+                # The lock went away with the connection; another worker may lead now
+                logger.warning(f"Scheduler lost its leader connection: {e}")
+                self._resign()
+
+        connection = self.engine.connect()
+        try:
+            won = connection.execute(text("SELECT pg_try_advisory_lock(:id)"), {"id": SCHEDULER_LOCK_ID}).scalar()
+            connection.commit()  # a session-level lock outlives the transaction
+        except Exception:
+            connection.close()
+            raise
+        if not won:
+            connection.close()
+            return False
+        self._leader_connection = connection
+        logger.info("⏰ This worker now leads the scheduler")
+        return True
+
+    def _resign(self):
+        """Closing the connection releases the session-level lock"""
+        connection, self._leader_connection = self._leader_connection, None
+        if connection is not None:
+            try:
+                connection.close()
+            except Exception:
+                pass
+
+    def tick(self):
+        self.ticks += 1
+        if not self._lead():
+            return  # another worker is leading
+        self.led += 1
+        for job in JOBS:
+            self._run_job(job)
+
+    def _run_job(self, job: Job):
+        started = time.monotonic()
+        db = SessionLocal()
+        try:
+            job.last_rows = job.run(db)
+            job.last_error = None
+        except Exception as e:
+            db.rollback()
+            job.last_error = str(e)
+            logger.error(f"Scheduled job {job.name} failed: {e}")
+        finally:
+            db.close()
+            job.last_run = datetime.utcnow()
+            job.last_duration = time.monotonic() - started
+
+_scheduler: Optional[Scheduler] = None
+
+def start():
+    """Start this worker's scheduler thread (Postgres only: leadership uses advisory locks)"""
+    global _scheduler
+    if not SCHEDULER_ENABLED or not DATABASE_URL.startswith(("postgres", "postgresql")) or _scheduler is not None:
+        return
+    _scheduler = Scheduler()
+    _scheduler.start()
+    logger.info(f"⏰ Scheduler running every {SCHEDULER_INTERVAL}s")
+
+def stop(timeout: float = 5.0):
+    global _scheduler
+    if _scheduler is None:
+        return
+    _scheduler.stop()
+    _scheduler.join(timeout)
+    _scheduler = None
+
+def status() -> Dict:
+    return {
+        "enabled": SCHEDULER_ENABLED,
+        "running": _scheduler is not None,
+        "interval_seconds": SCHEDULER_INTERVAL,
+        "ticks": _scheduler.ticks if _scheduler else 0,
+        "ticks_led": _scheduler.led if _scheduler else 0,
+        "leader": _scheduler.is_leader if _scheduler else False,
+        "jobs": {job.name: job.status() for job in JOBS},
+    }
@@ -0,0 +1,122 @@
+"""
+Cross-worker invalidation over LISTEN/NOTIFY, with real workers: this test process and a second
+Python process each run their own cache_bus listener and warm their own customer cache; a
+committed write in this process must clear the entry in both. Needs TEST_DATABASE_URL.
+"""
+import os
+import subprocess
+import sys
+import textwrap
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+
+CUSTOMER = {"cus_id": 987_654, "cus_name": "Cache Bus", "phone_number": "000987654", "address": None, "role": "user"}
+
+# The other worker: listen, warm the cache, then report whether the entry was invalidated
+WORKER = textwrap.dedent(f"""
+    import sys, time
+    import cache_bus
+    from routes.client.repository import customer_cache, remember_customer
+
+    cache_bus.start()
+    remember_customer({CUSTOMER!r})
+    print("ready", flush=True)
+    deadline = time.monotonic() + float(sys.argv[1])
+    while time.monotonic() < deadline:
+        if customer_cache.get(("id", {CUSTOMER['cus_id']})) is None:
+            print("invalidated", flush=True)
+            sys.exit(0)
+        time.sleep(0.05)
+    print("stale", flush=True)
+""")
+
+def wait_for(condition, timeout: float = 5.0) -> bool:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.05)
+    return condition()
+
+@pytest.fixture
+def listening(postgres_url):
+    """This process's listener, as a worker would start it"""
+    import cache_bus
+    cache_bus.start()
+    assert cache_bus.status()["connected"]
+    yield cache_bus
+    cache_bus.stop()
+
+class Worker:
+    """A second worker process running WORKER"""
+    def __init__(self, wait_seconds: float):
+        self.process = subprocess.Popen(
+            [sys.executable, "-c", WORKER, str(wait_seconds)],
+            cwd=ROOT,
+            env=dict(os.environ, PYTHONPATH=str(ROOT)),
+            stdout=subprocess.PIPE,
+            text=True,
+        )
+        self.lines = []
+        self._reader = threading.Thread(target=self._read, daemon=True)
+        self._reader.start()
+
+    def _read(self):
+        for line in self.process.stdout:
+            self.lines.append(line.strip())
+
+    def said(self, word: str) -> bool:
+        return word in self.lines
+
+    def close(self):
+        self.process.kill()
+        self.process.wait()
+
+@pytest.fixture
+def other_worker(postgres_url):
+    worker = Worker(wait_seconds=10)
+    try:
+        assert wait_for(lambda: worker.said("ready"), timeout=30), worker.lines
+        yield worker
+    finally:
+        worker.close()
+
+def publish_customer_change(commit: bool):
+    from database import SessionLocal
+    from routes.client.repository import publish_customer_change
+    db = SessionLocal()
+    try:
+        publish_customer_change(db, CUSTOMER["cus_id"], CUSTOMER["phone_number"])
+        if commit:
+            db.commit()
+        else:
+            db.rollback()
+    finally:
+        db.close()
+
+def test_a_committed_write_invalidates_every_worker(listening, other_worker):
+    from routes.client.repository import customer_cache, remember_customer
+    remember_customer(CUSTOMER)
+
+    publish_customer_change(commit=True)
+
+    assert wait_for(lambda: other_worker.said("invalidated")), other_worker.lines
+    assert wait_for(lambda: customer_cache.get(("id", CUSTOMER["cus_id"])) is None)
+    assert customer_cache.get(("phone", CUSTOMER["phone_number"])) is None
+
+def test_a_rolled_back_write_invalidates_nothing(listening, other_worker):
+    from routes.client.repository import customer_cache, remember_customer
+    remember_customer(CUSTOMER)
+    received = listening.status()["received"]
+
+    publish_customer_change(commit=False)
+    time.sleep(1.0)
+
+    assert not other_worker.said("invalidated")
+    assert listening.status()["received"] == received
+    assert customer_cache.get(("id", CUSTOMER["cus_id"])) == CUSTOMER
@@ -0,0 +1,93 @@
+"""
+group_pawn_rows / load_pawn_records: the shared flat-join → one-record-per-pawn grouping behind
+the /pawn listings and the routes/user pawn endpoints.
+"""
+from collections import namedtuple
+from datetime import datetime
+
+import queries
+from entities import Account, Pawn, PawnDetail, Product
+from routes.pawn.repository import group_pawn_rows, load_pawn_records
+from routes.user.repository import Staff
+
+Row = namedtuple("Row", [column.key for column in queries.PAWN_DETAIL_COLUMNS])
+
+def row(pawn_id: int, cus_id: int, prod_id: int) -> Row:
+    return Row(
+        cus_id=cus_id, cus_name=f"customer {cus_id}", phone_number=f"0{cus_id}", address=None,
+        pawn_id=pawn_id, pawn_deposit=100.0, pawn_date=datetime(2024, 1, pawn_id), pawn_expire_date=datetime(2024, 6, 1),
+        total_amount=2, total_weight=7.5,
+        prod_id=prod_id, prod_name=f"product {prod_id}", pawn_weight="2 chi", pawn_weight_grams=7.5,
+        pawn_weight_unit="chi", pawn_amount=1, pawn_unit_price=50.0,
+    )
+
+def test_group_pawn_rows_nests_products_under_their_pawn_in_first_seen_order():
+    records = group_pawn_rows([row(3, 1, 10), row(3, 1, 11), row(2, 2, 10), row(1, 1, 12)])
+
+    assert [record["pawn_id"] for record in records] == [3, 2, 1]
+    assert [product["prod_id"] for product in records[0]["products"]] == [10, 11]
+    assert records[0]["cus_name"] == "customer 1"
+    assert records[0]["total_weight"] == 7.5
+    assert set(records[0]["products"][0]) == {column.key for column in queries.PAWN_PRODUCT_COLUMNS}
+
+def test_group_pawn_rows_of_nothing():
+    assert group_pawn_rows([]) == []
+
+def seed(db):
+    """Two customers: the first with pawns 1 (two items) and 3, the second with pawn 2"""
+    db.add_all([
+        Account(cus_id=1, cus_name="Dara", phone_number="012", role="user"),
+        Account(cus_id=2, cus_name="Sok", phone_number="013", role="user"),
+        Product(prod_id=10, prod_name="ring"),
+        Product(prod_id=11, prod_name="chain"),
+    ])
+    db.flush()
+    for pawn_id, cus_id in ((1, 1), (2, 2), (3, 1)):
+        db.add(Pawn(pawn_id=pawn_id, cus_id=cus_id, pawn_deposit=100, pawn_date=datetime(2024, 1, pawn_id), pawn_expire_date=datetime(2024, 6, 1)))
+    db.flush()
+    db.add_all([
+        PawnDetail(pawn_id=1, prod_id=10, pawn_weight="1 chi", pawn_amount=1, pawn_unit_price=10),
+        PawnDetail(pawn_id=1, prod_id=11, pawn_weight="2 chi", pawn_amount=1, pawn_unit_price=20),
+        PawnDetail(pawn_id=2, prod_id=10, pawn_weight="1 chi", pawn_amount=1, pawn_unit_price=10),
+        PawnDetail(pawn_id=3, prod_id=11, pawn_weight="3 chi", pawn_amount=2, pawn_unit_price=30),
+    ])
+    db.commit()
+
+def test_load_pawn_records_by_id(sqlite_session):
+    seed(sqlite_session)
+
+    records = load_pawn_records(sqlite_session, queries.PAWN_RECORDS_BY_ID, {"pawn_id": 1}, query_engine="python")
+
+    assert len(records) == 1
+    assert records[0]["cus_name"] == "Dara"
+    assert sorted(product["prod_name"] for product in records[0]["products"]) == ["chain", "ring"]
+
+def test_load_pawn_records_newest_first_with_criteria(sqlite_session):
+    seed(sqlite_session)
+
+    records = load_pawn_records(
+        sqlite_session, queries.USER_PAWN_RECORDS_NEWEST_FIRST, criteria=(Account.cus_id == 1,), query_engine="python"
+    )
+
+    assert [record["pawn_id"] for record in records] == [3, 1]
+
+def test_user_get_pawn_by_id_lists_each_pawn_once_with_all_its_products(sqlite_session):
+    seed(sqlite_session)
+
+    result = Staff().get_pawn_by_id(sqlite_session, 1).result
+
+    assert len(result) == 1
+    assert [pawn["pawn_id"] for pawn in result[0]["pawns"]] == [1]
+    assert len(result[0]["pawns"][0]["products"]) == 2
+
+def test_user_get_all_pawns_groups_by_customer_latest_pawn_first(sqlite_session):
+    seed(sqlite_session)
+
+    result = Staff().get_all_pawns(sqlite_session).result
+
+    assert [customer["cus_id"] for customer in result] == [1, 2]
+    assert result[0]["pawn_id"] == 3
+    assert len(result[0]["products"]) == 3
+
+    searched = Staff().get_all_pawns(sqlite_session, cus_name="so").result
+    assert [customer["customer_name"] for customer in searched] == ["Sok"]
@@ -0,0 +1,76 @@
+"""
+Regression test: the statements the repositories actually execute must reach their tables
+through an index. Each case calls repository code, captures the SQL it sends, and EXPLAINs
+that SQL with its real parameters. Sequential scans are disabled so an empty test database
+still plans as a large one would: a Seq Scan then means no usable index exists.
+"""
+from contextlib import contextmanager
+
+import pytest
+from sqlalchemy import event, text
+
+import queries
+from migrate import sequential_scans
+from routes.client.repository import customer_cache, find_customer
+from routes.order.repository import load_order_records
+from routes.pawn.repository import Staff as PawnStaff, load_pawn_records
+
+PAWN_TABLES = {"accounts", "pawns", "pawn_details", "products"}
+ORDER_TABLES = {"accounts", "orders", "order_details", "products"}
+
+@contextmanager
+def captured_sql(db):
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append((statement, parameters))
+
+    bind = db.get_bind()
+    event.listen(bind, "before_cursor_execute", record)
+    try:
+        yield statements
+    finally:
+        event.remove(bind, "before_cursor_execute", record)
+
+def assert_indexed(db, call, tables):
+    db.execute(text("SET LOCAL enable_seqscan = off"))
+    with captured_sql(db) as statements:
+        call()
+    assert statements, "the call ran no SQL"
+    for statement, parameters in statements:
+        plan = db.connection().exec_driver_sql(f"EXPLAIN (FORMAT JSON) {statement}", parameters).scalar()
+        scanned = sequential_scans(plan) & tables
+        assert not scanned, f"sequential scan of {sorted(scanned)} in:\n{statement}"
+
+def test_find_customer_by_id(pg_session):
+    customer_cache.clear()
+    assert_indexed(pg_session, lambda: find_customer(pg_session, cus_id=1), {"accounts"})
+
+def test_find_customer_by_phone(pg_session):
+    customer_cache.clear()
+    assert_indexed(pg_session, lambda: find_customer(pg_session, phone_number="012345678"), {"accounts"})
+
+@pytest.mark.parametrize("query_engine", ["python", "json"])
+@pytest.mark.parametrize("statements, params", [
+    (queries.PAWN_RECORDS_BY_IDS, {"pawn_ids": [1, 2, 3]}),
+    (queries.PAWN_RECORDS_BY_ID, {"pawn_id": 1}),
+    (queries.PAWN_RECORDS_BY_CUSTOMER, {"cus_id": 1}),
+])
+def test_pawn_records(pg_session, statements, params, query_engine):
+    assert_indexed(pg_session, lambda: load_pawn_records(pg_session, statements, params, query_engine=query_engine), PAWN_TABLES)
+
+@pytest.mark.parametrize("query_engine", ["python", "json"])
+@pytest.mark.parametrize("statements, params", [
+    (queries.ORDER_RECORDS_BY_ID, {"order_id": 1}),
+    (queries.ORDER_RECORDS_BY_CUSTOMER, {"cus_id": 1}),
+    (queries.ORDER_RECORDS_BY_CUSTOMERS, {"cus_ids": [1, 2]}),
+])
+def test_order_records(pg_session, statements, params, query_engine):
+    assert_indexed(pg_session, lambda: load_order_records(pg_session, statements, params, query_engine=query_engine), ORDER_TABLES)
+
+@pytest.mark.parametrize("cursor", [None, 1000])
+def test_pawn_listing_page(pg_session, cursor):
+    assert_indexed(pg_session, lambda: PawnStaff().get_all_pawn_details(pg_session, cursor=cursor, limit=20), {"pawns", "pawn_details"})
+
+def test_expiring_pawns(pg_session):
+    assert_indexed(pg_session, lambda: PawnStaff().get_expiring_pawns(pg_session, days=7), {"pawn_due_status"})
@@ -0,0 +1,126 @@
+"""
+Pawn interest (routes/ledger/interest.py) and how Staff.record_payment / redeem_pawn split money
+between the accrued interest and the principal.
+"""
+from datetime import date, datetime, timedelta
+
+import numpy as np
+import pytest
+from fastapi import HTTPException
+
+from entities import Account, Pawn, PawnPayment, PawnRedemption
+from routes.ledger.interest import PAWN_INTEREST_RATE, accrued_interest, ticket_interest
+from routes.ledger.model import PaymentInfo
+from routes.ledger.repository import Staff
+from routes.oauth2.model import Principal
+
+def test_accrued_interest_is_pro_rated_by_day():
+    # 1000 at 3% a month: 30 a month, 1 a day
+    assert accrued_interest(1000, 3, date(2024, 1, 1), date(2024, 1, 31)) == 30.0
+    assert accrued_interest(1000, 3, date(2024, 1, 1), date(2024, 1, 16)) == 15.0
+    assert accrued_interest(1000, 3, date(2024, 1, 1), date(2024, 3, 1)) == 60.0  # 60 calendar days
+
+def test_accrued_interest_counts_whole_days():
+    start = datetime(2024, 1, 1, 23, 59)
+    assert accrued_interest(1000, 3, start, datetime(2024, 1, 2, 0, 1)) == 1.0
+    assert accrued_interest(1000, 3, start, datetime(2024, 1, 1, 23, 59, 59)) == 0.0
+
+def test_accrued_interest_is_never_negative():
+    assert accrued_interest(1000, 3, date(2024, 2, 1), date(2024, 1, 1)) == 0.0
+
+def test_accrued_interest_rounds_to_cents():
+    # 333.33 × 2.5% × 7 / 30 = 1.944425
+    assert accrued_interest(333.33, 2.5, date(2024, 1, 1), date(2024, 1, 8)) == 1.94
+
+def test_accrued_interest_is_element_wise():
+    interest = accrued_interest(
+        [1000, 500, 0], [3, 6, 3], [date(2024, 1, 1), date(2024, 1, 21), date(2024, 1, 1)], date(2024, 1, 31),
+    )
+    assert interest.tolist() == [30.0, 10.0, 0.0]
+
+def test_a_single_ticket_matches_the_batch():
+    as_of = datetime(2024, 6, 30)
+    pawns = [
+        Pawn(pawn_deposit=1000, principal_paid=0, interest_rate=None, pawn_date=datetime(2024, 1, 5)),
+        Pawn(pawn_deposit=2500, principal_paid=400, interest_rate=4.5, pawn_date=datetime(2024, 2, 1), interest_paid_through=datetime(2024, 5, 17, 15)),
+        Pawn(pawn_deposit=777.77, principal_paid=0, interest_rate=1.25, pawn_date=datetime(2024, 6, 29)),
+        Pawn(pawn_deposit=100, principal_paid=150, interest_rate=3, pawn_date=datetime(2024, 1, 1)),  # overpaid: no principal left
+    ]
+
+    batch = accrued_interest(
+        np.array([max(pawn.pawn_deposit - pawn.principal_paid, 0) for pawn in pawns]),
+        np.array([pawn.interest_rate if pawn.interest_rate is not None else PAWN_INTEREST_RATE for pawn in pawns]),
+        [pawn.interest_paid_through or pawn.pawn_date for pawn in pawns],
+        as_of,
+    )
+
+    assert [ticket_interest(pawn, as_of) for pawn in pawns] == batch.tolist()
+
+def test_a_redeemed_ticket_accrues_nothing():
+    pawn = Pawn(pawn_deposit=1000, principal_paid=0, interest_rate=3, pawn_date=datetime(2024, 1, 1), redeemed_at=datetime(2024, 2, 1))
+    assert ticket_interest(pawn, datetime(2024, 6, 1)) == 0.0
+
+CLERK = Principal(id=1, sub="010", role="admin", exp=0)
+
+def pawn_thirty_days_old(db) -> int:
+    """1000 lent at 3% a month 30 days ago: 30.00 of interest accrued today"""
+    db.add(Account(cus_id=1, cus_name="Dara", phone_number="010", role="user"))
+    db.flush()
+    db.add(Pawn(
+        pawn_id=1, cus_id=1, pawn_deposit=1000, interest_rate=3,
+        pawn_date=datetime.utcnow() - timedelta(days=30), pawn_expire_date=datetime.utcnow() + timedelta(days=60),
+    ))
+    db.commit()
+    return 1
+
+def test_a_payment_settles_interest_first_then_principal(sqlite_session):
+    pawn_id = pawn_thirty_days_old(sqlite_session)
+
+    result = Staff().record_payment(sqlite_session, pawn_id, PaymentInfo(amount=130), CLERK).result
+
+    assert result == {"interest_paid": 30.0, "principal_paid": 100.0, "principal_outstanding": 900.0}
+    pawn = sqlite_session.get(Pawn, pawn_id)
+    assert pawn.principal_paid == 100.0
+    assert pawn.interest_paid_through.date() == datetime.utcnow().date()
+    payment = sqlite_session.query(PawnPayment).one()
+    assert (payment.amount, payment.interest_paid, payment.principal_paid) == (130, 30.0, 100.0)
+
+def test_a_later_payment_only_owes_interest_since_the_last_one(sqlite_session):
+    pawn_id = pawn_thirty_days_old(sqlite_session)
+    Staff().record_payment(sqlite_session, pawn_id, PaymentInfo(amount=130), CLERK)
+
+    result = Staff().record_payment(sqlite_session, pawn_id, PaymentInfo(amount=50), CLERK).result
+
+    assert result == {"interest_paid": 0.0, "principal_paid": 50.0, "principal_outstanding": 850.0}
+
+def test_paying_exactly_the_redemption_amount_clears_the_principal(sqlite_session):
+    pawn_id = pawn_thirty_days_old(sqlite_session)
+
+    result = Staff().record_payment(sqlite_session, pawn_id, PaymentInfo(amount=1030), CLERK).result
+
+    assert result == {"interest_paid": 30.0, "principal_paid": 1000.0, "principal_outstanding": 0.0}
+
+def test_redeeming_after_a_payment_settles_what_is_left(sqlite_session):
+    pawn_id = pawn_thirty_days_old(sqlite_session)
+    Staff().record_payment(sqlite_session, pawn_id, PaymentInfo(amount=130), CLERK)
+
+    result = Staff().redeem_pawn(sqlite_session, pawn_id, CLERK).result
+
+    assert result == {"principal_paid": 900.0, "interest_paid": 0.0, "total_paid": 900.0}
+    assert sqlite_session.get(Pawn, pawn_id).principal_paid == 1000.0
+    assert sqlite_session.query(PawnRedemption).one().total_paid == 900.0
+
+@pytest.mark.parametrize("amount, detail", [
+    (29.99, "Payment must cover the accrued interest of 30.0"),
+    (1030.01, "Payment exceeds the redemption amount; redeem the pawn instead"),
+])
+def test_a_payment_outside_interest_and_redemption_is_rejected(sqlite_session, amount, detail):
+    pawn_id = pawn_thirty_days_old(sqlite_session)
+
+    with pytest.raises(HTTPException) as rejected:
+        Staff().record_payment(sqlite_session, pawn_id, PaymentInfo(amount=amount), CLERK)
+
+    assert rejected.value.status_code == 400
+    assert rejected.value.detail == detail
+    assert sqlite_session.query(PawnPayment).count() == 0
+    assert sqlite_session.get(Pawn, pawn_id).principal_paid == 0
@@ -0,0 +1,71 @@
+"""
+The pure-Python trigram fallback that /search uses on SQLite (and any non-Postgres database).
+"""
+import pytest
+from fastapi import HTTPException
+
+from entities import Account, Product
+from routes.search.repository import Staff, trigrams, word_similarity
+
+def test_trigrams_pad_each_word_like_pg_trgm():
+    assert trigrams("Ab") == {"  a", " ab", "ab "}
+    assert trigrams("a b") == {"  a", " a ", "  b", " b "}
+    assert trigrams("") == set()
+
+def test_word_similarity():
+    assert word_similarity("dara", "dara") == 1.0
+    assert word_similarity("dara", "darra") == pytest.approx(0.8)
+    assert word_similarity("dara", "bopha") == 0.0
+    assert word_similarity("", "dara") == 0.0
+
+@pytest.fixture
+def db(sqlite_session):
+    sqlite_session.add_all([
+        Account(cus_id=1, cus_name="Darra", phone_number="012345678", role="user"),
+        Account(cus_id=2, cus_name="Dara Sok", phone_number="098765432", role="user"),
+        Account(cus_id=3, cus_name="Bopha", phone_number="011222333", role="user"),
+        Account(cus_id=4, cus_name="Dara Admin", phone_number="099000111", role="admin"),
+        Account(cus_id=5, cus_name="Sok Dara", phone_number="077111222", role="user"),
+        Product(prod_id=1, prod_name="Gold ring"),
+        Product(prod_id=2, prod_name="Gold chain"),
+        Product(prod_id=3, prod_name="Bracelet"),
+    ])
+    sqlite_session.commit()
+    return sqlite_session
+
+def search(db, q, limit=10):
+    return Staff().search(db, q, limit).result
+
+def test_customers_rank_substring_matches_before_fuzzy_ones(db):
+    customers = search(db, "dara")["customers"]
+
+    # Exact substrings score 1.0 (ties by cus_id), the misspelt "Darra" 0.8; admins never match
+    assert [(customer["cus_id"], customer["score"]) for customer in customers] == [(2, 1.0), (5, 1.0), (1, 0.8)]
+
+def test_customers_by_formatted_phone_digits(db):
+    customers = search(db, "012-345")["customers"]
+
+    assert [customer["cus_id"] for customer in customers] == [1]
+    assert customers[0]["score"] == 1.0
+
+def test_too_few_phone_digits_do_not_match_phone_numbers(db):
+    assert search(db, "12")["customers"] == []
+
+def test_unrelated_names_fall_below_the_threshold(db):
+    assert search(db, "xyz")["customers"] == []
+
+def test_limit(db):
+    assert [customer["cus_id"] for customer in search(db, "dara", limit=1)["customers"]] == [2]
+
+def test_products_rank_and_tolerate_typos(db):
+    products = search(db, "gold")["products"]
+    assert [product["prod_id"] for product in products] == [1, 2]
+
+    products = search(db, "bracelt")["products"]
+    assert [product["prod_name"] for product in products] == ["Bracelet"]
+    assert 0.3 <= products[0]["score"] < 1.0
+
+def test_blank_term_is_rejected(db):
+    with pytest.raises(HTTPException) as error:
+        search(db, "   ")
+    assert error.value.status_code == 400
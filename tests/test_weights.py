@@ -0,0 +1,36 @@
+"""
+normalize_weight: typed weights → (grams, unit) as written into pawn_weight_grams / order_weight_grams.
+"""
+import pytest
+
+from weights import normalize_weight, pawn_weight_fields
+
+@pytest.mark.parametrize("text, expected", [
+    ("5g", (5.0, "gram")),
+    ("5", (5.0, "gram")),
+    ("1.5 chi", (5.625, "chi")),
+    ("1,5 chi", (5.625, "chi")),
+    ("1 damlung 3 chi", (48.75, "damlung")),
+    ("2 ដំឡឹង", (75.0, "damlung")),
+])
+def test_normalize_weight(text, expected):
+    assert normalize_weight(text) == expected
+
+@pytest.mark.parametrize("text, grams", [
+    ("1,000g", 1000.0),
+    ("1,000", 1000.0),
+    ("12,500.5 g", 12500.5),
+    ("1,000,000 g", 1000000.0),
+    ("1,0000 g", 1.0),  # not a group of three: a decimal comma
+])
+def test_a_comma_before_three_digits_groups_thousands(text, grams):
+    assert normalize_weight(text)[0] == grams
+
+@pytest.mark.parametrize("text", ["3 ounces", "1 chi 2 bowls"])
+def test_an_unknown_unit_leaves_grams_empty(text):
+    assert normalize_weight(text) == (None, None)
+    assert pawn_weight_fields(text) == {"pawn_weight_grams": None, "pawn_weight_unit": None}
+
+@pytest.mark.parametrize("text", [None, "", "heavy"])
+def test_no_number_is_no_weight(text):
+    assert normalize_weight(text) == (None, None)
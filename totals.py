@@ -0,0 +1,151 @@
+"""
+Denormalized pawn and order totals.
+
+The totals columns on pawns and orders are written together with the ticket's detail rows,
+so the summary and print endpoints read one row instead of re-adding every line. NULL means
+"not computed yet" (tickets created before the columns existed); readers fall back to the
+lines until `python manage.py backfill-totals` has filled them in. Weights are summed from the
+numeric pawn_weight_grams column (see weights.py).
+"""
+from typing import Any, Dict, Iterable, Optional
+
+from sqlalchemy import func, select, tuple_, update
+from sqlalchemy.orm import Session
+
+from entities import Order, OrderDetail, Pawn, PawnDetail
+from weights import normalize_weight, order_weight_fields, pawn_weight_fields
+
+TOTALS_BATCH_SIZE = 500
+
+def _field(line: Any, name: str):
+    """Detail lines come as request models, ORM rows or dicts"""
+    return line.get(name) if isinstance(line, dict) else getattr(line, name)
+
+def pawn_line_grams(line: Any) -> float:
+    """
+    A pawn line's weight in grams: the normalized column when the line has it, else parsed from the
+    text (rows written before the column existed, until `manage.py normalize-weights` has run)
+    """
+    grams = line.get("pawn_weight_grams") if isinstance(line, dict) else getattr(line, "pawn_weight_grams", None)
+    if grams is None:
+        grams, _ = normalize_weight(_field(line, "pawn_weight"))
+    return grams or 0.0
+
+def pawn_totals(lines: Iterable[Any]) -> Dict[str, Any]:
+    """Pawn totals columns for a ticket's lines (pawn_weight, pawn_amount, pawn_unit_price); total_weight is in grams"""
+    totals = {"item_count": 0, "total_amount": 0, "total_weight": 0.0, "total_value": 0.0}
+    for line in lines:
+        amount = _field(line, "pawn_amount") or 0
+        totals["item_count"] += 1
+        totals["total_amount"] += amount
+        totals["total_weight"] += pawn_line_grams(line)
+        totals["total_value"] += amount * (_field(line, "pawn_unit_price") or 0)
+    return totals
+
+def order_totals(lines: Iterable[Any]) -> Dict[str, Any]:
+    """Order totals columns for an order's lines (order_amount, product_sell_price, labor and buy cost)"""
+    totals = {"item_count": 0, "total_amount": 0.0, "total_value": 0.0, "total_cost": 0.0}
+    for line in lines:
+        amount = _field(line, "order_amount") or 0
+        totals["item_count"] += 1
+        totals["total_amount"] += amount
+        totals["total_value"] += amount * (_field(line, "product_sell_price") or 0)
+        totals["total_cost"] += (_field(line, "product_labor_cost") or 0) + (_field(line, "product_buy_price") or 0)
+    return totals
+
+def _zero(column):
+    return func.coalesce(column, 0)
+
+def _refresh(db: Session, model, detail, key: str, aggregates: Dict[str, Any], ids: Optional[Iterable[int]], only_missing: bool, batch_size: int) -> int:
+    """
+    Recompute totals in keyset batches of `batch_size` tickets: one UPDATE ... FROM (SELECT ... GROUP BY)
+    and commit per batch, so the sums are added up by Postgres rather than in Python
+    """
+    id_column = getattr(model, key)
+    wanted = list(ids) if ids is not None else None
+    refreshed = 0
+    last_id = 0
+    while True:
+        query = db.query(id_column).filter(id_column > last_id)
+        if wanted is not None:
+            query = query.filter(id_column.in_(wanted))
+        if only_missing:
+            query = query.filter(model.total_amount.is_(None))
+        batch = [row[0] for row in query.order_by(id_column).limit(batch_size)]
+        if not batch:
+            return refreshed
+
+        # LEFT JOIN: tickets without lines get zero totals rather than staying NULL
+        sums = (
+            select(id_column.label("ticket_id"), *(aggregate.label(name) for name, aggregate in aggregates.items()))
+            .select_from(model)
+            .outerjoin(detail, getattr(detail, key) == id_column)
+            .where(id_column.in_(batch))
+            .group_by(id_column)
+            .subquery()
+        )
+        db.execute(
+            update(model)
+            .where(id_column == sums.c.ticket_id)
+            .values({name: sums.c[name] for name in aggregates})
+            .execution_options(synchronize_session=False)
+        )
+        db.commit()
+        refreshed += len(batch)
+        last_id = batch[-1]
+
+def refresh_pawn_totals(db: Session, pawn_ids: Optional[Iterable[int]] = None, only_missing: bool = False, batch_size: int = TOTALS_BATCH_SIZE) -> int:
+    """Recompute the totals of the given pawns (all pawns by default); returns how many were updated"""
+    aggregates = {
+        "item_count": func.count(PawnDetail.prod_id),
+        "total_amount": _zero(func.sum(PawnDetail.pawn_amount)),
+        "total_weight": _zero(func.sum(PawnDetail.pawn_weight_grams)),
+        "total_value": _zero(func.sum(_zero(PawnDetail.pawn_amount) * _zero(PawnDetail.pawn_unit_price))),
+    }
+    return _refresh(db, Pawn, PawnDetail, "pawn_id", aggregates, pawn_ids, only_missing, batch_size)
+
+def refresh_order_totals(db: Session, order_ids: Optional[Iterable[int]] = None, only_missing: bool = False, batch_size: int = TOTALS_BATCH_SIZE) -> int:
+    """Recompute the totals of the given orders (all orders by default); returns how many were updated"""
+    aggregates = {
+        "item_count": func.count(OrderDetail.prod_id),
+        "total_amount": _zero(func.sum(OrderDetail.order_amount)),
+        "total_value": _zero(func.sum(_zero(OrderDetail.order_amount) * _zero(OrderDetail.product_sell_price))),
+        "total_cost": _zero(func.sum(_zero(OrderDetail.product_labor_cost) + _zero(OrderDetail.product_buy_price))),
+    }
+    return _refresh(db, Order, OrderDetail, "order_id", aggregates, order_ids, only_missing, batch_size)
+
+def _normalize_weights(db: Session, detail, key: str, text_column: str, fields, only_missing: bool, batch_size: int) -> set:
+    """Parse the typed weight of detail rows in keyset batches over (ticket id, prod_id); returns the touched ticket ids"""
+    ticket_column = getattr(detail, key)
+    grams_column = getattr(detail, f"{text_column}_grams")
+    touched = set()
+    last_key = (0, 0)
+    while True:
+        query = db.query(ticket_column, detail.prod_id, getattr(detail, text_column)).filter(
+            tuple_(ticket_column, detail.prod_id) > tuple_(*last_key)
+        )
+        if only_missing:
+            query = query.filter(grams_column.is_(None))
+        batch = query.order_by(ticket_column, detail.prod_id).limit(batch_size).all()
+        if not batch:
+            return touched
+
+        db.execute(update(detail), [
+            {key: ticket_id, "prod_id": prod_id, **fields(text)}
+            for ticket_id, prod_id, text in batch
+        ])
+        db.commit()
+        touched.update(ticket_id for ticket_id, _, _ in batch)
+        last_key = (batch[-1][0], batch[-1][1])
+
+def normalize_stored_weights(db: Session, only_missing: bool = True, batch_size: int = TOTALS_BATCH_SIZE) -> Dict[str, int]:
+    """
+    Backfill pawn_weight_grams/order_weight_grams (and units) from the typed weights, then recompute
+    the stored totals of the pawns whose lines changed so total_weight is in grams.
+    """
+    pawn_ids = _normalize_weights(db, PawnDetail, "pawn_id", "pawn_weight", pawn_weight_fields, only_missing, batch_size)
+    order_ids = _normalize_weights(db, OrderDetail, "order_id", "order_weight", order_weight_fields, only_missing, batch_size)
+    if pawn_ids:
+        # Every pawn when re-parsing everything; otherwise only the ones that had unparsed lines
+        refresh_pawn_totals(db, sorted(pawn_ids) if only_missing else None, batch_size=batch_size)
+    return {"pawns": len(pawn_ids), "orders": len(order_ids)}
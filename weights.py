@@ -0,0 +1,76 @@
+"""
+Weight normalization.
+
+Staff type weights as free text: "5g", "1.5 chi", "2 ដំឡឹង", "1 damlung 3 chi". The text is kept
+for display, and at write time it is also parsed once into grams plus the unit it was written
+in (pawn_weight_grams / pawn_weight_unit, order_weight_grams / order_weight_unit), so totals
+add a numeric column in SQL instead of regex-parsing every line on every read.
+`python manage.py normalize-weights` fills in rows written before the columns existed.
+"""
+import re
+from typing import Optional, Tuple
+
+# Grams per unit, as the shop weighs gold (1 damlung = 10 chi = 100 hun = 1000 li)
+GRAMS_PER_UNIT = {
+    "gram": 1.0,
+    "kg": 1000.0,
+    "damlung": 37.5,
+    "chi": 3.75,
+    "hun": 0.375,
+    "li": 0.0375,
+}
+
+# Spellings seen in tickets → canonical unit
+UNIT_ALIASES = {
+    "g": "gram", "gr": "gram", "gram": "gram", "grams": "gram", "ក្រាម": "gram",
+    "kg": "kg", "kilo": "kg", "គីឡូ": "kg",
+    "damlung": "damlung", "tamlung": "damlung", "domlong": "damlung", "tael": "damlung", "ដំឡឹង": "damlung",
+    "chi": "chi", "ji": "chi", "ជី": "chi",
+    "hun": "hun", "ហ៊ុន": "hun",
+    "li": "li", "លី": "li",
+}
+
+# A number optionally followed by a unit word; compound weights ("1 damlung 3 chi") match once per part.
+# A comma before exactly three digits groups thousands ("1,000g"), any other comma is a decimal point ("1,5 chi")
+_WEIGHT_PART = re.compile(r"(\d+(?:,\d{3}(?!\d))*(?:[.,]\d+)?)\s*([^\d\s.,]*)")
+_THOUSANDS = re.compile(r"\d+(?:,\d{3})+(?:\.\d+)?")
+
+# Unitless weights are grams (the convention before units were recorded)
+DEFAULT_UNIT = "gram"
+
+def normalize_weight(text: Optional[str]) -> Tuple[Optional[float], Optional[str]]:
+    """
+    (grams, unit) for a typed weight; unit is the first unit written, a bare number is DEFAULT_UNIT.
+    (None, None) if the text has no number at all, or a unit word we don't know: the typed text is
+    kept, and a guess would put wrong grams into the totals.
+    """
+    if text is None:
+        return None, None
+    grams = 0.0
+    unit = None
+    for number, word in _WEIGHT_PART.findall(str(text).lower()):
+        part_unit = UNIT_ALIASES.get(word) if word else DEFAULT_UNIT
+        if part_unit is None:
+            return None, None
+        grams += _number(number) * GRAMS_PER_UNIT[part_unit]
+        unit = unit or part_unit
+    if unit is None:
+        return None, None
+    return round(grams, 4), unit
+
+def _number(number: str) -> float:
+    if _THOUSANDS.fullmatch(number):
+        return float(number.replace(",", ""))
+    return float(number.replace(",", "."))
+
+def pawn_weight_fields(text: Optional[str]) -> dict:
+    grams, unit = normalize_weight(text)
+    return {"pawn_weight_grams": grams, "pawn_weight_unit": unit}
+
+def order_weight_fields(text: Optional[str]) -> dict:
+    grams, unit = normalize_weight(text)
+    return {"order_weight_grams": grams, "order_weight_unit": unit}
+
+def from_grams(grams: float, unit: str) -> float:
+    """Convert a gram weight back into `unit` (e.g. for showing a total in chi)"""
+    return round(grams / GRAMS_PER_UNIT[unit], 4)